@@ -1,107 +1,139 @@
-import requests
-import pandas as pd
+import asyncio
+import logging
+import numpy as np
 from datetime import datetime
-import random
+
+import renderer
+import subscriptions
+from features import FeatureIndex
+from predictor import SEED, fixture_rng
+from team_store import teams
+from venues import weather_factors
+from telegram_sender import BotAPITransport, OutboundSender
 
 # =====================================
 # AI PREDICTION ENGINE (MOCK IMPLEMENTATION)
 # =====================================
 class SoccerPredictor:
-    def __init__(self):
+    def __init__(self, seed=SEED):
+        # Every fixture draws from its own stream of (seed, fixture), so reruns agree
+        self.seed = seed
         self.teams_db = self._load_team_data()
-        self.weather_db = self._load_weather_data()
+        # Rolling last-5 form per team, so scoring never re-slices the form lists
+        self.features = FeatureIndex(form_window=5)
+        for team_id, data in self.teams_db.items():
+            for value in data["form"]:
+                self.features.push_form(team_id, value)
         
     def _load_team_data(self):
         # In production: Connect to sports database API
-        return {
+        raw = {
             "TeamA": {"form": [1,1,0,1,0], "injuries": ["PlayerX"], "home_record": [5,3,2]},
             "TeamB": {"form": [0,1,1,0,1], "injuries": [], "away_record": [2,4,4]},
             # Add more teams...
         }
+        # Keyed by the shared team_store id, so every module agrees on who is who
+        return {teams.intern(name): data for name, data in raw.items()}
     
-    def _load_weather_data(self):
-        # In production: Use weather API
-        return {
-            "Stadium1": {"condition": "Dry", "temp": 22},
-            "Stadium2": {"condition": "Rain", "temp": 16},
-        }
-    
-    def _calculate_ai_score(self, home, away, venue):
+    def _calculate_ai_score(self, home, away, weather_factor, rng):
         """Advanced prediction algorithm (simplified mock)"""
+        home_id = teams.lookup(home)
+        away_id = teams.lookup(away)
+
         # Feature engineering
-        home_strength = sum(self.teams_db[home]["form"][-5:])/5
-        away_weakness = 1 - sum(self.teams_db[away]["form"][-5:])/5
-        injury_impact = len(self.teams_db[home]["injuries"])*0.1
+        home_strength = self.features.form_points(home_id)[0]/5
+        away_weakness = 1 - self.features.form_points(away_id)[0]/5
+        injury_impact = len(self.teams_db.get(home_id, {}).get("injuries", []))*0.1
         
         # AI model simulation (replace with real ML model)
         btts_prob = min(0.85, 0.4 + home_strength*0.3 + away_weakness*0.3)
         home_win_prob = 0.3 + home_strength - injury_impact
         
-        # Weather adjustment
-        if self.weather_db[venue]["condition"] == "Rain":
+        # Weather adjustment: rain, snow or strong wind (venues.weather_factors below 1)
+        if weather_factor < 1:
             btts_prob *= 0.9
         
         # Generate predictions
         return {
             "match_result": "1" if home_win_prob > 0.5 else "X" if home_win_prob > 0.3 else "2",
             "btts": "Yes" if btts_prob > 0.5 else "No",
-            "correct_score": f"{random.randint(1,2)}-{random.randint(1,2)}",
-            "confidence": random.randint(65, 92)
+            "correct_score": f"{rng.integers(1, 3)}-{rng.integers(1, 3)}",
+            "confidence": int(rng.integers(65, 93))
         }
     
-    def generate_predictions(self, matches):
+    def record_result(self, home, away, home_goals, away_goals):
+        """Feed a played match into the form windows (a win counts 1, anything else 0)"""
+        self.features.push_form(teams.intern(home), int(home_goals > away_goals))
+        self.features.push_form(teams.intern(away), int(away_goals > home_goals))
+
+    def generate_predictions(self, matches, forecasts=None):
+        """``forecasts``, e.g. from venues.WeatherService, override each match's own "weather" """
         predictions = []
-        for match in matches:
-            pred = self._calculate_ai_score(match["home"], match["away"], match["venue"])
+        today = datetime.now().date()
+        forecasts = forecasts or [None] * len(matches)
+        factors = weather_factors([forecast or match.get("weather") for match, forecast in zip(matches, forecasts)])
+        for match, factor in zip(matches, factors.tolist()):
+            rng = fixture_rng(match["home"], match["away"], match.get("date", today), self.seed)
+            pred = self._calculate_ai_score(match["home"], match["away"], factor, rng)
             predictions.append({
                 **match,
                 **pred,
-                "hollywoodbets": random.choice(["Home Win", "Draw", "Away Win"]),
-                "betway": random.choice(["1-0", "2-1", "1-1", "0-0", "2-0"])
+                "hollywoodbets": ["Home Win", "Draw", "Away Win"][rng.integers(3)],
+                "betway": ["1-0", "2-1", "1-1", "0-0", "2-0"][rng.integers(5)]
             })
         return predictions
 
 # =====================================
 # TELEGRAM INTEGRATION
 # =====================================
-def send_to_telegram(predictions, bot_token, chat_id):
-    message = "⚽️ *Today's AI Soccer Predictions* ⚽️\n\n"
-    message += "`Win/Draw & BTTS Recommendations:`\n\n"
-    
-    for i, p in enumerate(predictions[:16]):  # Max 16 games
-        if p["match_result"] in ["1", "X"] and p["btts"] == "Yes":
-            rec_symbol = "🔥"
-        else:
-            rec_symbol = "➖"
-            
-        message += (
-            f"{rec_symbol} *{p['home']} vs {p['away']}*\n"
-            f"🏆 Result: {p['match_result']} | BTTS: {p['btts']}\n"
-            f"🎯 AI Score: {p['correct_score']} ({p['confidence']}%)\n"
-            f"📊 Hollywoodbets: {p['hollywoodbets']}\n"
-            f"📈 Betway: {p['betway']}\n"
-            f"🌤 Weather: {p['weather']} | Ref: {p['referee']}\n"
-            f"🩹 Injuries: {', '.join(p['injuries'] or ['None'])}\n"
-            "━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-        )
-    
-    # Send via Telegram Bot API
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        "chat_id": chat_id,
-        "text": message,
-        "parse_mode": "Markdown",
-        "disable_web_page_preview": True
+HEADER = renderer.RECOMMENDATIONS_HEADER
+is_recommended = renderer.is_recommended
+render_prediction = renderer.recommendation_renderer()
+
+def prediction_markets(predictions):
+    """subscriptions market columns for generate_predictions output (same rules as predictor_markets)"""
+    confidence = np.array([p["confidence"] / 100 for p in predictions], dtype=float)
+    every = np.ones(len(predictions), dtype=bool)
+    return {
+        "1x2": (every, confidence),
+        "btts": (every, confidence),
+        "correct_score": (every, confidence),
+        "fire": (np.array([is_recommended(p) for p in predictions], dtype=bool), confidence),
     }
-    requests.post(url, json=payload)
+
+def send_to_telegram(predictions, bot_token, chat_id):
+    parts = [HEADER] + [render_prediction(i, p, p) for i, p in enumerate(predictions[:16])]  # Max 16 games
+    # Send via the shared rate-limited sender (splits past 4096 characters)
+    asyncio.run(_send_parts(parts, bot_token, chat_id))
+
+async def _send_parts(parts, bot_token, chat_id):
+    import aiohttp
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+        sender = OutboundSender(BotAPITransport(bot_token, session))
+        await sender.send_parts(chat_id, parts, parse_mode=renderer.PARSE_MODE, disable_web_page_preview=True)
+
+def send_to_subscribers(predictions, bot_token, registry):
+    """Fan the predictions out to every subscriber, filtered per chat"""
+    predictions = predictions[:16]  # Max 16 games
+    deliveries = subscriptions.plan(registry, predictions, predictions, render_prediction, HEADER,
+                                    columns=prediction_markets(predictions))
+    asyncio.run(_fan_out(deliveries, bot_token))
+
+async def _fan_out(deliveries, bot_token):
+    import aiohttp
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+        sender = OutboundSender(BotAPITransport(bot_token, session))
+        await subscriptions.fan_out(sender, deliveries, parse_mode=renderer.PARSE_MODE, disable_web_page_preview=True)
 
 # =====================================
 # MAIN EXECUTION
 # =====================================
 if __name__ == "__main__":
-    # Configuration
+    # Configuration; chats and their filters live in the subscription registry (see bot.py /subscribe)
     BOT_TOKEN = "YOUR_TELEGRAM_BOT_TOKEN"
-    CHAT_ID = "YOUR_TELEGRAM_CHAT_ID"
+    CHAT_ID = "YOUR_TELEGRAM_CHAT_ID"  # gets every prediction while nobody has subscribed
     
     # Sample match data (replace with API data)
     today_matches = [
@@ -120,8 +152,11 @@ if __name__ == "__main__":
     predictor = SoccerPredictor()
     predictions = predictor.generate_predictions(today_matches)
     
-    # Filter for recommended bets (Win/Draw & BTTS)
-    recommended = [p for p in predictions if p["match_result"] in ["1", "X"] and p["btts"] == "Yes"]
-    
-    # Send to Telegram
-    send_to_telegram(recommended or predictions, BOT_TOKEN, CHAT_ID)
+    # Send each subscriber the picks matching their filters (e.g. only 🔥 recommendations)
+    registry = subscriptions.SubscriptionRegistry.load()
+    if len(registry):
+        send_to_subscribers(predictions, BOT_TOKEN, registry)
+    else:
+        logging.warning("No subscribers in %s; sending every prediction to %s", subscriptions.SUBSCRIPTIONS_PATH,
+                        CHAT_ID)
+        send_to_telegram(predictions, BOT_TOKEN, CHAT_ID)
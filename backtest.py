@@ -0,0 +1,284 @@
+# backtest.py
+"""Replay past seasons through the prediction models and score them.
+
+    python backtest.py results.csv                  # all cores, one shard per league
+    python backtest.py results.parquet --shard-by season --workers 4
+
+Results are streamed in date order and every match is predicted from a
+FeatureIndex holding only the results played *before* its kickoff day;
+the day's results are ingested after the whole day has been scored.
+
+The file (CSV, JSON lines, gzipped or not, or Parquet; see ingest.py)
+needs date, home_team, away_team, home_goals and away_goals columns, plus
+optional league and season columns. football-data.co.uk files (Div, Date,
+HomeTeam, AwayTeam, FTHG, FTAG) are read as they are.
+
+Shards (a league, or one season of a league) run in a process pool. A
+season shard first replays the league's earlier seasons without scoring
+them, so its features match a whole-league run; that buys parallelism for
+files with few leagues at the cost of re-reading the file per season.
+Bookmaker flips come from each fixture's own predictor.fixture_uniforms, so the
+report is the same whatever the sharding or the number of workers.
+"""
+import argparse
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import machine_learning
+import predictor
+from features import FeatureIndex, FeatureView
+from ingest import read_results
+from team_store import teams
+
+logger = logging.getLogger(__name__)
+
+MARKETS = ('1x2', 'btts', 'correct_score')
+# Model names as used in predict_games output, plus the trained model and ai_predictor
+MODELS = ('main_model', 'hollywoodbets', 'betway', 'consensus', 'trained', 'soccer_predictor')
+# Models whose scores depend on the trained 1X2 model, when one is loaded
+_USES_TRAINED = {'main_model', 'consensus', 'trained'}
+# Probabilities are clipped before taking logs, so a confident miss costs ~ -log(1e-15)
+LOG_EPS = 1e-15
+# Matches per vectorized scoring batch
+SCORE_CHUNK = 10_000
+
+Shard = Tuple[str, Optional[str]]  # (league, season or None for the whole league)
+
+
+# --- shards -------------------------------------------------------------------------
+
+def find_shards(path: str, shard_by: str = 'league') -> List[Shard]:
+    """Every (league, season) in the file, or (league, None) with ``shard_by='league'``."""
+    keys = {(row['league'], row['season'] if shard_by == 'season' else None) for row in read_results(path)}
+    return sorted(keys, key=lambda key: (key[0], key[1] or ''))
+
+
+# --- scoring ------------------------------------------------------------------------
+
+def _outcome_index(home_goals: np.ndarray, away_goals: np.ndarray) -> np.ndarray:
+    """0, 1, 2 for '1', 'X', '2'."""
+    return np.where(home_goals > away_goals, 0, np.where(home_goals == away_goals, 1, 2))
+
+
+def _add(stats: Counter, model: str, market: str, hits: np.ndarray,
+         brier: Optional[np.ndarray] = None, log_loss: Optional[np.ndarray] = None) -> None:
+    stats[model, market, 'n'] += len(hits)
+    stats[model, market, 'hits'] += int(np.count_nonzero(hits))
+    if brier is not None:
+        stats[model, market, 'brier'] += float(brier.sum())
+        stats[model, market, 'log_loss'] += float(log_loss.sum())
+
+
+def _score_outcome_probs(stats: Counter, model: str, probs: np.ndarray, picks: np.ndarray,
+                         outcome: np.ndarray) -> None:
+    """Multi-class Brier and log-loss of (n, 3) 1X2 probabilities, hit rate of ``picks``."""
+    truth = np.zeros_like(probs)
+    truth[np.arange(len(probs)), outcome] = 1
+    p_true = probs[np.arange(len(probs)), outcome]
+    _add(stats, model, '1x2', picks == outcome,
+         ((probs - truth) ** 2).sum(axis=1), -np.log(np.clip(p_true, LOG_EPS, 1)))
+
+
+def _score_matrix_set(stats: Counter, model_name: str, matrix_set: predictor.ScoreMatrixSet,
+                      probs: np.ndarray, picks: np.ndarray, home_goals: np.ndarray, away_goals: np.ndarray) -> None:
+    _score_outcome_probs(stats, model_name, probs, picks, _outcome_index(home_goals, away_goals))
+
+    btts = (home_goals > 0) & (away_goals > 0)
+    p_btts = matrix_set.btts
+    _add(stats, model_name, 'btts', (p_btts >= 0.5) == btts,
+         (p_btts - btts) ** 2, -np.log(np.clip(np.where(btts, p_btts, 1 - p_btts), LOG_EPS, 1)))
+
+    # Scores past MAX_GOALS are outside the matrix and get probability 0
+    size = predictor.MAX_GOALS + 1
+    n = len(matrix_set)
+    in_matrix = (home_goals < size) & (away_goals < size)
+    cell = np.minimum(home_goals, size - 1) * size + np.minimum(away_goals, size - 1)
+    flat = matrix_set.matrices.reshape(n, -1)
+    p_score = np.where(in_matrix, flat[np.arange(n), cell], 0.0)
+    _add(stats, model_name, 'correct_score', in_matrix & (matrix_set.top_cells[:, 0] == cell),
+         (flat ** 2).sum(axis=1) - 2 * p_score + 1, -np.log(np.clip(p_score, LOG_EPS, 1)))
+
+
+def _score_soccer_predictor(stats: Counter, preds: List[Dict[str, Any]],
+                            home_goals: np.ndarray, away_goals: np.ndarray) -> None:
+    # SoccerPredictor only gives picks; its confidence is read as P(1X2 pick)
+    # and the rest split evenly, BTTS and correct score get a hit rate only
+    picks = np.array(['1X2'.index(pred['match_result']) for pred in preds])
+    confidence = np.array([pred['confidence'] / 100 for pred in preds])
+    probs = np.repeat(((1 - confidence) / 2)[:, None], 3, axis=1)
+    probs[np.arange(len(preds)), picks] = confidence
+    _score_outcome_probs(stats, 'soccer_predictor', probs, picks, _outcome_index(home_goals, away_goals))
+    btts = (home_goals > 0) & (away_goals > 0)
+    _add(stats, 'soccer_predictor', 'btts', np.array([pred['btts'] == 'Yes' for pred in preds]) == btts)
+    scores = [f"{h}-{a}" for h, a in zip(home_goals.tolist(), away_goals.tolist())]
+    _add(stats, 'soccer_predictor', 'correct_score',
+         np.array([pred['correct_score'] == score for pred, score in zip(preds, scores)]))
+
+
+def _score(stats: Counter, models: Sequence[str], rows: List[Tuple[int, ...]], games: List[Dict[str, Any]],
+           soccer_preds: List[Dict[str, Any]], seed: int) -> None:
+    """Score pre-kickoff feature rows against the results of ``games``."""
+    view = FeatureView.from_rows(rows)
+    home_goals = np.array([game['home_goals'] for game in games])
+    away_goals = np.array([game['away_goals'] for game in games])
+    # Same models, flips and blend as predictor.predict_games: with a trained model the
+    # main model's matrices follow its 1X2, as in predictor.model_matrices
+    trained = machine_learning.predict_outcome_proba(games, view) if _USES_TRAINED & set(models) else None
+    sets = [predictor.ScoreMatrixSet.from_table(view, model.home_adv) for _, model in predictor._MODELS]
+    if trained is not None:
+        sets[0] = sets[0].rescaled(trained)
+    outcome_probs = [matrix_set.outcome_probs for matrix_set in sets]
+    draws = predictor.flip_draws(games, seed)
+    for (name, model), matrix_set, probs in zip(predictor._MODELS, sets, outcome_probs):
+        if name in models:
+            picks, conf = predictor.outcome_picks(probs)
+            if model.flips:
+                k = predictor._FLIPPING.index(name)
+                # Flipped picks count against the hit rate; the probabilities are the model's own
+                picks, conf = predictor.flip_outcomes(picks, conf, draws[:, 2 * k:2 * k + 2])
+            _score_matrix_set(stats, name, matrix_set, probs, picks, home_goals, away_goals)
+    if trained is not None and 'trained' in models:
+        _score_outcome_probs(stats, 'trained', trained, trained.argmax(axis=1), _outcome_index(home_goals, away_goals))
+    if 'consensus' in models:
+        probs = predictor.consensus_outcome_probs(outcome_probs)
+        _score_matrix_set(stats, 'consensus', predictor.ScoreMatrixSet.blend(sets, predictor.CONSENSUS_WEIGHTS),
+                          probs, predictor.outcome_picks(probs)[0], home_goals, away_goals)
+    if soccer_preds:
+        _score_soccer_predictor(stats, soccer_preds, home_goals, away_goals)
+
+
+def run_shard(path: str, shard: Shard, seed: int = 0, models: Sequence[str] = MODELS,
+              chunk_size: int = SCORE_CHUNK) -> Tuple[Counter, int, float]:
+    """Backtest one shard; returns (stats, matches scored, CPU seconds).
+
+    Each day's feature rows are snapshotted before its results are ingested,
+    and the snapshots are scored ``chunk_size`` matches at a time, so the
+    score matrices are built in large batches rather than one small slate a day.
+    """
+    start = time.process_time()
+    league, season = shard
+    index = FeatureIndex()
+    soccer = None
+    if 'soccer_predictor' in models:
+        from ai_predictor import SoccerPredictor
+
+        soccer = SoccerPredictor(seed)
+    stats: Counter = Counter()
+    scored = 0
+    day: List[Dict[str, Any]] = []
+    rows: List[Tuple[int, ...]] = []
+    games: List[Dict[str, Any]] = []
+    soccer_preds: List[Dict[str, Any]] = []
+
+    def score() -> None:
+        nonlocal scored
+        _score(stats, models, rows, games, soccer_preds, seed)
+        scored += len(games)
+        rows.clear()
+        games.clear()
+        soccer_preds.clear()
+
+    def flush() -> None:
+        ids = [(teams.intern(game['home_team']), teams.intern(game['away_team'])) for game in day]
+        if season is None or day[0]['season'] == season:
+            rows.extend(index.row(home_id, away_id) for home_id, away_id in ids)
+            games.extend(day)
+            if soccer is not None:
+                # SoccerPredictor keeps its own form state, so it has to be asked on the day
+                soccer_preds.extend(soccer.generate_predictions(
+                    [{'home': game['home_team'], 'away': game['away_team'], 'date': game['date'], 'venue': None}
+                     for game in day]))
+        for (home_id, away_id), game in zip(ids, day):
+            index.ingest(home_id, away_id, game['home_goals'], game['away_goals'])
+            if soccer is not None:
+                soccer.record_result(game['home_team'], game['away_team'], game['home_goals'], game['away_goals'])
+        day.clear()
+        if len(games) >= chunk_size:
+            score()
+
+    for row in read_results(path):
+        if row['league'] != league:
+            continue
+        if day and row['date'] != day[0]['date']:
+            if row['date'] < day[0]['date']:
+                raise ValueError(f"{path}: {league} results are not in date order "
+                                 f"({row['date']} after {day[0]['date']})")
+            flush()
+        if season is not None and row['season'] > season:
+            break
+        day.append(row)
+    if day:
+        flush()
+    if games:
+        score()
+    return stats, scored, time.process_time() - start
+
+
+def _available(models: Sequence[str]) -> List[str]:
+    if 'soccer_predictor' in models:
+        try:
+            import ai_predictor  # noqa: F401
+        except ImportError as exc:
+            logger.warning("Skipping soccer_predictor: %s", exc)
+            return [model for model in models if model != 'soccer_predictor']
+    return list(models)
+
+
+def backtest(path: str, workers: Optional[int] = None, seed: int = 0, shard_by: str = 'league',
+             models: Sequence[str] = MODELS) -> Tuple[Counter, int, float]:
+    """Run every shard of ``path`` in a process pool; returns the merged run_shard totals."""
+    shards = find_shards(path, shard_by)
+    models = _available(models)
+    # Load the trained model once before forking so the workers share its pages
+    if _USES_TRAINED & set(models):
+        machine_learning.registry.preload()
+    stats: Counter = Counter()
+    scored, cpu = 0, 0.0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_shard, path, shard, seed, models) for shard in shards]
+        for future in futures:
+            shard_stats, shard_scored, shard_cpu = future.result()
+            stats.update(shard_stats)
+            scored += shard_scored
+            cpu += shard_cpu
+    return stats, scored, cpu
+
+
+def report(stats: Counter) -> str:
+    lines = [f"{'model':<18}{'market':<15}{'n':>8}{'hit rate':>10}{'brier':>8}{'log-loss':>10}"]
+    for model in MODELS:
+        for market in MARKETS:
+            n = stats[model, market, 'n']
+            if not n:
+                continue
+            if (model, market, 'brier') in stats:
+                probs = f"{stats[model, market, 'brier'] / n:>8.4f}{stats[model, market, 'log_loss'] / n:>10.4f}"
+            else:
+                probs = f"{'-':>8}{'-':>10}"
+            lines.append(f"{model:<18}{market:<15}{n:>8}{stats[model, market, 'hits'] / n:>10.3f}{probs}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='historical results (.csv, .jsonl, .gz or .parquet)')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-by', choices=('league', 'season'), default='league')
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=list(MODELS))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    stats, scored, cpu = backtest(args.path, args.workers, args.seed, args.shard_by, args.models)
+    elapsed = time.perf_counter() - start
+    print(report(stats))
+    print(f"{scored} matches in {elapsed:.1f} s ({scored / max(cpu, 1e-9):.0f} matches/s per core)")
+
+
+if __name__ == '__main__':
+    main()
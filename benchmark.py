@@ -0,0 +1,729 @@
+# benchmark.py
+"""Micro-benchmarks for the prediction pipeline.
+
+Run everything with ``python benchmark.py`` or a single benchmark with
+``python benchmark.py predict_games``.
+"""
+import asyncio
+import datetime
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import predictor
+
+
+def make_games(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build ``n`` synthetic fixtures in the same shape as data_fetcher.fetch_todays_games."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    games = []
+    for i in range(n):
+        home, away = f"Team {2 * i}", f"Team {2 * i + 1}"
+        games.append({
+            "home_team": home,
+            "away_team": away,
+            "date": today,
+            "team_forms": {
+                "home": [rng.choice([0, 1, 3]) for _ in range(5)],
+                "away": [rng.choice([0, 1, 3]) for _ in range(5)],
+            },
+            "injuries": {"home": [], "away": []},
+            "transfers": {"home": {"in": [], "out": []}, "away": {"in": [], "out": []}},
+            "weather": "Clear",
+            "pitch": "Good",
+            "referee": f"Referee {i % 20}",
+            "h2h": [
+                {"date": "2025-01-01", "home_team": home, "away_team": away,
+                 "score": f"{rng.randint(0, 4)}-{rng.randint(0, 4)}"}
+                for _ in range(rng.randint(0, 4))
+            ],
+        })
+    return games
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_predict_games() -> None:
+    """Games/second for predict_game in a loop vs the batched predict_games."""
+    print("predict_games: games/second (per-game loop vs batch)")
+    for n in (10, 1_000, 100_000):
+        games = make_games(n)
+        # The per-game loop is timed on at most 10k games and scaled up
+        sample = games[:10_000]
+        loop = _timed(lambda: [predictor.predict_game(g) for g in sample]) * n / len(sample)
+        batch = _timed(lambda: predictor.predict_games(games))
+        print(f"  {n:>7} games: loop {n / loop:>12,.0f}/s  batch {n / batch:>12,.0f}/s  "
+              f"({loop / batch:.1f}x)")
+
+
+def bench_score_matrices() -> None:
+    """Fixtures/second for building a slate's score matrices and markets."""
+    print("score_matrices: fixtures/second (matrices + all markets)")
+    for n in (1_000, 100_000):
+        games = make_games(n)
+        elapsed = _timed(lambda: predictor.ScoreMatrixSet.from_games(games, predictor.AIModel.home_adv))
+        print(f"  {n:>7} fixtures: {n / elapsed:>12,.0f}/s")
+
+
+def bench_enrichment(latency: float = 0.05) -> None:
+    """Wall time to enrich 16 matches: sequential requests loop vs the async pipeline."""
+    import requests
+
+    import enrichment
+    import mail
+    from stub_api import StubAPI
+
+    print(f"enrichment: 16 matches, {latency * 1000:.0f} ms per upstream call")
+    with StubAPI(latency=latency) as stub:
+        football_url, weather_url = f"{stub.url}/v4", f"{stub.url}/data/2.5"
+        matches = requests.get(f"{football_url}/matches", timeout=10).json()['matches']
+
+        def sequential():
+            # What a blocking per-match loop does: one fresh request after another
+            for match in matches:
+                venue = requests.get(f"{football_url}/matches/{match['id']}", timeout=10).json()['venue']
+                requests.get(f"{weather_url}/weather", params={'q': venue}, timeout=10)
+                requests.get(f"{football_url}/teams/{match['homeTeam']['id']}", timeout=10)
+                requests.get(f"{football_url}/teams/{match['awayTeam']['id']}", timeout=10)
+                requests.get(f"{football_url}/matches/{match['id']}/head2head", timeout=10)
+
+        async def pipelined():
+            # Locally every upstream is the same host, so lift its limit to stand in for four hosts
+            host_limits = {f"127.0.0.1:{stub.port}": 4 * enrichment.MAX_PER_HOST}
+            async with enrichment.AsyncHTTPClient(host_limits=host_limits) as client:
+                enricher = enrichment.MatchEnricher(client, football_url, weather_url, 'key', 'key')
+                await enricher.enrich_all(matches, mail._default_details)
+
+        seq = _timed(sequential)
+        par = _timed(lambda: asyncio.run(pipelined()))
+        print(f"  sequential {seq * 1000:>8.0f} ms  async {par * 1000:>8.0f} ms  "
+              f"(slowest call chain {2 * latency * 1000:.0f} ms)")
+
+
+def bench_daily_cache(n_games: int = 16, n_requests: int = 10_000) -> None:
+    """/today latency: rebuilding every time vs serving the precomputed chunks."""
+    import bot
+    from daily_cache import DailyPredictions
+
+    games = make_games(n_games)
+    daily = DailyPredictions(bot.render_game, bot.HEADER, fetch=lambda: games)
+    rebuild = _timed(daily.refresh)
+    served = _timed(lambda: [daily.get() for _ in range(n_requests)]) / n_requests
+    unchanged = _timed(daily.refresh)
+    print(f"daily_cache: {n_games} games")
+    print(f"  full build {rebuild * 1000:.2f} ms  unchanged refresh {unchanged * 1000:.2f} ms  "
+          f"served {served * 1e6:.2f} us/request")
+
+
+def _traced_bytes(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """Build something and return it with the bytes it allocated."""
+    import tracemalloc
+
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def _fill_registry(names: List[str]):
+    from team_store import TeamRegistry
+
+    registry = TeamRegistry()
+    for name in names:
+        registry.intern(name)
+    return registry
+
+
+def bench_team_store(n_teams: int = 50_000, n_matches: int = 1_000_000, n_fixtures: int = 100_000) -> None:
+    """Memory of the registry and history tables vs nested dicts, and feature access speed."""
+    import numpy as np
+
+    from team_store import FixtureTable, MatchTable
+
+    print(f"team_store: {n_teams:,} teams, {n_matches:,} historical matches")
+    names = [f"Team {i}" for i in range(n_teams)]
+    _, registry_bytes = _traced_bytes(lambda: _fill_registry(names))
+
+    rng = np.random.default_rng(0)
+    days = np.sort(rng.integers(730_000, 740_000, n_matches)).astype(np.int32)
+    home = rng.integers(0, n_teams, n_matches).astype(np.int32)
+    away = rng.integers(0, n_teams, n_matches).astype(np.int32)
+    goals = rng.poisson(1.4, (2, n_matches)).clip(0, 20).astype(np.int8)
+
+    def build_table():
+        table = MatchTable(capacity=n_matches)
+        table.extend(days, home, away, goals[0], goals[1])
+        return table
+    table, table_bytes = _traced_bytes(build_table)
+
+    # The dict format is measured on a 1% sample and scaled up
+    sample = n_matches // 100
+    _, dict_bytes = _traced_bytes(lambda: [
+        {"date": "2025-01-01", "home_team": names[home[i]], "away_team": names[away[i]],
+         "score": f"{goals[0][i]}-{goals[1][i]}"} for i in range(sample)])
+    dict_bytes *= n_matches // sample
+    print(f"  registry {registry_bytes / 2**20:8.1f} MB")
+    print(f"  history  {table_bytes / 2**20:8.1f} MB columnar ({table.nbytes / n_matches:.0f} B/match)  "
+          f"vs ~{dict_bytes / 2**20:.1f} MB as dicts")
+
+    rows = _timed(lambda: sum(table.row(i).home_goals for i in range(100_000)))
+    print(f"  row access {100_000 / rows:12,.0f} rows/s")
+
+    games = make_games(n_fixtures)
+    from_dicts = _timed(lambda: predictor.expected_goals(FixtureTable.from_games(games), 0.1))
+    fixtures = FixtureTable.from_games(games)
+    from_table = _timed(lambda: predictor.expected_goals(fixtures, 0.1))
+    print(f"  expected_goals for {n_fixtures:,} fixtures: packing from dicts {from_dicts * 1000:.0f} ms, "
+          f"on a stored table {from_table * 1000:.1f} ms")
+
+
+def make_season(n_leagues: int = 100, teams_per_league: int = 20, seed: int = 0) -> List[Tuple[int, int, int, int]]:
+    """Double round-robin results (home_id, away_id, home_goals, away_goals) for many leagues."""
+    rng = random.Random(seed)
+    results = []
+    for league in range(n_leagues):
+        ids = range(league * teams_per_league, (league + 1) * teams_per_league)
+        fixtures = [(home, away) for home in ids for away in ids if home != away]
+        rng.shuffle(fixtures)
+        results.extend((home, away, min(9, int(rng.expovariate(0.7))), min(9, int(rng.expovariate(0.9))))
+                       for home, away in fixtures)
+    return results
+
+
+def bench_features(n_leagues: int = 100, n_fixtures: int = 10_000) -> None:
+    """Ingesting a full season into the FeatureIndex, and reading slate features from it."""
+    from features import FeatureIndex
+    from team_store import FixtureTable
+
+    season = make_season(n_leagues)
+    index = FeatureIndex()
+    elapsed = _timed(lambda: [index.ingest(*result) for result in season])
+    print(f"features: one season of {n_leagues} leagues ({len(season):,} results)")
+    print(f"  ingest {len(season) / elapsed:12,.0f} results/s ({elapsed / len(season) * 1e6:.2f} us each)")
+
+    games = make_games(n_fixtures)
+    n_teams = n_leagues * 20
+    home_ids = [i % n_teams for i in range(n_fixtures)]
+    away_ids = [(i * 7 + 1) % n_teams for i in range(n_fixtures)]
+    from_index = _timed(lambda: predictor.expected_goals(index.view(home_ids, away_ids), 0.1))
+    from_dicts = _timed(lambda: predictor.expected_goals(FixtureTable.from_games(games), 0.1))
+    print(f"  features for {n_fixtures:,} fixtures: index {from_index * 1000:.1f} ms, "
+          f"rescanning game dicts {from_dicts * 1000:.1f} ms")
+
+
+def bench_ingest(n_rows: int = 2_000_000, n_fixtures: int = 1_000, n_events: int = 20_000) -> None:
+    """Streaming a multi-million-row results dump into a FeatureIndex, and in-play update latency."""
+    import gzip
+    import json
+    import os
+    import resource
+    import tempfile
+
+    import ingest
+    from features import FeatureIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'results.csv.gz')
+        jsonl_path = os.path.join(tmp, 'results.jsonl.gz')
+        with gzip.open(csv_path, 'wt', compresslevel=1) as f_csv, \
+                gzip.open(jsonl_path, 'wt', compresslevel=1) as f_jsonl:
+            f_csv.write('home_team,away_team,home_goals,away_goals\n')
+            written, seed = 0, 0
+            while written < n_rows:
+                season = make_season(seed=seed)[:n_rows - written]
+                f_csv.writelines(f"T{h},T{a},{hg},{ag}\n" for h, a, hg, ag in season)
+                f_jsonl.writelines(f'{{"home_team": "T{h}", "away_team": "T{a}", '
+                                   f'"home_goals": {hg}, "away_goals": {ag}}}\n' for h, a, hg, ag in season)
+                written += len(season)
+                seed += 1
+        print(f"ingest: {n_rows:,} results, gzipped")
+        for label, path in (('csv.gz', csv_path), ('jsonl.gz', jsonl_path)):
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            index = FeatureIndex()
+            elapsed = _timed(lambda: ingest.ingest_results(path, index))
+            grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+            print(f"  {label:<9} {n_rows / elapsed:10,.0f} results/s, peak RSS grew {grown / 1024:.1f} MB")
+
+        games = make_games(n_fixtures)
+        rng = random.Random(0)
+        events_path = os.path.join(tmp, 'live.jsonl')
+        with open(events_path, 'w') as f:
+            for i in range(n_events):
+                game = games[rng.randrange(n_fixtures)]
+                f.write(json.dumps({'ts': i, 'home_team': game['home_team'], 'away_team': game['away_team'],
+                                    'date': str(game['date']), 'minute': min(89, i * 90 // n_events),
+                                    'home_goals': rng.randint(0, 3), 'away_goals': rng.randint(0, 3),
+                                    'status': 'LIVE'}) + '\n')
+        tracker = ingest.InPlayTracker(games)
+        elapsed = _timed(lambda: asyncio.run(tracker.consume(ingest.replay_events(events_path))))
+        latencies = sorted(tracker.latencies)
+        p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+        print(f"  live: {n_events:,} events over {n_fixtures:,} fixtures, {n_events / elapsed:,.0f} events/s, "
+              f"latency p50 {p50 * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us")
+
+
+def bench_simulator(n_sims: int = 100_000, n_teams: int = 20) -> None:
+    """Monte Carlo seasons: a whole double round-robin of a 20-team league, one process vs the pool."""
+    import os
+
+    import simulator
+
+    names = [f"Club {i}" for i in range(n_teams)]
+    fixtures = make_games(n_teams * (n_teams - 1))
+    for game, (home, away) in zip(fixtures, [(h, a) for h in names for a in names if h != a]):
+        game['home_team'], game['away_team'], game['h2h'] = home, away, []
+    print(f"simulator: {n_sims:,} seasons of a {n_teams}-team league ({len(fixtures)} fixtures)")
+    for workers in sorted({1, os.cpu_count() or 1}):
+        elapsed = _timed(lambda: simulator.simulate_season(fixtures, n_sims=n_sims, workers=workers))
+        print(f"  {workers:>3} worker(s): {elapsed:6.2f} s ({n_sims / elapsed:10,.0f} seasons/s)")
+    import tracemalloc
+
+    for sims in (n_sims // 10, n_sims):
+        tracemalloc.start()
+        simulator.simulate_season(fixtures, n_sims=sims, workers=1)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {sims:>9,} seasons in one process: traced peak {peak / 2**20:.1f} MB")
+
+
+_COLD_START = """
+import time
+start = time.perf_counter()
+import machine_learning, benchmark
+imported = time.perf_counter()
+machine_learning.registry.get()
+loaded = time.perf_counter()
+machine_learning.predict_outcome_proba(benchmark.make_games(16))
+done = time.perf_counter()
+print(imported - start, loaded - imported, done - loaded)
+"""
+
+
+def bench_ml_model(n_train: int = 10_000) -> None:
+    """Trained 1X2 model: cold start (import, load, first batch) vs warm batched inference."""
+    import os
+    import subprocess
+    import tempfile
+
+    import joblib
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    import machine_learning
+    import train_model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.pkl')
+        X, y = train_model.training_set(train_model.synthetic_results(n_train))
+        joblib.dump(GradientBoostingClassifier(n_estimators=200, max_depth=3, random_state=0).fit(X, y), path)
+
+        env = dict(os.environ, SOCCER_MODEL_PATH=path)
+        out = subprocess.run([sys.executable, '-c', _COLD_START], env=env, capture_output=True, text=True,
+                             check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        imported, loaded, first = (float(x) * 1000 for x in out.split())
+        print("ml_model: GradientBoostingClassifier, 200 trees")
+        print(f"  cold: import {imported:.1f} ms, load {loaded:.1f} ms, first batch of 16 {first:.1f} ms")
+
+        machine_learning.registry.register('bench', path)
+        machine_learning.registry.get('bench')
+        for n in (1, 16, 1_000, 10_000):
+            games = make_games(n)
+            elapsed = _timed(lambda: machine_learning.predict_outcome_proba(games, model_name='bench'))
+            print(f"  warm: batch of {n:>6}: {elapsed * 1000:8.2f} ms ({elapsed / n * 1e6:8.1f} us/game)")
+
+
+def write_history_csv(path: str, n_leagues: int = 5, n_seasons: int = 10, teams_per_league: int = 20,
+                      seed: int = 0) -> int:
+    """Write double round-robin seasons in backtest.py's CSV format; returns the row count."""
+    import csv
+
+    import train_model
+
+    rng = random.Random(seed)
+    rows = []
+    for league in range(n_leagues):
+        strength = [rng.gauss(0, 0.3) for _ in range(teams_per_league)]
+        for season in range(n_seasons):
+            pairs = [(h, a) for h in range(teams_per_league) for a in range(teams_per_league) if h != a]
+            rng.shuffle(pairs)
+            kickoff = datetime.date(2010 + season, 8, 1)
+            for i, (h, a) in enumerate(pairs):
+                rows.append((kickoff + datetime.timedelta(days=7 * (i // (teams_per_league // 2))),
+                             f"L{league}", f"L{league} Team {h}", f"L{league} Team {a}",
+                             train_model._poisson(rng, 1.4 * 2.718 ** (strength[h] - strength[a])),
+                             train_model._poisson(rng, 1.1 * 2.718 ** (strength[a] - strength[h]))))
+    rows.sort(key=lambda row: row[0])
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'league', 'home_team', 'away_team', 'home_goals', 'away_goals'])
+        writer.writerows((date.isoformat(), *rest) for date, *rest in rows)
+    return len(rows)
+
+
+_STARTUP = """
+import sys, time
+start = time.perf_counter()
+import soccer
+soccer.load(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(elapsed, ' '.join(name for name in ('numpy', 'aiohttp', 'requests', 'telegram', 'pandas', 'sklearn')
+                        if name in sys.modules))
+"""
+
+
+def bench_startup(runs: int = 7, n_seasons: int = 10) -> None:
+    """Import time of each soccer.py command in a fresh interpreter, and the warm feature snapshot."""
+    import os
+    import statistics
+    import subprocess
+    import tempfile
+
+    import soccer
+    from features import FeatureSnapshot
+    from ingest import ingest_results
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    bare = statistics.median(_timed(lambda: subprocess.run([sys.executable, '-c', 'pass'], check=True))
+                             for _ in range(runs))
+    print(f"startup: median of {runs} fresh interpreters (bare interpreter {bare * 1000:.0f} ms wall)")
+    for command in soccer.COMMANDS:
+        times, loaded = [], ''
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-c', _STARTUP, command], capture_output=True, text=True, cwd=here)
+            if out.returncode:
+                break
+            elapsed, _, loaded = out.stdout.strip().partition(' ')
+            times.append(float(elapsed))
+        if len(times) < runs:
+            print(f"  {command:<10} unavailable: {out.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"  {command:<10} import {statistics.median(times) * 1000:>7.1f} ms  loads: {loaded or '-'}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.csv')
+        rows = write_history_csv(path, n_seasons=n_seasons)
+        replay = _timed(lambda: ingest_results(path))
+        FeatureSnapshot.from_index(ingest_results(path)).save(os.path.join(tmp, 'snapshot'))
+        load = _timed(lambda: FeatureSnapshot.load(os.path.join(tmp, 'snapshot')))
+        print(f"  warm features: replaying {rows:,} results {replay * 1000:.0f} ms, "
+              f"memory-mapping the snapshot {load * 1000:.1f} ms")
+
+
+def bench_backtest(n_leagues: int = 5, n_seasons: int = 10) -> None:
+    """Backtest throughput: matches/second per core, one process vs the whole pool."""
+    import os
+    import tempfile
+
+    import backtest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.csv')
+        n = write_history_csv(path, n_leagues, n_seasons)
+        print(f"backtest: {n_leagues} leagues x {n_seasons} seasons ({n} matches), all models")
+        for workers in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            stats, scored, cpu = backtest.backtest(path, workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f"  {workers:>3} worker(s): {elapsed:6.2f} s wall, {scored / elapsed:8.0f} matches/s, "
+                  f"{scored / cpu:8.0f} matches/s per core")
+
+
+def bench_instrumentation(n_spans: int = 200_000) -> None:
+    """Cost of one timing span, and the spans' share of a /today-sized predict_games call."""
+    from instrumentation import Metrics
+
+    metrics = Metrics()
+
+    def spans() -> None:
+        for _ in range(n_spans):
+            with metrics.span('bench', model='main_model'):
+                pass
+
+    elapsed = _timed(spans)
+    print(f"instrumentation: {elapsed / n_spans * 1e6:.2f} us per span")
+    games = make_games(16)
+    n_calls = 200
+    predict = _timed(lambda: [predictor.predict_games(games) for _ in range(n_calls)]) / n_calls
+    # predict_games opens six spans per chunk (features, ML model, three models, consensus)
+    print(f"  predict_games(16 games): {predict * 1e3:.2f} ms, spans {6 * elapsed / n_spans / predict:.2%} of it")
+
+
+def bench_subscriptions(n_chats: int = 50_000, n_games: int = 200) -> None:
+    """Fan-out of one slate to many filtered subscribers: per-chat loop vs shared plan."""
+    import subscriptions
+    from telegram_sender import OutboundSender
+
+    rng = random.Random(0)
+    leagues = [f"League {i}" for i in range(10)]
+    games = make_games(n_games)
+    for i, game in enumerate(games):
+        game['league'] = leagues[i % len(leagues)]
+    preds = predictor.predict_games(games)
+    registry = subscriptions.SubscriptionRegistry()
+    for chat_id in range(n_chats):
+        for _ in range(rng.randint(1, 2)):
+            registry.subscribe(chat_id, rng.choice(subscriptions.MARKETS), rng.choice((0.0, 0.5, 0.6, 0.7)),
+                               rng.choice(leagues + [subscriptions.ANY_LEAGUE]))
+
+    def render(position: int, game: Dict[str, Any], p: Dict[str, Any]) -> str:
+        main = p['main_model']
+        return (f"*Game {position + 1}: {game['home_team']} vs {game['away_team']}*\n"
+                f"  Outcome: {main['1x2'][0]} ({main['1x2'][1] * 100:.1f}%)  BTTS: {main['btts'][0]}\n")
+
+    def per_chat(chat_ids: List[int]) -> None:
+        # Baseline: every chat filters and renders the slate on its own
+        columns = subscriptions.predictor_markets(preds)
+        for chat_id in chat_ids:
+            matches = subscriptions.evaluate(games, columns, registry.filters(chat_id))
+            selected = sorted(set().union(*(m.tolist() for m in matches.values())))
+            subscriptions.pack_messages(['header'] + [render(pos, games[i], preds[i])
+                                                      for pos, i in enumerate(selected)])
+
+    sample = list(range(2_000))
+    loop = _timed(lambda: per_chat(sample)) * n_chats / len(sample)
+    start = time.perf_counter()
+    deliveries = subscriptions.plan(registry, games, preds, render, 'header')
+    planned = time.perf_counter() - start
+    n_messages = sum(len(d.chunks) * len(d.chat_ids) for d in deliveries)
+
+    async def transport(chat_id: Any, text: str, **kwargs) -> None:
+        return None
+
+    async def deliver() -> int:
+        # Unlimited rates: measures queueing and worker overhead, not Telegram's flood limits
+        sender = OutboundSender(transport, global_rate=1e12, private_rate=1e12, group_rate=1e12)
+        return await subscriptions.fan_out(sender, deliveries)
+
+    delivered = _timed(lambda: asyncio.run(deliver()))
+    print(f"subscriptions: {n_chats} chats, {len(registry.index)} distinct filters, "
+          f"{len(registry.groups)} filter sets, {n_games} fixtures")
+    print(f"  per-chat loop {loop:6.2f} s   plan {planned:6.3f} s ({loop / planned:.0f}x, "
+          f"{len(deliveries)} distinct message lists)")
+    print(f"  fan-out: {n_messages} messages queued and delivered in {delivered:.2f} s "
+          f"({n_messages / delivered:,.0f}/s)")
+
+
+def _legacy_render_game(idx: int, game: Dict[str, Any], preds: Dict[str, Any],
+                        esc: Callable[[Any], str] = str) -> str:
+    # bot.render_game before renderer.py: string += per line, form strings rebuilt, and no
+    # escaping unless ``esc`` escapes each value (renderer.escape: what it would take to be correct)
+    home = esc(game['home_team'])
+    away = esc(game['away_team'])
+    block = f"*Game {idx+1}: {home} vs {away}*\n"
+    block += f"Date: {esc(game['date'])}\n"
+    home_form = ''.join(['W' if x==3 else 'D' if x==1 else 'L' for x in game['team_forms']['home']])
+    away_form = ''.join(['W' if x==3 else 'D' if x==1 else 'L' for x in game['team_forms']['away']])
+    block += f"Form:\n  {home}: {home_form}\n  {away}: {away_form}\n"
+    block += f"Injuries: {len(game['injuries']['home'])} for {home}, {len(game['injuries']['away'])} for {away}\n"
+    block += f"Weather: {esc(game['weather'])}, Pitch: {esc(game['pitch'])}, Ref: {esc(game['referee'])}\n"
+    for title, name, detailed in (("Our AI Prediction", 'main_model', True), ("Hollywoodbets AI", 'hollywoodbets', False),
+                                  ("Betway AI", 'betway', False)):
+        p = preds[name]
+        block += f"\n*{title}:*\n"
+        block += f"  Outcome: {esc(p['1x2'][0])} (confidence: {esc(format(p['1x2'][1] * 100, '.1f'))}%)\n"
+        if detailed:
+            block += f"  BTTS: {esc(p['btts'][0])} (confidence: {esc(format(p['btts'][1] * 100, '.1f'))}%)\n"
+            block += (f"  Correct Score: {esc(p['correct_score'][0])} "
+                      f"(confidence: {esc(format(p['correct_score'][1] * 100, '.1f'))}%)\n")
+        else:
+            block += f"  BTTS: {esc(p['btts'][0])}\n"
+            block += f"  Correct Score: {esc(p['correct_score'][0])}\n"
+    block += "--------------------------------\n\n"
+    return block
+
+
+def bench_renderer(n_fixtures: int = 10_000, n_channels: int = 10) -> None:
+    """Rendering 10k fixture blocks: the old += renderer (raw and escaping) vs templates and the fragment cache."""
+    import renderer
+
+    games = make_games(n_fixtures)
+    preds = predictor.predict_games(games)
+    fixtures = list(zip(games, preds))
+    legacy = _timed(lambda: [_legacy_render_game(i, g, p) for i, (g, p) in enumerate(fixtures)])
+    escaped = _timed(lambda: [_legacy_render_game(i, g, p, renderer.escape) for i, (g, p) in enumerate(fixtures)])
+    render = renderer.game_renderer()
+    cold = _timed(lambda: [render(i, g, p) for i, (g, p) in enumerate(fixtures)])
+    # Every further message or channel that includes a fixture reuses its fragment
+    warm = _timed(lambda: [[render(i, g, p) for i, (g, p) in enumerate(fixtures)]
+                           for _ in range(n_channels)]) / n_channels
+    print(f"renderer: {n_fixtures} fixture blocks")
+    print(f"  legacy += {legacy * 1000:8.1f} ms (unescaped)   legacy += escaped {escaped * 1000:8.1f} ms")
+    print(f"  template {cold * 1000:8.1f} ms ({escaped / cold:.1f}x escaped legacy)   "
+          f"cached {warm * 1000:8.1f} ms per extra channel ({escaped / warm:.0f}x)")
+
+
+def bench_venues(latency: float = 0.05, n_matches: int = 90, n_lookups: int = 100_000) -> None:
+    """Weather for a matchday: one current-weather call per match vs batched per-city forecasts."""
+    import enrichment
+    import venues
+    from stub_api import StubAPI
+
+    registry = venues.default_registry()
+    names = [venue.name for venue in venues.DEFAULT_VENUES]
+    kickoff = datetime.datetime.now(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+    fixtures = [(names[i % len(names)], kickoff + datetime.timedelta(hours=3 * (i % 4))) for i in range(n_matches)]
+    print(f"venues: {n_matches} matches at {len(names)} venues, {latency * 1000:.0f} ms per upstream call")
+    with StubAPI(latency=latency) as stub:
+        weather_url = f"{stub.url}/data/2.5"
+        host_limits = {f"127.0.0.1:{stub.port}": 4 * enrichment.MAX_PER_HOST}
+
+        async def per_match():
+            async with enrichment.AsyncHTTPClient(host_limits=host_limits) as client:
+                await asyncio.gather(*(client.get_json(f"{weather_url}/weather", params={'q': name})
+                                       for name, _ in fixtures))
+
+        async def batched():
+            async with enrichment.AsyncHTTPClient(host_limits=host_limits) as client:
+                service = venues.WeatherService(client, weather_url, 'key', registry)
+                await service.forecasts(fixtures)
+                return service.requests
+
+        before = stub.request_count
+        single = _timed(lambda: asyncio.run(per_match()))
+        single_requests = stub.request_count - before
+        before = stub.request_count
+        batch = _timed(lambda: asyncio.run(batched()))
+        batch_requests = stub.request_count - before
+    print(f"  per match {single * 1000:>7.0f} ms ({single_requests} requests)   "
+          f"per city {batch * 1000:>7.0f} ms ({batch_requests} requests)")
+
+    rng = random.Random(0)
+    big = venues.VenueRegistry(venues.Venue(f"Ground {i}", '', rng.uniform(35, 60), rng.uniform(-10, 30))
+                               for i in range(20_000))
+    points = [(rng.uniform(35, 60), rng.uniform(-10, 30)) for _ in range(1_000)]
+    nearby = _timed(lambda: [big.nearby(lat, lon, 25) for lat, lon in points]) / len(points)
+    conditions = [rng.choice(['Clear', 'Rainy', 'light rain', 'Snow', None]) for _ in range(n_lookups)]
+    factors = _timed(lambda: venues.weather_factors(conditions))
+    print(f"  nearby(25 km) in 20k venues {nearby * 1e6:.0f} us   "
+          f"weather_factors {n_lookups / factors:,.0f} fixtures/s")
+
+
+def bench_store(n_days: int = 2_000, per_day: int = 100, days_per_write: int = 10) -> None:
+    """PredictionStore: bulk write throughput and /history, /accuracy latency at millions of rows."""
+    import os
+    import tempfile
+
+    from store import PredictionStore
+
+    slate = make_games(per_day)
+    preds = predictor.predict_games(slate)
+    first = datetime.date.today() - datetime.timedelta(days=n_days)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp, PredictionStore(os.path.join(tmp, 'store.db')) as store:
+        written = results = 0
+        start = time.perf_counter()
+        for d in range(0, n_days, days_per_write):
+            # A backfill writes several days per transaction
+            days = [first + datetime.timedelta(days=d + k) for k in range(min(days_per_write, n_days - d))]
+            games = [dict(game, date=day, league=f"League {i % 5}") for day in days for i, game in enumerate(slate)]
+            written += store.record_predictions(games, preds * len(days))
+            results += store.record_results({'date': g['date'], 'home_team': g['home_team'],
+                                             'away_team': g['away_team'], 'league': g['league'],
+                                             'home_goals': rng.randint(0, 4), 'away_goals': rng.randint(0, 3)}
+                                            for g in games)
+        elapsed = time.perf_counter() - start
+        last = first + datetime.timedelta(days=n_days - 1)
+        month = last - datetime.timedelta(days=29)
+        queries = {
+            'history day': lambda: store.history(last, last),
+            'history team 30d': lambda: store.history(month, last, team='Team 42'),
+            'accuracy 30d': lambda: store.accuracy(month, last),
+            'accuracy 30d model': lambda: store.accuracy(month, last, model='main_model'),
+            'accuracy all': lambda: store.accuracy(first, last),
+        }
+        print(f"store: {n_days * per_day:,} fixtures, {written:,} picks, {results:,} results")
+        print(f"  bulk writes {(written + results) / elapsed:>12,.0f} picks and results/s ({elapsed:.1f} s)")
+        for name, query in queries.items():
+            query()  # warm the page cache
+            print(f"  {name:<20} {_timed(query) * 1000:>8.2f} ms")
+
+
+def bench_odds(n_fixtures: int = 1_000, n_bookmakers: int = 20, n_updates: int = 500_000) -> None:
+    """OddsBook: snapshot updates per second with incremental value-bet recomputation."""
+    import numpy as np
+
+    import bookmaker_odds
+
+    games = make_games(n_fixtures)
+    book = bookmaker_odds.OddsBook()
+    keys = book.set_models(games)
+    rng = np.random.default_rng(0)
+    markets = list(bookmaker_odds.MARKETS.items())
+    # Opening prices: the model's probabilities, noised and with a 5% margin
+    opening = {}
+    for key in keys:
+        for market, selections in markets:
+            for b in range(n_bookmakers):
+                probs = book.model(key, market) * rng.uniform(0.9, 1.1, len(selections))
+                opening[key, market, b] = 1 / (probs / probs.sum() * 1.05)
+
+    def snapshots():
+        # A random walk: each update moves one bookmaker's prices for one market of one fixture
+        for t in range(n_updates):
+            key = keys[t % n_fixtures]
+            market, selections = markets[(t // n_fixtures) % len(markets)]
+            b = int(rng.integers(n_bookmakers))
+            prices = opening[key, market, b] = np.maximum(
+                1.01, opening[key, market, b] * np.exp(rng.normal(0, 0.01, len(selections))))
+            yield bookmaker_odds.OddsSnapshot(key, f'book {b}', market, float(t), tuple(prices.tolist()))
+
+    initial = [bookmaker_odds.OddsSnapshot(key, f'book {b}', market, -1.0, tuple(opening[key, market, b].tolist()))
+               for key in keys for market, _ in markets for b in range(n_bookmakers)]
+    book.apply(initial)
+    updates = list(snapshots())
+    book.stats.clear()
+    applied = book.apply(updates)
+    elapsed, evaluations = book.stats['seconds'], book.stats['evaluations']
+    history = book.history(keys[0], '1x2')['book 0']
+    print(f"odds: {n_fixtures:,} fixtures x {len(markets)} markets x {n_bookmakers} bookmakers")
+    print(f"  updates {book.updates_per_second:>12,.0f}/s ({applied:,} in {elapsed:.2f} s, "
+          f"{evaluations:,} market evaluations)")
+    print(f"  value bets {len(book.value_bets()):,}; line history of one market {len(history):,} snapshots")
+
+
+def bench_loadtest(n_updates: int = 2_000, concurrency: int = 1_000) -> None:
+    """Concurrent /today updates answered through the sender to the stub Bot API (see loadtest.py)."""
+    import loadtest
+    from stub_api import StubAPI
+
+    with StubAPI() as stub:
+        start = time.perf_counter()
+        latencies = asyncio.run(loadtest.run_in_process(stub, n_updates, concurrency, loadtest.NO_LIMIT,
+                                                        loadtest.NO_LIMIT))
+        elapsed = time.perf_counter() - start
+    print(f"loadtest: {n_updates} concurrent /today, no flood limits")
+    print(f"  {loadtest.report(latencies, elapsed)}")
+
+
+BENCHMARKS = {
+    "predict_games": bench_predict_games,
+    "score_matrices": bench_score_matrices,
+    "enrichment": bench_enrichment,
+    "daily_cache": bench_daily_cache,
+    "team_store": bench_team_store,
+    "features": bench_features,
+    "ml_model": bench_ml_model,
+    "backtest": bench_backtest,
+    "ingest": bench_ingest,
+    "simulator": bench_simulator,
+    "instrumentation": bench_instrumentation,
+    "subscriptions": bench_subscriptions,
+    "renderer": bench_renderer,
+    "venues": bench_venues,
+    "store": bench_store,
+    "loadtest": bench_loadtest,
+    "odds": bench_odds,
+    "startup": bench_startup,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
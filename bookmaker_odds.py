@@ -1,2 +1,410 @@
-# Add real odds (though excluded per request):
-# odds_api.get_odds(match_id)
+# bookmaker_odds.py
+"""Bookmaker odds: snapshots, overround removal, line movement and value bets.
+
+    book = OddsBook(min_edge=0.05)
+    book.set_models(games)                        # model probabilities per fixture and market
+    book.apply(read_snapshots('odds.csv'))        # or fetch_snapshots(client, ODDS_API_URL, key)
+    for bet in book.value_bets():
+        print(bet)
+
+A snapshot is one bookmaker's prices for one market of one fixture at one
+time. ``apply`` removes the overround of a whole batch with array
+operations, appends every snapshot to its (fixture, market, bookmaker)
+line history, and then re-evaluates only the (fixture, market) pairs the
+batch touched: the best price per selection across bookmakers is compared
+with the model's probability, and ``model_prob * price - 1 >= min_edge``
+flags a value bet.
+
+Model probabilities come from the main model's Dixon-Coles score matrices,
+the same ones predictor.predict_games picks from.
+"""
+import bisect
+import datetime
+import itertools
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+import predictor
+from instrumentation import metrics
+from team_store import FixtureTable
+
+logger = logging.getLogger(__name__)
+
+ODDS_API_URL = 'https://api.the-odds-api.com/v4'
+# Selections of each market, in price order
+MARKETS = {
+    '1x2': ('1', 'X', '2'),
+    'btts': ('Yes', 'No'),
+    'over_under': ('Over 2.5', 'Under 2.5'),
+}
+TOTALS_LINE = 2.5
+MIN_EDGE = 0.05  # expected return on a unit stake needed to flag a bet
+# Snapshots per apply() call when ingesting a stream
+APPLY_BATCH = 10_000
+
+FixtureKey = int  # predictor.fixture_id
+
+
+class OddsSnapshot(NamedTuple):
+    fixture: FixtureKey
+    bookmaker: str
+    market: str
+    timestamp: float  # seconds since the epoch
+    prices: Tuple[float, ...]  # decimal odds, in MARKETS[market] order
+
+
+class ValueBet(NamedTuple):
+    fixture: FixtureKey
+    market: str
+    selection: str
+    bookmaker: str  # offering the best price
+    price: float
+    model_prob: float
+    market_prob: float  # mean overround-free probability across bookmakers
+    edge: float  # model_prob * price - 1
+
+
+def fixture_key(home_team: str, away_team: str, date: Any) -> FixtureKey:
+    """The fixture_id of a game; ``date`` as in its game dict (a date or 'YYYY-MM-DD')."""
+    return predictor.fixture_id(home_team, away_team, str(date)[:10])
+
+
+# --- overround ------------------------------------------------------------------------
+
+def overround(prices: np.ndarray) -> np.ndarray:
+    """Bookmaker margin of each row of decimal odds (0.05 = 5%)."""
+    return (1 / prices).sum(axis=1) - 1
+
+
+def fair_probabilities(prices: np.ndarray, method: str = 'proportional') -> np.ndarray:
+    """Overround-free probabilities of each row of decimal odds.
+
+    'proportional' scales the implied probabilities to sum to one. 'power'
+    raises them to the exponent k that does, which takes more margin off
+    long shots, as bookmakers price them (favourite-longshot bias).
+    """
+    implied = 1 / np.asarray(prices, dtype=float)
+    if method == 'proportional':
+        return implied / implied.sum(axis=1, keepdims=True)
+    if method == 'power':
+        # Newton's method on sum(p ** k) = 1, every row at once; k = 1 when there is no margin
+        k = np.ones((len(implied), 1))
+        log_p = np.log(implied)
+        for _ in range(20):
+            powered = implied ** k
+            excess = powered.sum(axis=1, keepdims=True) - 1
+            k -= excess / (powered * log_p).sum(axis=1, keepdims=True)
+            if np.all(np.abs(excess) < 1e-12):
+                break
+        fair = implied ** k
+        return fair / fair.sum(axis=1, keepdims=True)
+    raise ValueError(f"Unknown overround method {method!r}; expected 'proportional' or 'power'")
+
+
+# --- model probabilities --------------------------------------------------------------
+
+def model_probabilities(games: Sequence[Dict[str, Any]],
+                        model: predictor.AIModel = predictor.main_model) -> Dict[str, np.ndarray]:
+    """Probability of every selection of every market, shape (n, selections) per market.
+
+    Read from predictor.model_matrices, as predict_games does, so the main
+    model's markets follow the trained 1X2 when one is loaded.
+    """
+    games = list(games)
+    matrix_set = predictor.model_matrices(model, FixtureTable.from_games(games), predictor.game_weather(games), games)
+    over = 1 - matrix_set.totals_cdf[:, int(TOTALS_LINE)]
+    return {
+        '1x2': matrix_set.outcome_probs,
+        'btts': np.column_stack([matrix_set.btts, 1 - matrix_set.btts]),
+        'over_under': np.column_stack([over, 1 - over]),
+    }
+
+
+# --- line history ---------------------------------------------------------------------
+
+class LineHistory:
+    """Time-ordered prices and fair probabilities of one bookmaker's market for one fixture."""
+    __slots__ = ('times', 'prices', 'fair')
+
+    def __init__(self):
+        self.times: List[float] = []
+        self.prices: List[Tuple[float, ...]] = []
+        self.fair: List[np.ndarray] = []
+
+    def append(self, timestamp: float, prices: Tuple[float, ...], fair: np.ndarray) -> bool:
+        """Record a snapshot; False if it arrived late and is not the latest."""
+        if self.times and timestamp < self.times[-1]:
+            # Late snapshot: keep the history ordered
+            i = bisect.bisect_right(self.times, timestamp)
+            self.times.insert(i, timestamp)
+            self.prices.insert(i, prices)
+            self.fair.insert(i, fair)
+            return False
+        self.times.append(timestamp)
+        self.prices.append(prices)
+        self.fair.append(fair)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def at(self, timestamp: float) -> Optional[Tuple[float, ...]]:
+        """Prices in force at ``timestamp`` (the last snapshot at or before it)."""
+        i = bisect.bisect_right(self.times, timestamp)
+        return self.prices[i - 1] if i else None
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(times, prices, fair probabilities) as arrays, one row per snapshot."""
+        return np.array(self.times), np.array(self.prices), np.array(self.fair)
+
+    def movement(self) -> np.ndarray:
+        """Change of each selection's fair probability from the first snapshot to the last."""
+        return self.fair[-1] - self.fair[0] if self.fair else np.zeros(0)
+
+
+class MarketLines:
+    """Every bookmaker's line of one fixture's market, with the latest prices kept as one matrix.
+
+    ``prices`` and ``fair`` have a row per bookmaker (in ``bookmakers``
+    order) and a column per selection, so evaluating the market is a
+    couple of array operations however many bookmakers price it.
+    """
+    __slots__ = ('bookmakers', 'lines', 'prices', 'fair', '_rows')
+
+    def __init__(self, width: int):
+        self.bookmakers: List[str] = []
+        self.lines: List[LineHistory] = []
+        self.prices = np.empty((0, width))
+        self.fair = np.empty((0, width))
+        self._rows: Dict[str, int] = {}
+
+    def update(self, bookmaker: str, timestamp: float, prices: Tuple[float, ...], fair: np.ndarray) -> None:
+        row = self._rows.get(bookmaker)
+        if row is None:
+            row = self._rows[bookmaker] = len(self.bookmakers)
+            self.bookmakers.append(bookmaker)
+            self.lines.append(LineHistory())
+            if row == len(self.prices):
+                # Grow by doubling so adding bookmakers stays amortized O(1)
+                self.prices = np.concatenate([self.prices, np.ones((max(row, 4), self.prices.shape[1]))])
+                self.fair = np.concatenate([self.fair, np.zeros((max(row, 4), self.fair.shape[1]))])
+        if self.lines[row].append(timestamp, prices, fair):
+            self.prices[row] = prices
+            self.fair[row] = fair
+
+    def latest(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(prices, fair probabilities) of every bookmaker's latest snapshot."""
+        n = len(self.bookmakers)
+        return self.prices[:n], self.fair[:n]
+
+    def __getitem__(self, bookmaker: str) -> LineHistory:
+        return self.lines[self._rows[bookmaker]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.bookmakers)
+
+    def __len__(self) -> int:
+        return len(self.bookmakers)
+
+
+# --- the book -------------------------------------------------------------------------
+
+class OddsBook:
+    """Latest prices, line histories and value bets, updated incrementally.
+
+    ``stats`` counts applied and rejected snapshots, (fixture, market)
+    evaluations and the seconds spent in apply; an evaluation looks at one
+    fixture's bookmakers only.
+    """
+    def __init__(self, min_edge: float = MIN_EDGE, method: str = 'proportional'):
+        self.min_edge = min_edge
+        self.method = method
+        self.stats: Counter = Counter()
+        self._lines: Dict[Tuple[FixtureKey, str], MarketLines] = {}
+        self._models: Dict[FixtureKey, Dict[str, np.ndarray]] = {}
+        self._value: Dict[Tuple[FixtureKey, str], List[ValueBet]] = {}
+
+    # --- inputs -------------------------------------------------------------------
+
+    def set_model(self, fixture: FixtureKey, probabilities: Dict[str, np.ndarray]) -> None:
+        """Model probabilities of one fixture, market -> one per selection; re-evaluates it."""
+        self._models[fixture] = probabilities
+        for market in probabilities:
+            if (fixture, market) in self._lines:
+                self._evaluate(fixture, market)
+
+    def set_models(self, games: Sequence[Dict[str, Any]],
+                   model: predictor.AIModel = predictor.main_model) -> List[FixtureKey]:
+        """Model probabilities of a slate, computed in one vectorized pass; returns the fixture keys."""
+        probs = model_probabilities(games, model)
+        keys = [fixture_key(game['home_team'], game['away_team'], game['date']) for game in games]
+        for i, key in enumerate(keys):
+            self.set_model(key, {market: values[i] for market, values in probs.items()})
+        return keys
+
+    def model(self, fixture: FixtureKey, market: str) -> Optional[np.ndarray]:
+        return self._models.get(fixture, {}).get(market)
+
+    def apply(self, snapshots: Iterable[OddsSnapshot]) -> int:
+        """Ingest snapshots in batches of APPLY_BATCH; returns how many were applied.
+
+        Within a batch, the overround of every snapshot is removed at once and
+        each touched (fixture, market) is re-evaluated once, however many of
+        its prices moved.
+        """
+        applied = 0
+        iterator = iter(snapshots)
+        while True:
+            batch = list(itertools.islice(iterator, APPLY_BATCH))
+            if not batch:
+                return applied
+            start = time.perf_counter()
+            with metrics.span('odds_apply'):
+                applied += self._apply_batch(batch)
+            self.stats['seconds'] += time.perf_counter() - start
+
+    @property
+    def updates_per_second(self) -> float:
+        """Snapshots applied per second of apply() so far."""
+        return self.stats['applied'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+    def _apply_batch(self, batch: List[OddsSnapshot]) -> int:
+        touched: Set[Tuple[FixtureKey, str]] = set()
+        applied = 0
+        for market, selections in MARKETS.items():
+            rows = [s for s in batch if s.market == market and len(s.prices) == len(selections)]
+            if not rows:
+                continue
+            prices = np.array([s.prices for s in rows], dtype=float)
+            valid = np.all(prices > 1.0, axis=1)
+            fair = fair_probabilities(np.where(valid[:, None], prices, 2.0), self.method)
+            for snapshot, ok, probs in zip(rows, valid.tolist(), fair):
+                if not ok:
+                    continue
+                key = (snapshot.fixture, market)
+                lines = self._lines.get(key)
+                if lines is None:
+                    lines = self._lines[key] = MarketLines(len(selections))
+                lines.update(snapshot.bookmaker, snapshot.timestamp, snapshot.prices, probs)
+                touched.add(key)
+                applied += 1
+        self.stats['applied'] += applied
+        self.stats['rejected'] += len(batch) - applied
+        for fixture, market in touched:
+            self._evaluate(fixture, market)
+        return applied
+
+    # --- evaluation ---------------------------------------------------------------
+
+    def _evaluate(self, fixture: FixtureKey, market: str) -> None:
+        self.stats['evaluations'] += 1
+        key = (fixture, market)
+        model = self.model(fixture, market)
+        lines = self._lines.get(key)
+        if model is None or not lines:
+            self._value.pop(key, None)
+            return
+        prices, fair = lines.latest()
+        best = prices.argmax(axis=0)
+        best_price = prices[best, np.arange(prices.shape[1])]
+        edge = model * best_price - 1
+        flagged = np.flatnonzero(edge >= self.min_edge)
+        if not len(flagged):
+            self._value.pop(key, None)
+            return
+        market_prob = fair.mean(axis=0)
+        self._value[key] = [ValueBet(fixture, market, MARKETS[market][k], lines.bookmakers[best[k]],
+                                     float(best_price[k]), float(model[k]), float(market_prob[k]), float(edge[k]))
+                            for k in flagged.tolist()]
+
+    # --- queries ------------------------------------------------------------------
+
+    def value_bets(self, fixture: Optional[FixtureKey] = None) -> List[ValueBet]:
+        """Current value bets, best edge first."""
+        bets = (self._value.get((fixture, market), []) for market in MARKETS) if fixture is not None \
+            else self._value.values()
+        return sorted((bet for group in bets for bet in group), key=lambda bet: -bet.edge)
+
+    def history(self, fixture: FixtureKey, market: str) -> Optional[MarketLines]:
+        """Line history of one fixture's market; ``history(f, m)[bookmaker]`` is a LineHistory."""
+        return self._lines.get((fixture, market))
+
+    def consensus(self, fixture: FixtureKey, market: str) -> Optional[np.ndarray]:
+        """Mean overround-free probabilities across the bookmakers' latest prices."""
+        lines = self._lines.get((fixture, market))
+        return lines.latest()[1].mean(axis=0) if lines else None
+
+
+# --- sources --------------------------------------------------------------------------
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    when = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    return when.timestamp()
+
+
+def read_snapshots(path: str) -> Iterator[OddsSnapshot]:
+    """Snapshots from a file of one price per row (CSV, JSON lines or Parquet, see ingest.read_records).
+
+    Columns: timestamp, home_team, away_team, date, bookmaker, market,
+    selection and price. The rows of one snapshot are consecutive; one
+    missing a selection is skipped.
+    """
+    from ingest import read_records
+
+    def key(row: Dict[str, Any]) -> Tuple[Any, ...]:
+        return row['timestamp'], row['home_team'], row['away_team'], row['date'], row['bookmaker'], row['market']
+
+    for (timestamp, home, away, date, bookmaker, market), rows in itertools.groupby(read_records(path), key):
+        selections = MARKETS.get(market)
+        if selections is None:
+            continue
+        prices = {row['selection']: float(row['price']) for row in rows}
+        if all(selection in prices for selection in selections):
+            yield OddsSnapshot(fixture_key(home, away, date), bookmaker, market, _timestamp(timestamp),
+                               tuple(prices[selection] for selection in selections))
+        else:
+            logger.warning("Skipping incomplete %s snapshot of %s v %s from %s", market, home, away, bookmaker)
+
+
+def snapshots_from_odds_api(events: Sequence[Dict[str, Any]]) -> List[OddsSnapshot]:
+    """Snapshots from an Odds API style /sports/{sport}/odds response (h2h, totals and btts markets)."""
+    snapshots = []
+    for event in events:
+        home, away = event['home_team'], event['away_team']
+        fixture = fixture_key(home, away, event['commence_time'][:10])
+        names = {home: '1', 'Draw': 'X', away: '2'}
+        for bookmaker in event.get('bookmakers', []):
+            timestamp = _timestamp(bookmaker['last_update'])
+            for market in bookmaker.get('markets', []):
+                outcomes = market['outcomes']
+                if market['key'] == 'h2h':
+                    prices = {names.get(o['name']): o['price'] for o in outcomes}
+                    name = '1x2'
+                elif market['key'] == 'totals':
+                    prices = {f"{o['name']} {o.get('point')}": o['price'] for o in outcomes
+                              if o.get('point') == TOTALS_LINE}
+                    name = 'over_under'
+                elif market['key'] == 'btts':
+                    prices = {o['name']: o['price'] for o in outcomes}
+                    name = 'btts'
+                else:
+                    continue
+                if all(selection in prices for selection in MARKETS[name]):
+                    snapshots.append(OddsSnapshot(fixture, bookmaker['key'], name, timestamp,
+                                                  tuple(float(prices[s]) for s in MARKETS[name])))
+    return snapshots
+
+
+async def fetch_snapshots(client, odds_url: str, api_key: str, sport: str = 'soccer_epl') -> List[OddsSnapshot]:
+    """Current odds of ``sport`` through an enrichment.AsyncHTTPClient."""
+    events = await client.get_json(f"{odds_url}/sports/{sport}/odds", params={
+        'apiKey': api_key, 'regions': 'uk,eu', 'markets': 'h2h,totals,btts', 'oddsFormat': 'decimal'})
+    return snapshots_from_odds_api(events)
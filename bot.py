@@ -1,10 +1,20 @@
 # bot.py
+import asyncio
+import datetime
 import logging
+import os
+import socket
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
-import data_fetcher
-import predictor
-from datetime import datetime
+import renderer
+import subscriptions
+from daily_cache import DailyPredictions, PRECOMPUTE_INTERVAL, respond_today
+from instrumentation import metrics, profiled
+from shared_state import open_state
+from store import PredictionStore
+from subscriptions import SubscriptionRegistry
+from telegram_sender import OutboundSender, PTBTransport
+from workers import PredictionPool
 
 # Enable logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
@@ -13,70 +23,192 @@ logger = logging.getLogger(__name__)
 # Replace with your Telegram Bot Token
 TOKEN = "YOUR_TELEGRAM_BOT_TOKEN"
 
+# Set SOCCER_WEBHOOK_URL (the public https URL Telegram posts to) to run behind a webhook instead of polling
+WEBHOOK_URL = os.environ.get('SOCCER_WEBHOOK_URL')
+WEBHOOK_LISTEN = os.environ.get('SOCCER_WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.environ.get('SOCCER_WEBHOOK_PORT', '8443'))
+WEBHOOK_SECRET = os.environ.get('SOCCER_WEBHOOK_SECRET')
+# Point the bot at another Bot API server, e.g. stub_api.py for load tests
+TELEGRAM_API_URL = os.environ.get('SOCCER_TELEGRAM_API_URL')
+# Names this process in the shared refresh lease
+REPLICA_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+# Compiled once; each fixture's block is rendered once and shared by /today and the subscriptions push
+HEADER = renderer.TODAY_HEADER
+render_game = renderer.game_renderer()
+
 async def send_predictions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send the predictions for today's games."""
-    # Fetch today's games
-    games = data_fetcher.fetch_todays_games()
-    if not games:
-        await update.message.reply_text("No games today.")
+    with profiled('today'), metrics.span('command', command='today'):
+        await respond_today(context.bot_data['daily'], context.bot_data['sender'], update.effective_chat.id,
+                            context.bot_data['state'], parse_mode=renderer.PARSE_MODE)
+
+async def subscribe(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/subscribe <market> [min confidence %] [league], e.g. /subscribe fire 70"""
+    registry = context.bot_data['subscriptions']
+    sender = context.bot_data['sender']
+    chat_id = update.effective_chat.id
+    args = context.args or []
+    try:
+        market = args[0].lower()
+        threshold = float(args[1]) / 100 if len(args) > 1 else 0.0
+        league = ' '.join(args[2:]) or subscriptions.ANY_LEAGUE
+        registry.subscribe(chat_id, market, threshold, league)
+    except (IndexError, ValueError) as e:
+        await sender.send(chat_id, f"Usage: /subscribe <market> [min confidence %] [league]\n"
+                                   f"Markets: {', '.join(subscriptions.MARKETS)}"
+                                   + (f"\n{e}" if isinstance(e, ValueError) else ''))
         return
+    registry.save()
+    await sender.send(chat_id, f"Subscribed to {market} picks at {threshold:.0%}+ confidence"
+                               f" in {'all leagues' if league == subscriptions.ANY_LEAGUE else league}.")
+
+async def unsubscribe(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/unsubscribe [market]: drop one market's filters, or all of them."""
+    registry = context.bot_data['subscriptions']
+    chat_id = update.effective_chat.id
+    market = context.args[0].lower() if context.args else None
+    removed = registry.unsubscribe(chat_id, market)
+    if removed:
+        registry.save()
+    await context.bot_data['sender'].send(chat_id, f"Removed {removed} subscription(s).")
+
+async def list_subscriptions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/subscriptions: this chat's filters."""
+    chat_id = update.effective_chat.id
+    filters = sorted(context.bot_data['subscriptions'].filters(chat_id))
+    lines = [f"{f.market} at {f.threshold:.0%}+ in {'all leagues' if f.league == subscriptions.ANY_LEAGUE else f.league}"
+             for f in filters]
+    await context.bot_data['sender'].send(chat_id, '\n'.join(lines) or "No subscriptions. Try /subscribe fire 70")
+
+def _days_and_rest(args, default_days):
+    """Leading number of days, if any, and the remaining words."""
+    if args and args[0].isdigit():
+        return max(1, int(args[0])), ' '.join(args[1:]) or None
+    return default_days, ' '.join(args) or None
+
+def format_history(rows):
+    lines = []
+    for row in rows:
+        pick, confidence = row.picks.get('1x2', ('-', 0.0))
+        if row.score is None:
+            played, mark = "vs", ""
+        else:
+            home_goals, away_goals = row.score
+            outcome = '1' if home_goals > away_goals else 'X' if home_goals == away_goals else '2'
+            played, mark = f"{home_goals}-{away_goals}", " ✅" if pick == outcome else " ❌"
+        lines.append(f"{row.date} {row.home_team} {played} {row.away_team}: {pick} ({confidence:.0%}){mark}")
+    return lines
+
+def format_accuracy(stats, days):
+    lines = [f"Hit rate over the last {days} day(s):"]
+    for (model, market), acc in stats.items():
+        lines.append(f"{model} {market}: {acc.hit_rate:.0%} of {acc.n} (avg confidence {acc.mean_confidence:.0%})")
+    return '\n'.join(lines)
 
-    # For each game, get predictions
-    message = "⚽️ *Today's Soccer Predictions* ⚽️\n\n"
-    message += "_(Predictions by our AI, Hollywoodbets AI, and Betway AI)_\n\n"
-
-    for idx, game in enumerate(games):
-        home = game['home_team']
-        away = game['away_team']
-        message += f"*Game {idx+1}: {home} vs {away}*\n"
-        message += f"Date: {game['date']}\n"
-        # Add a brief on form, injuries, etc.
-        home_form = ''.join(['W' if x==3 else 'D' if x==1 else 'L' for x in game['team_forms']['home']])
-        away_form = ''.join(['W' if x==3 else 'D' if x==1 else 'L' for x in game['team_forms']['away']])
-        message += f"Form:\n  {home}: {home_form}\n  {away}: {away_form}\n"
-        message += f"Injuries: {len(game['injuries']['home'])} for {home}, {len(game['injuries']['away'])} for {away}\n"
-        message += f"Weather: {game['weather']}, Pitch: {game['pitch']}, Ref: {game['referee']}\n"
-
-        # Get predictions
-        preds = predictor.predict_game(game)
-
-        # Main model predictions
-        main = preds['main_model']
-        message += "\n*Our AI Prediction:*\n"
-        message += f"  Outcome: {main['1x2'][0]} (confidence: {main['1x2'][1]*100:.1f}%)\n"
-        message += f"  BTTS: {main['btts'][0]} (confidence: {main['btts'][1]*100:.1f}%)\n"
-        message += f"  Correct Score: {main['correct_score'][0]} (confidence: {main['correct_score'][1]*100:.1f}%)\n"
-
-        # Hollywoodbets
-        holly = preds['hollywoodbets']
-        message += "\n*Hollywoodbets AI:*\n"
-        message += f"  Outcome: {holly['1x2'][0]} (confidence: {holly['1x2'][1]*100:.1f}%)\n"
-        message += f"  BTTS: {holly['btts'][0]}\n"  # We might not have confidence for them? We do, but let's show
-        message += f"  Correct Score: {holly['correct_score'][0]}\n"
-
-        # Betway
-        betway = preds['betway']
-        message += "\n*Betway AI:*\n"
-        message += f"  Outcome: {betway['1x2'][0]} (confidence: {betway['1x2'][1]*100:.1f}%)\n"
-        message += f"  BTTS: {betway['btts'][0]}\n"
-        message += f"  Correct Score: {betway['correct_score'][0]}\n"
-
-        message += "--------------------------------\n\n"
-
-    # Send the message (note: Telegram messages have a limit of 4096 characters, so we might need to split)
-    # For now, we assume the message is not too long (5 games should be okay)
-    await update.message.reply_text(message, parse_mode='Markdown')
-
-def main() -> None:
+async def history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/history [days] [team]: past picks and how they went, yesterday by default."""
+    days, team = _days_and_rest(context.args or [], 1)
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    with metrics.span('command', command='history'):
+        rows = await asyncio.to_thread(context.bot_data['store'].history,
+                                       end - datetime.timedelta(days=days - 1), end, team)
+        lines = format_history(rows) or ["No stored predictions for that period."]
+        # One line per fixture; long periods are packed into several messages
+        await context.bot_data['sender'].send_parts(update.effective_chat.id, lines, separator='\n')
+
+async def accuracy(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/accuracy [days] [model]: hit rate per market of the settled predictions, 30 days by default."""
+    days, model = _days_and_rest(context.args or [], 30)
+    today = datetime.date.today()
+    with metrics.span('command', command='accuracy'):
+        stats = await asyncio.to_thread(context.bot_data['store'].accuracy,
+                                        today - datetime.timedelta(days=days), today, model)
+        await context.bot_data['sender'].send(update.effective_chat.id,
+                                              format_accuracy(stats, days) if stats else "No settled predictions yet.")
+
+async def push_subscriptions(daily: DailyPredictions, sender: OutboundSender, registry: SubscriptionRegistry) -> None:
+    """Send every subscriber today's fixtures that match their filters."""
+    with metrics.span('fan_out'):
+        deliveries = subscriptions.plan(registry, daily.games, daily.predictions, render_game, HEADER)
+        logger.info("Pushing today's predictions: %d chats, %d distinct messages",
+                    sum(len(d.chat_ids) for d in deliveries), len(deliveries))
+        await subscriptions.fan_out(sender, deliveries, parse_mode=renderer.PARSE_MODE)
+
+async def refresh_daily_predictions(daily: DailyPredictions, sender: OutboundSender,
+                                    registry: SubscriptionRegistry, state) -> None:
+    """Scheduled precompute: refresh today's predictions every PRECOMPUTE_INTERVAL seconds.
+
+    Only the replica holding the refresh lease predicts; it publishes the
+    result to ``state`` and the other replicas pick it up from there. The
+    first refresh of each day also pushes the slate to the subscribers, once
+    across all replicas.
+    """
+    pushed, push_task = None, None
+    while True:
+        try:
+            if not await asyncio.to_thread(state.acquire, 'daily_refresh', REPLICA_ID, 2 * PRECOMPUTE_INTERVAL):
+                await asyncio.to_thread(daily.sync, state)
+            else:
+                await asyncio.to_thread(daily.refresh)
+                await asyncio.to_thread(daily.publish, state)
+            if (daily.day != pushed and daily.games
+                    and await asyncio.to_thread(state.acquire, f"push:{daily.day}", REPLICA_ID, 2 * 86400)):
+                pushed = daily.day
+                # Delivery is paced by the flood limits; keep refreshing meanwhile
+                push_task = asyncio.ensure_future(push_subscriptions(daily, sender, registry))
+        except Exception:
+            logger.exception("Refreshing today's predictions failed")
+        metrics.dump()
+        await asyncio.sleep(PRECOMPUTE_INTERVAL)
+
+async def post_init(application: Application) -> None:
+    """Create the shared sender, prediction pool and cache, and start the precompute job."""
+    sender = application.bot_data['sender'] = OutboundSender(PTBTransport(application.bot))
+    metrics.register_collector('sender', lambda: (
+        ('sender_events_total', {'event': event}, count) for event, count in list(sender.metrics.items())))
+    store = application.bot_data['store'] = PredictionStore()
+    state = application.bot_data['state'] = open_state()
+    # Predictions run in worker processes; the event loop only serves precomputed chunks
+    pool = application.bot_data['pool'] = PredictionPool()
+    daily = application.bot_data['daily'] = DailyPredictions(render_game, HEADER, predict=pool, store=store)
+    registry = application.bot_data['subscriptions'] = SubscriptionRegistry.load()
+    application.create_task(refresh_daily_predictions(daily, sender, registry, state))
+
+async def post_shutdown(application: Application) -> None:
+    application.bot_data['pool'].close()
+    application.bot_data['store'].close()
+    application.bot_data['state'].close()
+
+def main(argv=None) -> None:
     """Start the bot."""
-    # Create the Application and pass it your bot's token.
-    application = Application.builder().token(TOKEN).build()
+    import argparse
+
+    argparse.ArgumentParser(description='Run the Telegram bot (polling, or a webhook with SOCCER_WEBHOOK_URL)'
+                            ).parse_args(argv)
+    # Create the Application and pass it your bot's token; updates are handled concurrently,
+    # so one chat waiting on a send never holds up the others
+    builder = (Application.builder().token(TOKEN).post_init(post_init).post_shutdown(post_shutdown)
+               .concurrent_updates(True))
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(f"{TELEGRAM_API_URL}/bot")
+    application = builder.build()
 
     # on different commands - answer in Telegram
     application.add_handler(CommandHandler("today", send_predictions))
+    application.add_handler(CommandHandler("subscribe", subscribe))
+    application.add_handler(CommandHandler("unsubscribe", unsubscribe))
+    application.add_handler(CommandHandler("subscriptions", list_subscriptions))
+    application.add_handler(CommandHandler("history", history))
+    application.add_handler(CommandHandler("accuracy", accuracy))
 
     # Run the bot until the user presses Ctrl-C
-    application.run_polling()
+    if WEBHOOK_URL:
+        # Telegram posts updates to WEBHOOK_URL/<token>; run any number of replicas behind a load balancer
+        application.run_webhook(listen=WEBHOOK_LISTEN, port=WEBHOOK_PORT, url_path=TOKEN,
+                                webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{TOKEN}", secret_token=WEBHOOK_SECRET)
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,218 @@
+# cache.py
+"""Response cache for the rate-limited upstream APIs.
+
+Entries live in a backend (in-memory LRU, or SQLite on disk so the cache
+survives between cron runs) and expire per endpoint class. Once an entry is
+older than its TTL it is still served for a further stale window while one
+background refresh fetches the new value (stale-while-revalidate).
+"""
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+# Fresh lifetime in seconds per endpoint class
+TTLS = {
+    'fixtures': 10 * 60,
+    'injuries': 60 * 60,
+    'weather': 30 * 60,
+}
+DEFAULT_TTL = 10 * 60
+# How long past its TTL an entry may still be served while it is refreshed
+STALE_WINDOW = 10 * 60
+LRU_MAX_ENTRIES = 4096
+
+# Set to a file path to keep the cache on disk between runs
+CACHE_DB_PATH = os.environ.get('SOCCER_CACHE_DB')
+
+
+class LRUBackend:
+    """In-memory backend evicting the least recently used entry."""
+    def __init__(self, max_entries: int = LRU_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """On-disk backend; values are pickled, so only point it at a trusted local file."""
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                           '(key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL)')
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute('SELECT value, stored_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)',
+                               (key, blob, stored_at))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class ResponseCache:
+    """TTL cache in front of an upstream fetch, with hit/miss counters.
+
+    ``get`` is for blocking fetch functions and revalidates in a thread;
+    ``aget`` is for coroutine functions and revalidates in a task. Values
+    returned from the cache are shared, so callers must not mutate them.
+    """
+    def __init__(self, backend=None, ttls: Optional[Dict[str, float]] = None,
+                 stale_window: float = STALE_WINDOW, clock: Callable[[], float] = time.time):
+        self.backend = backend if backend is not None else LRUBackend()
+        self.ttls = dict(TTLS, **(ttls or {}))
+        self.stale_window = stale_window
+        self.clock = clock
+        # Counters keyed by (endpoint class, 'hit' | 'stale' | 'miss' | 'refresh' | 'error')
+        self.stats: Counter = Counter()
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, endpoint: str, key: str) -> Tuple[str, Optional[Any]]:
+        """Return ('hit' | 'stale' | 'miss', cached value)."""
+        entry = self.backend.get(f"{endpoint}:{key}")
+        if entry is None:
+            return 'miss', None
+        value, stored_at = entry
+        age = self.clock() - stored_at
+        ttl = self.ttls.get(endpoint, DEFAULT_TTL)
+        if age <= ttl:
+            return 'hit', value
+        if age <= ttl + self.stale_window:
+            return 'stale', value
+        return 'miss', None
+
+    def _store(self, endpoint: str, key: str, value: Any) -> None:
+        self.backend.set(f"{endpoint}:{key}", value, self.clock())
+
+    def _count(self, endpoint: str, event: str) -> None:
+        # Refresh threads count too, and Counter += is not atomic
+        with self._lock:
+            self.stats[endpoint, event] += 1
+
+    def _claim_refresh(self, full_key: str) -> bool:
+        with self._lock:
+            if full_key in self._refreshing:
+                return False
+            self._refreshing.add(full_key)
+            return True
+
+    def _release_refresh(self, full_key: str) -> None:
+        with self._lock:
+            self._refreshing.discard(full_key)
+
+    def get(self, endpoint: str, key: str, fetch: Callable[[], Any]) -> Any:
+        state, value = self._lookup(endpoint, key)
+        self._count(endpoint, state)
+        if state == 'hit':
+            return value
+        if state == 'stale':
+            full_key = f"{endpoint}:{key}"
+            if self._claim_refresh(full_key):
+                threading.Thread(target=self._refresh, args=(endpoint, key, fetch), daemon=True).start()
+            return value
+        value = fetch()
+        self._store(endpoint, key, value)
+        return value
+
+    def _refresh(self, endpoint: str, key: str, fetch: Callable[[], Any]) -> None:
+        try:
+            self._store(endpoint, key, fetch())
+            self._count(endpoint, 'refresh')
+        except Exception:
+            self._count(endpoint, 'error')
+            logger.warning("Background refresh of %s:%s failed", endpoint, key, exc_info=True)
+        finally:
+            self._release_refresh(f"{endpoint}:{key}")
+
+    async def aget(self, endpoint: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        state, value = self._lookup(endpoint, key)
+        self._count(endpoint, state)
+        if state == 'hit':
+            return value
+        if state == 'stale':
+            full_key = f"{endpoint}:{key}"
+            if self._claim_refresh(full_key):
+                task = asyncio.ensure_future(self._arefresh(endpoint, key, fetch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+        # Concurrent misses for the same key share one upstream call
+        full_key = f"{endpoint}:{key}"
+        pending = self._inflight.get(full_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        pending = asyncio.ensure_future(fetch())
+        self._inflight[full_key] = pending
+        try:
+            value = await asyncio.shield(pending)
+        finally:
+            del self._inflight[full_key]
+        self._store(endpoint, key, value)
+        return value
+
+    async def _arefresh(self, endpoint: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            self._store(endpoint, key, await fetch())
+            self._count(endpoint, 'refresh')
+        except Exception:
+            self._count(endpoint, 'error')
+            logger.warning("Background refresh of %s:%s failed", endpoint, key, exc_info=True)
+        finally:
+            self._release_refresh(f"{endpoint}:{key}")
+
+    def hit_rate(self, endpoint: str) -> float:
+        served = self.stats[endpoint, 'hit'] + self.stats[endpoint, 'stale']
+        total = served + self.stats[endpoint, 'miss']
+        return served / total if total else 0.0
+
+
+def _default_backend():
+    return SQLiteBackend(CACHE_DB_PATH) if CACHE_DB_PATH else LRUBackend()
+
+
+# Shared by mail.py, enrichment.py and data_fetcher.py
+response_cache = ResponseCache(_default_backend())
+metrics.register_collector('response_cache', lambda: (
+    ('cache_events_total', {'endpoint': endpoint, 'event': event}, count)
+    for (endpoint, event), count in list(response_cache.stats.items())))
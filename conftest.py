@@ -0,0 +1,21 @@
+# conftest.py
+"""Shared pytest fixtures; living at the repository root, it also puts the modules on sys.path."""
+import pytest
+
+import machine_learning
+
+
+@pytest.fixture
+def trained_model(tmp_path):
+    """A small 1X2 model registered as 'outcome' for the test, then the original file again."""
+    import joblib
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    import train_model
+
+    X, y = train_model.training_set(train_model.synthetic_results(2_000))
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump(GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=0).fit(X, y), path)
+    machine_learning.registry.register('outcome', path)
+    yield machine_learning.registry.get()
+    machine_learning.registry.register('outcome', machine_learning.MODEL_PATH)
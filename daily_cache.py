@@ -0,0 +1,231 @@
+# daily_cache.py
+"""Precomputed daily predictions, so /today is served from memory.
+
+A scheduled job calls ``DailyPredictions.refresh()``; it fetches today's
+fixtures, re-predicts and re-renders only the fixtures whose inputs changed
+since the last run (new injuries, a weather update, ...), and stores the
+packed message chunks with a content hash. Handlers read ``get()``, which
+only returns the stored chunks, and every user sees the same predictions.
+
+With several bot replicas, the one holding the refresh lease calls
+``publish(state)`` after each refresh and the others ``sync(state)``, so all
+of them serve the same chunks (see shared_state.py).
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import data_fetcher
+import predictor
+from instrumentation import metrics
+from telegram_sender import pack_messages
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_INTERVAL = 5 * 60  # seconds between scheduled refreshes
+SNAPSHOT_KEY = 'daily_predictions'  # shared_state key of the published snapshot
+
+FixtureKey = Tuple[str, str, str]
+
+
+def fixture_key(game: Dict[str, Any]) -> FixtureKey:
+    return game['home_team'], game['away_team'], str(game['date'])
+
+
+def input_hash(game: Dict[str, Any]) -> str:
+    """Hash of everything the prediction and the rendered block depend on."""
+    payload = json.dumps(game, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Entry:
+    __slots__ = ('input_hash', 'predictions', 'position', 'block')
+
+    def __init__(self, input_hash: str, predictions: Dict[str, Any], position: int, block: str):
+        self.input_hash = input_hash
+        self.predictions = predictions
+        self.position = position
+        self.block = block
+
+
+class DailyPredictions:
+    """Today's rendered predictions, recomputed incrementally.
+
+    ``render(position, game, predictions)`` turns one fixture into its
+    message block; ``header`` starts the first message. With a
+    store.PredictionStore, new predictions are saved to it, and after a
+    restart the stored ones are reused for fixtures whose inputs are unchanged.
+    """
+    def __init__(self, render: Callable[[int, Dict[str, Any], Dict[str, Any]], str], header: str = '',
+                 fetch: Callable[[], List[Dict[str, Any]]] = data_fetcher.fetch_todays_games,
+                 predict: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]] = predictor.predict_games,
+                 store=None):
+        self.render = render
+        self.header = header
+        self.fetch = fetch
+        self.predict = predict
+        self.store = store
+        self.day: Optional[datetime.date] = None
+        self.chunks: List[str] = []
+        self.content_hash = ''
+        # Today's fixtures and their predictions, in fixture order (read by subscriptions.plan)
+        self.games: List[Dict[str, Any]] = []
+        self.predictions: List[Dict[str, Any]] = []
+        self._entries: Dict[FixtureKey, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def _predict(self, games: List[Dict[str, Any]], hashes: List[str], stale: List[int]) -> List[Dict[str, Any]]:
+        """Predictions of the ``stale`` games, from the store where it has them for the same inputs."""
+        if not stale:
+            return []
+        stored: Dict[int, Dict[str, Any]] = {}
+        if self.store is not None:
+            try:
+                stored = self.store.cached_predictions([games[i] for i in stale], [hashes[i] for i in stale])
+            except sqlite3.Error:
+                logger.exception("Reading stored predictions failed")
+        missing = [k for k in range(len(stale)) if k not in stored]
+        if missing:
+            new_games = [games[stale[k]] for k in missing]
+            new_predictions = self.predict(new_games)
+            stored.update(zip(missing, new_predictions))
+            if self.store is not None:
+                try:
+                    self.store.record_predictions(new_games, new_predictions, [hashes[stale[k]] for k in missing])
+                except sqlite3.Error:
+                    logger.exception("Saving predictions failed")
+        return [stored[k] for k in range(len(stale))]
+
+    def get(self, day: Optional[datetime.date] = None) -> Optional[List[str]]:
+        """The precomputed chunks for ``day`` (default today), or None if not built yet."""
+        if self.day != (day or datetime.date.today()):
+            return None
+        return self.chunks
+
+    def refresh(self) -> int:
+        """Rebuild from the current fixtures; returns how many fixtures were re-predicted."""
+        with self._lock:
+            day = datetime.date.today()
+            if day != self.day:
+                self._entries = {}
+            games = self.fetch()
+
+            hashes = [input_hash(game) for game in games]
+            keys = [fixture_key(game) for game in games]
+            stale = [i for i, (key, h) in enumerate(zip(keys, hashes))
+                     if key not in self._entries or self._entries[key].input_hash != h]
+            fresh_predictions = self._predict(games, hashes, stale)
+
+            with metrics.span('render'):
+                entries = {}
+                for i, preds in zip(stale, fresh_predictions):
+                    entries[keys[i]] = _Entry(hashes[i], preds, i, self.render(i, games[i], preds))
+                for i, key in enumerate(keys):
+                    if key in entries:
+                        continue
+                    entry = self._entries[key]
+                    if entry.position != i:
+                        # Same inputs, new position in the list: only the block needs re-rendering
+                        entry = _Entry(entry.input_hash, entry.predictions, i,
+                                       self.render(i, games[i], entry.predictions))
+                    entries[key] = entry
+
+                content_hash = hashlib.sha256(''.join(hashes).encode('ascii')).hexdigest()
+                if content_hash != self.content_hash or day != self.day:
+                    blocks = [entries[key].block for key in keys]
+                    self.chunks = pack_messages([self.header] + blocks) if blocks else []
+                    self.content_hash = content_hash
+            self._entries = entries
+            self.games = games
+            self.predictions = [entries[key].predictions for key in keys]
+            self.day = day
+            logger.info("Daily predictions refreshed: %d fixtures, %d re-predicted", len(keys), len(stale))
+            return len(stale)
+
+    def publish(self, state) -> None:
+        """Share this instance's day with other replicas through ``state``."""
+        with self._lock:
+            snapshot = pickle.dumps((self.day, self.content_hash, self.chunks, self.games, self.predictions,
+                                     self._entries), protocol=pickle.HIGHEST_PROTOCOL)
+        state.set(SNAPSHOT_KEY, snapshot)
+
+    def sync(self, state) -> bool:
+        """Adopt today's snapshot published by another replica; True if anything changed.
+
+        The per-fixture entries come along, so a replica that later takes
+        over the refresh still only re-predicts what changed.
+        """
+        blob = state.get(SNAPSHOT_KEY)
+        if blob is None:
+            return False
+        day, content_hash, chunks, games, predictions, entries = pickle.loads(blob)
+        with self._lock:
+            if day != datetime.date.today() or (day, content_hash) == (self.day, self.content_hash):
+                return False
+            self.day, self.content_hash, self.chunks = day, content_hash, chunks
+            self.games, self.predictions, self._entries = games, predictions, entries
+        return True
+
+
+async def respond_today(daily: DailyPredictions, sender, chat_id: Any, state=None, **kwargs) -> None:
+    """Answer /today in ``chat_id`` from the precomputed chunks.
+
+    Before anything is precomputed, the chunks are taken from ``state`` if
+    another replica published them, and built here otherwise; both run in a
+    thread, so the event loop keeps serving other chats meanwhile.
+    """
+    chunks = daily.get()
+    if chunks is None and state is not None:
+        await asyncio.to_thread(daily.sync, state)
+        chunks = daily.get()
+    if chunks is None:
+        # Not precomputed yet today: build it once, off the event loop
+        await asyncio.to_thread(daily.refresh)
+        chunks = daily.get()
+    with metrics.span('send', command='today'):
+        if not chunks:
+            await sender.send(chat_id, "No games today.")
+            return
+        await sender.send_parts(chat_id, chunks, **kwargs)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Predict today's fixtures once and print the /today messages (a cron-friendly refresh)."""
+    import argparse
+    import os
+
+    import renderer
+    from features import SNAPSHOT_PATH, FeatureSnapshot
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH,
+                        help='warm feature snapshot (see ingest.py --snapshot); used if it exists')
+    parser.add_argument('--store', help='PredictionStore database to reuse and record predictions')
+    args = parser.parse_args(argv)
+
+    predict = predictor.predict_games
+    if os.path.isdir(args.snapshot):
+        index = FeatureSnapshot.load(args.snapshot)
+        predict = lambda games: predictor.predict_games(games, index=index)  # noqa: E731
+    store = None
+    if args.store:
+        from store import PredictionStore
+
+        store = PredictionStore(args.store)
+    daily = DailyPredictions(renderer.game_renderer(), renderer.TODAY_HEADER, predict=predict, store=store)
+    try:
+        daily.refresh()
+    finally:
+        if store is not None:
+            store.close()
+    print('\n\n'.join(daily.chunks) or 'No games today.')
+
+
+if __name__ == '__main__':
+    main()
@@ -2,9 +2,17 @@
 import datetime
 from typing import List, Dict, Any
 
+from cache import response_cache
+from instrumentation import metrics
+
 def fetch_todays_games() -> List[Dict[str, Any]]:
-    # This function would normally call an API, but we mock 5 games for today.
+    # Cached as a 'fixtures' response: repeated calls within the TTL reuse the same list
     today = datetime.date.today()
+    with metrics.span('fetch', source='data_fetcher'):
+        return response_cache.get('fixtures', f"games?date={today.isoformat()}", lambda: _fetch_games(today))
+
+def _fetch_games(today: datetime.date) -> List[Dict[str, Any]]:
+    # This function would normally call an API, but we mock 5 games for today.
     games = [
         {
             "home_team": "Team A",
@@ -0,0 +1,162 @@
+# enrichment.py
+"""Concurrent fixture enrichment (injuries, weather, referee, stats) for mail.py."""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from instrumentation import metrics
+from venues import Forecast, WeatherService
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 10  # seconds, for every upstream call
+MAX_CONNECTIONS = 100
+MAX_PER_HOST = 8
+
+
+class AsyncHTTPClient:
+    """Shared pooled HTTP client with bounded concurrency per upstream host.
+
+    Use as ``async with AsyncHTTPClient() as client``; every request made
+    through it reuses the same connection pool. ``host_limits`` overrides the
+    default per-host concurrency for specific hosts (e.g. a rate-limited API).
+    """
+    def __init__(self, max_connections: int = MAX_CONNECTIONS, max_per_host: int = MAX_PER_HOST,
+                 timeout: float = REQUEST_TIMEOUT, host_limits: Optional[Dict[str, int]] = None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.host_limits = host_limits or {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> 'AsyncHTTPClient':
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.session.close()
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.host_limits.get(host, self.max_per_host))
+        return self._semaphores[host]
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                       headers: Optional[Dict[str, str]] = None) -> Any:
+        async with self._semaphore(url):
+            with metrics.upstream(urlsplit(url).netloc):
+                async with self.session.get(url, params=params, headers=headers) as response:
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+
+    async def post_json(self, url: str, payload: Dict[str, Any]) -> Any:
+        async with self._semaphore(url):
+            with metrics.upstream(urlsplit(url).netloc):
+                async with self.session.post(url, json=payload) as response:
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+
+
+def _format_weather(payload: Dict[str, Any]) -> str:
+    """OpenWeather current-weather payload (metric units) -> 'Clear, 18°C, 5km/h wind'."""
+    description = payload['weather'][0]['description'].capitalize()
+    return f"{description}, {payload['main']['temp']:.0f}°C, {payload['wind']['speed'] * 3.6:.0f}km/h wind"
+
+
+class MatchEnricher:
+    """Fans out the per-match detail calls and merges them into the details dict.
+
+    Every call for every match runs concurrently through one AsyncHTTPClient.
+    With a cache.ResponseCache, team and weather lookups shared by several
+    fixtures are fetched once. Venues known to the ``weather`` service's
+    registry get the forecast for their kickoff, one request per city
+    however many fixtures it hosts; other venues fall back to a current
+    weather lookup by name. A failed call is logged and leaves the
+    corresponding default in place, so one slow or broken upstream never
+    drops a match from the report.
+    """
+    def __init__(self, client: AsyncHTTPClient, football_url: str, weather_url: str,
+                 football_key: str, weather_key: str, cache=None, weather: Optional[WeatherService] = None):
+        self.client = client
+        self.cache = cache
+        self.football_url = football_url
+        self.weather_url = weather_url
+        self.football_headers = {'X-Auth-Token': football_key}
+        self.weather_key = weather_key
+        self.weather = weather if weather is not None else WeatherService(client, weather_url, weather_key)
+
+    async def _cached(self, endpoint: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        if self.cache is None:
+            return await fetch()
+        return await self.cache.aget(endpoint, key, fetch)
+
+    async def _football(self, path: str, endpoint: str = 'fixtures') -> Any:
+        # Keyed by path, so fixtures sharing a team reuse one lookup
+        return await self._cached(endpoint, path, lambda: self.client.get_json(
+            f"{self.football_url}{path}", headers=self.football_headers))
+
+    async def _weather(self, match_payload: Any, kickoff: Optional[str]) -> Any:
+        # Weather needs the venue, which only the match call knows
+        venue = match_payload.get('venue') if isinstance(match_payload, dict) else None
+        if not venue:
+            return None
+        if kickoff and venue in self.weather.registry:
+            forecast, = await self.weather.forecasts([(venue, kickoff)])
+            if forecast is not None:
+                return forecast
+        return await self._cached('weather', venue, lambda: self.client.get_json(
+            f"{self.weather_url}/weather", params={'q': venue, 'units': 'metric', 'appid': self.weather_key}))
+
+    async def _match_and_weather(self, match_id: Any, kickoff: Optional[str]) -> List[Any]:
+        match_payload = await self._football(f"/matches/{match_id}")
+        try:
+            weather = await self._weather(match_payload, kickoff)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            weather = e
+        return [match_payload, weather]
+
+    async def enrich(self, match: Dict[str, Any], details: Dict[str, Any]) -> Dict[str, Any]:
+        """Overlay live injuries, weather, referee and h2h stats on ``details``."""
+        home_id, away_id = match['homeTeam']['id'], match['awayTeam']['id']
+        results = await asyncio.gather(
+            self._match_and_weather(match['id'], match.get('utcDate')),
+            self._football(f"/teams/{home_id}", 'injuries'),
+            self._football(f"/teams/{away_id}", 'injuries'),
+            self._football(f"/matches/{match['id']}/head2head"),
+            return_exceptions=True,
+        )
+        if isinstance(results[0], BaseException):
+            match_payload, weather = results[0], results[0]
+        else:
+            match_payload, weather = results[0]
+        home_team, away_team, h2h = results[1:]
+
+        for name, result in (('match', match_payload), ('weather', weather), ('home team', home_team),
+                             ('away team', away_team), ('head2head', h2h)):
+            if isinstance(result, BaseException):
+                logger.warning("Match %s: %s lookup failed: %r", match['id'], name, result)
+
+        details = dict(details)
+        if isinstance(match_payload, dict) and match_payload.get('referees'):
+            details['referee'] = match_payload['referees'][0]['name']
+        if isinstance(weather, Forecast):
+            details['weather'] = str(weather)
+        elif isinstance(weather, dict):
+            details['weather'] = _format_weather(weather)
+        if isinstance(home_team, dict) and isinstance(away_team, dict):
+            details['injuries'] = home_team.get('injuries', []) + away_team.get('injuries', [])
+        if isinstance(h2h, dict) and 'aggregates' in h2h:
+            details['h2h'] = h2h['aggregates']
+        return details
+
+    async def enrich_all(self, matches: List[Dict[str, Any]],
+                         defaults: Callable[[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Enrich every match concurrently; ``defaults(match)`` gives the base details."""
+        return await asyncio.gather(*(self.enrich(match, defaults(match)) for match in matches))
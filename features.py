@@ -0,0 +1,278 @@
+# features.py
+"""Incremental rolling-form and head-to-head feature index.
+
+Results are ingested one at a time and every rolling window keeps a running
+sum, so ingesting a result and reading a team's features are both O(1). The
+predictors read their inputs from here instead of rescanning ``team_forms``
+and ``h2h`` on every call.
+
+A FeatureSnapshot is a read-only copy of an index as flat arrays, saved to
+a directory of .npy files and memory-mapped back, so a short-lived command
+starts with warm features without replaying the results history.
+"""
+import os
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from team_store import MatchRow, MatchTable, TeamRegistry, teams
+
+FORM_WINDOW = 5
+H2H_WINDOW = 5
+SNAPSHOT_PATH = os.environ.get(
+    'SOCCER_SNAPSHOT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_snapshot'))
+
+
+def result_points(goals_for: int, goals_against: int) -> int:
+    return 3 if goals_for > goals_against else 1 if goals_for == goals_against else 0
+
+
+class RollingWindow:
+    """Last ``size`` values with their running sum."""
+    __slots__ = ('values', 'total')
+
+    def __init__(self, size: int):
+        self.values = deque(maxlen=size)
+        self.total = 0
+
+    def push(self, value: int) -> None:
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class _TeamState:
+    __slots__ = ('points', 'goals_for', 'goals_against')
+
+    def __init__(self, window: int):
+        self.points = RollingWindow(window)
+        self.goals_for = RollingWindow(window)
+        self.goals_against = RollingWindow(window)
+
+
+class _PairState:
+    __slots__ = ('matches', 'goals', 'recent_goals')
+
+    def __init__(self, window: int):
+        self.matches = 0  # all-time meetings
+        self.goals = 0    # all-time goals in those meetings
+        self.recent_goals = RollingWindow(window)
+
+
+class FeatureView:
+    """Features of a slate of fixtures, read from a FeatureIndex.
+
+    Has the same feature interface as team_store.FixtureTable, so
+    predictor.expected_goals accepts either.
+    """
+    def __init__(self, home_form_sum: np.ndarray, home_form_len: np.ndarray, away_form_sum: np.ndarray,
+                 away_form_len: np.ndarray, h2h_goals: np.ndarray, h2h_len: np.ndarray):
+        self._form = (home_form_sum, home_form_len, away_form_sum, away_form_len)
+        self._h2h_goals = h2h_goals
+        self.h2h_len = h2h_len
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[int, ...]]) -> 'FeatureView':
+        """Build from FeatureIndex.row() tuples."""
+        columns = np.array(rows, dtype=np.int64).reshape(len(rows), 6).T
+        return cls(*columns)
+
+    def __len__(self) -> int:
+        return len(self.h2h_len)
+
+    def form_points(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return self._form
+
+    def h2h_goals(self) -> np.ndarray:
+        return self._h2h_goals
+
+
+class FeatureIndex:
+    """Rolling team form and h2h aggregates, keyed by team_store team ids."""
+    def __init__(self, form_window: int = FORM_WINDOW, h2h_window: int = H2H_WINDOW):
+        self.form_window = form_window
+        self.h2h_window = h2h_window
+        self._teams: Dict[int, _TeamState] = {}
+        self._pairs: Dict[Tuple[int, int], _PairState] = {}
+        self.ingested = 0
+
+    def _team(self, team_id: int) -> _TeamState:
+        state = self._teams.get(team_id)
+        if state is None:
+            state = self._teams[team_id] = _TeamState(self.form_window)
+        return state
+
+    def ingest(self, home_id: int, away_id: int, home_goals: int, away_goals: int) -> None:
+        """Add one result, in chronological order."""
+        home = self._team(home_id)
+        away = self._team(away_id)
+        home.points.push(result_points(home_goals, away_goals))
+        home.goals_for.push(home_goals)
+        home.goals_against.push(away_goals)
+        away.points.push(result_points(away_goals, home_goals))
+        away.goals_for.push(away_goals)
+        away.goals_against.push(home_goals)
+
+        key = (home_id, away_id) if home_id < away_id else (away_id, home_id)
+        pair = self._pairs.get(key)
+        if pair is None:
+            pair = self._pairs[key] = _PairState(self.h2h_window)
+        pair.matches += 1
+        pair.goals += home_goals + away_goals
+        pair.recent_goals.push(home_goals + away_goals)
+        self.ingested += 1
+
+    def ingest_row(self, row: MatchRow) -> None:
+        self.ingest(row.home_id, row.away_id, row.home_goals, row.away_goals)
+
+    def ingest_table(self, table: MatchTable) -> None:
+        """Ingest every row of a MatchTable (assumed sorted by day)."""
+        ingest = self.ingest
+        for args in zip(table.home_id.tolist(), table.away_id.tolist(),
+                        table.home_goals.tolist(), table.away_goals.tolist()):
+            ingest(*args)
+
+    def push_form(self, team_id: int, value: int) -> None:
+        """Append a raw form value (e.g. points) without a full result."""
+        self._team(team_id).points.push(value)
+
+    # --- reads --------------------------------------------------------------------
+
+    def form(self, team_id: int) -> List[int]:
+        state = self._teams.get(team_id)
+        return list(state.points.values) if state else []
+
+    def form_points(self, team_id: int) -> Tuple[int, int]:
+        """(sum, count) of the team's last ``form_window`` form values."""
+        state = self._teams.get(team_id)
+        return (state.points.total, len(state.points)) if state else (0, 0)
+
+    def goals(self, team_id: int) -> Tuple[int, int, int]:
+        """(goals for, goals against, matches) over the team's form window."""
+        state = self._teams.get(team_id)
+        if state is None:
+            return 0, 0, 0
+        return state.goals_for.total, state.goals_against.total, len(state.goals_for)
+
+    def h2h(self, team_a: int, team_b: int) -> Tuple[int, int]:
+        """(goals, meetings) over the pair's last ``h2h_window`` meetings."""
+        pair = self._pairs.get((team_a, team_b) if team_a < team_b else (team_b, team_a))
+        return (pair.recent_goals.total, len(pair.recent_goals)) if pair else (0, 0)
+
+    def h2h_all_time(self, team_a: int, team_b: int) -> Tuple[int, int]:
+        """(goals, meetings) over every meeting ingested."""
+        pair = self._pairs.get((team_a, team_b) if team_a < team_b else (team_b, team_a))
+        return (pair.goals, pair.matches) if pair else (0, 0)
+
+    def row(self, home_id: int, away_id: int) -> Tuple[int, int, int, int, int, int]:
+        """One fixture's features in FeatureView column order."""
+        return self.form_points(home_id) + self.form_points(away_id) + self.h2h(home_id, away_id)
+
+    def view(self, home_ids: Sequence[int], away_ids: Sequence[int]) -> FeatureView:
+        """Features for a slate of fixtures, one O(1) lookup per fixture."""
+        return FeatureView.from_rows([self.row(home_id, away_id) for home_id, away_id in zip(home_ids, away_ids)])
+
+
+class FeatureSnapshot:
+    """Frozen FeatureIndex reads, as arrays indexed by team and by sorted team pair.
+
+    Teams are stored by name; ``load`` interns them into ``registry``, so
+    the snapshot's rows are mapped onto whatever ids this process assigned.
+    Teams and pairs the snapshot never saw read as empty, as in FeatureIndex.
+    """
+    _FILES = ('teams', 'form', 'pair_keys', 'pairs')
+
+    def __init__(self, names: np.ndarray, form: np.ndarray, pair_keys: np.ndarray, pairs: np.ndarray,
+                 registry: TeamRegistry = teams):
+        self.names = names          # snapshot row -> team name
+        self.form = form            # (teams, 2): form sum, form length
+        self.pair_keys = pair_keys  # sorted lo_row * len(names) + hi_row
+        self.pairs = pairs          # (pairs, 2): recent h2h goals, recent meetings
+        self.registry = registry
+        # registry id -> snapshot row, -1 for teams the snapshot does not know
+        self._rows = np.full(0, -1, dtype=np.int64)
+
+    @classmethod
+    def from_index(cls, index: FeatureIndex, registry: TeamRegistry = teams) -> 'FeatureSnapshot':
+        ids = sorted(index._teams)
+        names = np.array([registry.name(team_id) for team_id in ids], dtype=str)
+        row_of = {team_id: row for row, team_id in enumerate(ids)}
+        form = np.array([index.form_points(team_id) for team_id in ids], dtype=np.int32).reshape(-1, 2)
+        n = len(ids)
+        keys, pairs = [], []
+        for (a, b), pair in index._pairs.items():
+            lo, hi = sorted((row_of[a], row_of[b]))
+            keys.append(lo * n + hi)
+            pairs.append((pair.recent_goals.total, len(pair.recent_goals)))
+        order = np.argsort(np.array(keys, dtype=np.int64), kind='stable')
+        snapshot = cls(names, form, np.array(keys, dtype=np.int64)[order],
+                       np.array(pairs, dtype=np.int32).reshape(-1, 2)[order], registry)
+        snapshot._map(names.tolist())
+        return snapshot
+
+    def save(self, path: str = SNAPSHOT_PATH) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in self._FILES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, 'names' if name == 'teams' else name))
+
+    @classmethod
+    def load(cls, path: str = SNAPSHOT_PATH, registry: TeamRegistry = teams) -> 'FeatureSnapshot':
+        """Memory-map a saved snapshot; pages are read (and shared between processes) on first use."""
+        names, form, pair_keys, pairs = (np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                                         for name in cls._FILES)
+        snapshot = cls(names, form, pair_keys, pairs, registry)
+        snapshot._map(names.tolist())
+        return snapshot
+
+    def _map(self, names: Sequence[str]) -> None:
+        ids = np.array([self.registry.intern(name) for name in names], dtype=np.int64)
+        self._rows = np.full(len(self.registry), -1, dtype=np.int64)
+        self._rows[ids] = np.arange(len(ids))
+
+    def _snapshot_rows(self, team_ids: Sequence[int]) -> np.ndarray:
+        team_ids = np.asarray(team_ids, dtype=np.int64)
+        if len(self._rows) < len(self.registry):
+            # Teams interned since: unknown to the snapshot
+            self._rows = np.concatenate([self._rows, np.full(len(self.registry) - len(self._rows), -1)])
+        return self._rows[team_ids]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _form(self, rows: np.ndarray) -> np.ndarray:
+        """(sum, length) form rows; zeros for unknown teams (row -1), even in an empty snapshot."""
+        form = np.zeros((len(rows), 2), dtype=np.int64)
+        known = rows >= 0
+        form[known] = self.form[rows[known]]
+        return form
+
+    def view(self, home_ids: Sequence[int], away_ids: Sequence[int]) -> FeatureView:
+        """Features for a slate of fixtures, read with array indexing and one binary search."""
+        home, away = self._snapshot_rows(home_ids), self._snapshot_rows(away_ids)
+        home_form, away_form = self._form(home), self._form(away)
+        lo, hi = np.minimum(home, away), np.maximum(home, away)
+        keys = lo * len(self.names) + hi
+        h2h = np.zeros((len(keys), 2), dtype=np.int64)
+        if len(self.pair_keys):
+            pos = np.searchsorted(self.pair_keys, keys).clip(max=len(self.pair_keys) - 1)
+            found = (lo >= 0) & (self.pair_keys[pos] == keys)
+            h2h[found] = self.pairs[pos[found]]
+        return FeatureView(home_form[:, 0], home_form[:, 1], away_form[:, 0], away_form[:, 1], h2h[:, 0], h2h[:, 1])
+
+    def row(self, home_id: int, away_id: int) -> Tuple[int, int, int, int, int, int]:
+        view = self.view([home_id], [away_id])
+        return tuple(int(column[0]) for column in view.form_points() + (view.h2h_goals(), view.h2h_len))
+
+
+def build_index(results: Iterable[Tuple[int, int, int, int]], form_window: int = FORM_WINDOW,
+                h2h_window: int = H2H_WINDOW, index: Optional[FeatureIndex] = None) -> FeatureIndex:
+    """Ingest (home_id, away_id, home_goals, away_goals) tuples in order."""
+    index = index or FeatureIndex(form_window, h2h_window)
+    for result in results:
+        index.ingest(*result)
+    return index
@@ -0,0 +1,295 @@
+# ingest.py
+"""Streaming ingestion of historical results and live score events.
+
+Historical dumps (CSV, JSON lines or Parquet, optionally gzipped) are read
+one row at a time and fed straight into a FeatureIndex, so memory stays
+constant however large the file is:
+
+    index = ingest_results('results.csv.gz')
+
+``python ingest.py results.csv.gz`` saves the replayed index as a
+features.FeatureSnapshot, which short-lived commands memory-map instead of
+replaying the history on every run.
+
+Live score events are consumed by ``InPlayTracker.consume``; each event
+re-predicts only the fixture it belongs to. A recorded feed is replayed
+with ``replay_events('live.jsonl', speed=10)``. One event per line:
+
+    {"ts": 1712.5, "home_team": "Team A", "away_team": "Team B", "date": "2025-06-01",
+     "minute": 23, "home_goals": 1, "away_goals": 0, "status": "LIVE"}
+
+``status`` is LIVE or FT; a full-time event ingests the result into the
+tracker's FeatureIndex and ends the fixture's in-play predictions.
+"""
+import asyncio
+import csv
+import datetime
+import gzip
+import json
+import logging
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Dict, IO, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import predictor
+from daily_cache import FixtureKey, fixture_key
+from features import FeatureIndex
+from team_store import FixtureTable, TeamRegistry, teams
+
+logger = logging.getLogger(__name__)
+
+# football-data.co.uk column names
+_COLUMN_ALIASES = {
+    'Div': 'league', 'Date': 'date', 'HomeTeam': 'home_team', 'AwayTeam': 'away_team',
+    'FTHG': 'home_goals', 'FTAG': 'away_goals', 'Season': 'season',
+}
+
+
+# --- historical results -------------------------------------------------------------
+
+def _parse_date(value: Any) -> datetime.date:
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    value = str(value)
+    if '/' in value:
+        # football-data.co.uk: dd/mm/yy or dd/mm/yyyy
+        day, month, year = (int(part) for part in value.split('/'))
+        return datetime.date(year + 2000 if year < 100 else year, month, day)
+    return datetime.date.fromisoformat(value[:10])
+
+
+def season_of(date: datetime.date) -> str:
+    """European season label, e.g. 2019-08-10 -> '2019/20' (seasons start in July)."""
+    start = date.year if date.month >= 7 else date.year - 1
+    return f"{start}/{(start + 1) % 100:02d}"
+
+
+def _open_text(path: str) -> IO[str]:
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', newline='', encoding='utf-8')
+    return open(path, newline='', encoding='utf-8')
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Raw rows of a .csv, .jsonl/.ndjson or .parquet file (text formats may end in .gz)."""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    elif name.endswith(('.jsonl', '.ndjson', '.json')):
+        with _open_text(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with _open_text(path) as f:
+            yield from csv.DictReader(f)
+
+
+def read_results(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream normalized result rows, in file order.
+
+    Every row has date, league, season, home_team, away_team, home_goals and
+    away_goals; league defaults to 'default' and season to the season of the
+    date. Rows without a full-time score (postponed, not yet played) are skipped.
+    """
+    for raw in read_records(path):
+        row = {_COLUMN_ALIASES.get(key, key): value for key, value in raw.items()}
+        if row.get('home_goals') in (None, '') or row.get('away_goals') in (None, ''):
+            continue
+        date = _parse_date(row['date'])
+        yield {
+            'date': date,
+            'league': str(row.get('league') or 'default'),
+            'season': str(row.get('season') or season_of(date)),
+            'home_team': row['home_team'],
+            'away_team': row['away_team'],
+            'home_goals': int(row['home_goals']),
+            'away_goals': int(row['away_goals']),
+        }
+
+
+def iter_scores(path: str, registry: TeamRegistry = teams) -> Iterator[Tuple[int, int, int, int]]:
+    """(home_id, away_id, home_goals, away_goals) per played match, in file order.
+
+    The lean path for feeding a FeatureIndex: dates are not parsed and the
+    column names are resolved once from the first row, not per row.
+    """
+    intern = registry.intern
+    columns = None
+    for raw in read_records(path):
+        if columns is None:
+            names = {_COLUMN_ALIASES.get(key, key): key for key in raw}
+            columns = [names[name] for name in ('home_team', 'away_team', 'home_goals', 'away_goals')]
+        home, away, home_goals, away_goals = (raw[column] for column in columns)
+        if home_goals in (None, '') or away_goals in (None, ''):
+            continue
+        yield intern(home), intern(away), int(home_goals), int(away_goals)
+
+
+def ingest_results(path: str, index: Optional[FeatureIndex] = None,
+                   registry: TeamRegistry = teams) -> FeatureIndex:
+    """Replay a results file (sorted by date) into ``index`` in constant memory."""
+    index = index or FeatureIndex()
+    ingest = index.ingest
+    for result in iter_scores(path, registry):
+        ingest(*result)
+    return index
+
+
+# --- live scores --------------------------------------------------------------------
+
+def read_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Live score events from a JSON lines file (optionally gzipped)."""
+    return read_records(path)
+
+
+async def replay_events(path: str, speed: float = 0.0) -> AsyncIterator[Dict[str, Any]]:
+    """Yield a recorded feed, sleeping by the gaps in ``ts`` divided by ``speed``.
+
+    ``speed=0`` replays as fast as the consumer takes the events.
+    """
+    previous = None
+    for event in read_events(path):
+        ts = event.get('ts')
+        if speed and previous is not None and ts is not None and ts > previous:
+            await asyncio.sleep((ts - previous) / speed)
+        else:
+            # Still yield to the loop between events, like a real feed would
+            await asyncio.sleep(0)
+        previous = ts if ts is not None else previous
+        yield event
+
+
+class InPlayTracker:
+    """In-play predictions for today's fixtures, updated one fixture at a time.
+
+    Pre-match expected goals and 1X2 are computed once, vectorized, when the
+    tracker is built, exactly as predictor.predict_games computes them (with
+    the weather, and the trained 1X2 when one is loaded). A score event only
+    rebuilds the score matrix of its own fixture (in_play_matrices), so
+    updates cost the same however many fixtures are live.
+    """
+    def __init__(self, games: List[Dict[str, Any]], index: Optional[FeatureIndex] = None,
+                 model: predictor.AIModel = predictor.main_model):
+        self.games: Dict[FixtureKey, Dict[str, Any]] = {fixture_key(game): game for game in games}
+        self.index = index if index is not None else FeatureIndex()
+        if games:
+            table = FixtureTable.from_games(games) if index is None else index.view(
+                [teams.intern(game['home_team']) for game in games],
+                [teams.intern(game['away_team']) for game in games])
+            weather = predictor.game_weather(games)
+            home_xg, away_xg = predictor.expected_goals(table, model.home_adv, weather)
+            # How the trained 1X2 (if any) tilts each outcome away from the xG model's own
+            pre_match = predictor.model_matrices(model, table, weather, games).outcome_probs
+            untrained = predictor.ScoreMatrixSet(predictor.score_matrices(home_xg, away_xg)).outcome_probs
+            tilt = pre_match / np.maximum(untrained, 1e-300)
+        else:
+            home_xg = away_xg = np.empty(0)
+            tilt = np.empty((0, 3))
+        self._xg = dict(zip(self.games, zip(home_xg.tolist(), away_xg.tolist())))
+        self._tilt = dict(zip(self.games, tilt))
+        # Current (minute, home_goals, away_goals) of every fixture that has kicked off
+        self.state: Dict[FixtureKey, Tuple[int, int, int]] = {}
+        self.predictions: Dict[FixtureKey, Dict[str, Any]] = {}
+        self.finished: set = set()
+        self.latencies: List[float] = []
+
+    def apply(self, events: List[Dict[str, Any]]) -> List[FixtureKey]:
+        """Apply a batch of events; returns the fixtures whose predictions changed."""
+        changed = {}
+        for event in events:
+            key = fixture_key(event)
+            if key not in self._xg or key in self.finished:
+                logger.debug("Ignoring event for %s", key)
+                continue
+            if event.get('status') == 'FT':
+                self.finished.add(key)
+                self.state.pop(key, None)
+                self.predictions.pop(key, None)
+                changed.pop(key, None)
+                self.index.ingest(teams.intern(event['home_team']), teams.intern(event['away_team']),
+                                  int(event['home_goals']), int(event['away_goals']))
+                continue
+            self.state[key] = (int(event.get('minute', 0)), int(event['home_goals']), int(event['away_goals']))
+            changed[key] = True
+        if changed:
+            self._predict(list(changed))
+        return list(changed)
+
+    def _predict(self, keys: List[FixtureKey]) -> None:
+        xg = np.array([self._xg[key] for key in keys])
+        state = np.array([self.state[key] for key in keys])
+        matrix_set = predictor.ScoreMatrixSet(predictor.in_play_matrices(
+            xg[:, 0], xg[:, 1], state[:, 0], state[:, 1], state[:, 2]))
+        # The pre-match tilt fades with the time left, so minute 0 matches predict_games
+        left = np.clip(1 - state[:, 0] / 90, 0, 1)[:, None]
+        probs = matrix_set.outcome_probs * (1 + left * (np.array([self._tilt[key] for key in keys]) - 1))
+        matrix_set = matrix_set.rescaled(probs / probs.sum(axis=1, keepdims=True))
+        for key, (minute, home_goals, away_goals), prediction in zip(
+                keys, state.tolist(), predictor.slate_predictions(matrix_set.outcome_probs, matrix_set)):
+            self.predictions[key] = {**prediction, 'minute': minute, 'score': f"{home_goals}-{away_goals}"}
+
+    async def consume(self, events: AsyncIterable[Dict[str, Any]]) -> None:
+        """Apply events as they arrive, batching whatever queued up during the last update.
+
+        Records the latency from each event's arrival to its prediction update
+        in ``latencies`` (seconds). If ``events`` raises, the events received
+        before the error are applied and the error is re-raised here.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def receive() -> None:
+            try:
+                async for event in events:
+                    queue.put_nowait((time.perf_counter(), event))
+            finally:
+                # Also when the source fails, or the consumer would wait forever
+                queue.put_nowait((0.0, done))
+
+        receiver = asyncio.ensure_future(receive())
+        try:
+            while True:
+                batch = [await queue.get()]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                finished = batch[-1][1] is done
+                if finished:
+                    batch.pop()
+                self.apply([event for _, event in batch])
+                now = time.perf_counter()
+                self.latencies.extend(now - arrived for arrived, _ in batch)
+                if finished:
+                    break
+            await receiver  # re-raises the source's error, if any
+        finally:
+            receiver.cancel()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Replay a results file into a FeatureIndex and save it as a warm feature snapshot."""
+    import argparse
+
+    from features import SNAPSHOT_PATH, FeatureSnapshot
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('path', help='historical results (.csv, .jsonl, .gz or .parquet), sorted by date')
+    parser.add_argument('--snapshot', default=SNAPSHOT_PATH, help='output directory')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = ingest_results(args.path)
+    snapshot = FeatureSnapshot.from_index(index)
+    snapshot.save(args.snapshot)
+    print(f"{index.ingested} results, {len(snapshot)} teams, {len(snapshot.pair_keys)} pairs "
+          f"saved to {args.snapshot} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# instrumentation.py
+"""Timing spans, counters and histograms for the prediction and send pipeline.
+
+    with metrics.span('fetch', source='football-data'):
+        games = fetch()
+
+Every span is recorded in the ``span_seconds`` histogram, labelled with its
+name, and a span that raises also counts in ``span_errors_total``.
+``metrics.prometheus_text()`` and
+``metrics.to_json()`` export everything; with SOCCER_METRICS_PATH set,
+``metrics.dump()`` writes it to that file (.json, otherwise Prometheus text).
+
+Upstream calls go through ``metrics.upstream(name)``, which times them and
+counts them per outcome (``upstream_requests_total``), giving the error
+rate of each API (``metrics.error_rates()``).
+
+Profiling is opt-in per command with ``profiled(command)``:
+
+    SOCCER_PROFILE=cprofile SOCCER_PROFILE_COMMANDS=today python bot.py
+    SOCCER_PROFILE=tracemalloc python mail.py
+
+cProfile writes ``<command>-<time>.prof`` to SOCCER_PROFILE_DIR and logs the
+top functions; tracemalloc logs the lines that allocated the most memory.
+"""
+import asyncio
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'soccer_'
+# Seconds; wide enough for a vectorized chunk (ms) and a slow upstream (s)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_PATH = os.environ.get('SOCCER_METRICS_PATH')
+PROFILE_MODE = os.environ.get('SOCCER_PROFILE', '').lower()  # '', 'cprofile' or 'tracemalloc'
+PROFILE_COMMANDS = {name for name in os.environ.get('SOCCER_PROFILE_COMMANDS', '').split(',') if name}
+PROFILE_DIR = os.environ.get('SOCCER_PROFILE_DIR', 'profiles')
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Histogram:
+    """Observation counts per upper bound, plus their sum and count."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile."""
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """Thread-safe counters and histograms, keyed by name and labels."""
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, clock: Callable[[], float] = time.perf_counter):
+        self.buckets = buckets
+        self.clock = clock
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        # Callables yielding (name, labels, value) for counters kept elsewhere
+        self._collectors: Dict[str, Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[None]:
+        """Time the block into ``span_seconds{span=name}``; errors also count in ``span_errors_total``."""
+        start = self.clock()
+        try:
+            yield
+        except BaseException as e:
+            self.inc('span_errors_total', span=name, error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe('span_seconds', self.clock() - start, span=name, **labels)
+
+    def timed(self, name: str, **labels: Any) -> Callable:
+        """Decorator form of ``span`` for plain functions and coroutine functions."""
+        def decorator(fn: Callable) -> Callable:
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name, **labels):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_upstream(self, upstream: str, ok: bool) -> None:
+        self.inc('upstream_requests_total', upstream=upstream, outcome='ok' if ok else 'error')
+
+    @contextmanager
+    def upstream(self, upstream: str) -> Iterator[None]:
+        """Time one call to ``upstream`` and count it as ok or, if it raises, as an error."""
+        try:
+            with self.span('upstream', upstream=upstream):
+                yield
+        except Exception:
+            self.record_upstream(upstream, False)
+            raise
+        self.record_upstream(upstream, True)
+
+    def error_rates(self) -> Dict[str, float]:
+        """Share of failed calls per upstream."""
+        totals: Dict[str, List[float]] = {}
+        for (name, labels), value in list(self.counters.items()):
+            if name == 'upstream_requests_total':
+                label = dict(labels)
+                counts = totals.setdefault(label['upstream'], [0, 0])
+                counts[label['outcome'] == 'error'] += value
+        return {upstream: errors / (ok + errors) for upstream, (ok, errors) in totals.items()}
+
+    def register_collector(self, name: str, collect: Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]) -> None:
+        """Export counters kept by another object (e.g. ResponseCache.stats) under their own names."""
+        self._collectors[name] = collect
+
+    def _snapshot(self) -> Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], Histogram]]:
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = dict(self.histograms)
+        for collect in list(self._collectors.values()):
+            for name, labels, value in collect():
+                counters[name, _labels(labels)] = value
+        return counters, histograms
+
+    def prometheus_text(self) -> str:
+        """Everything in the Prometheus text exposition format."""
+        counters, histograms = self._snapshot()
+        lines = []
+        typed = set()
+
+        def fmt(labels: Labels, extra: Labels = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                typed.add(name)
+            lines.append(f"{PREFIX}{name}{fmt(labels)} {value:g}")
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            if name not in typed:
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                lines.append(f"{PREFIX}{name}_bucket{fmt(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{fmt(labels)} {histogram.sum:.6f}")
+            lines.append(f"{PREFIX}{name}_count{fmt(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self) -> Dict[str, Any]:
+        counters, histograms = self._snapshot()
+        return {
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters.items())],
+            'histograms': [{'name': name, 'labels': dict(labels), 'count': h.count, 'sum': h.sum,
+                            'p50': h.quantile(0.5), 'p99': h.quantile(0.99),
+                            'buckets': dict(zip([*map(str, h.buckets), '+Inf'], h.counts))}
+                           for (name, labels), h in sorted(histograms.items(), key=lambda item: item[0])],
+            'upstream_error_rates': self.error_rates(),
+        }
+
+    def dump(self, path: Optional[str] = METRICS_PATH) -> None:
+        """Write the metrics to ``path`` (JSON for *.json, Prometheus text otherwise); no-op without a path."""
+        if not path:
+            return
+        body = json.dumps(self.to_json(), indent=2) if path.endswith('.json') else self.prometheus_text()
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmp, path)  # readers never see a half-written file
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+# Shared by every module
+metrics = Metrics()
+
+_profiling = threading.Lock()
+
+
+@contextmanager
+def profiled(command: str, mode: Optional[str] = None) -> Iterator[None]:
+    """Profile the block when profiling is enabled for ``command``.
+
+    ``mode`` defaults to SOCCER_PROFILE; SOCCER_PROFILE_COMMANDS, if set,
+    limits it to the listed commands. Only one block is profiled at a time;
+    inside an event loop cProfile also sees whatever else the loop runs.
+    """
+    mode = PROFILE_MODE if mode is None else mode
+    if not mode or (PROFILE_COMMANDS and command not in PROFILE_COMMANDS) or not _profiling.acquire(blocking=False):
+        yield
+        return
+    try:
+        if mode == 'cprofile':
+            import cProfile
+            import io
+            import pstats
+
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = os.path.join(PROFILE_DIR, f"{command}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+                profiler.dump_stats(path)
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(15)
+                logger.info("Profile of %s saved to %s\n%s", command, path, out.getvalue())
+        elif mode == 'tracemalloc':
+            import tracemalloc
+
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            try:
+                yield
+            finally:
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if started:
+                    tracemalloc.stop()
+                top = after.compare_to(before, 'lineno')[:10]
+                logger.info("Allocations of %s (peak %.1f MB):\n%s", command, peak / 2**20,
+                            '\n'.join(str(stat) for stat in top))
+        else:
+            logger.warning("Unknown SOCCER_PROFILE mode %r; not profiling", mode)
+            yield
+    finally:
+        _profiling.release()
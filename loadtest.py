@@ -0,0 +1,147 @@
+# loadtest.py
+"""Load test /today against a fake Telegram endpoint and report latency percentiles.
+
+    python loadtest.py --updates 5000                 # in-process: the /today path with its real sender
+    python loadtest.py --updates 5000 --webhook http://127.0.0.1:8443/<token> --stub-port 8081
+
+The in-process mode answers every update with daily_cache.respond_today,
+sending through an OutboundSender and the Bot API transport to stub_api.py,
+so it measures everything but python-telegram-bot's dispatch.
+
+The webhook mode drives a real bot. Start it against the stub, then point
+the load test at the bot's webhook:
+
+    SOCCER_TELEGRAM_API_URL=http://127.0.0.1:8081 SOCCER_WEBHOOK_URL=http://127.0.0.1:8443 python bot.py
+
+Each update is timed from its POST until the stub receives the last
+message sent to its chat. Flood limits are lifted in-process by default
+(``--global-rate``), so the numbers are the bot's own latency and not
+Telegram's 30 messages per second.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import numpy as np
+
+import renderer
+from daily_cache import DailyPredictions, respond_today
+from stub_api import StubAPI
+from telegram_sender import BotAPITransport, OutboundSender
+
+TOKEN = 'loadtest:token'
+NO_LIMIT = 1e9  # messages per second; effectively unthrottled
+
+
+class _Arrivals:
+    """Messages the stub received per chat, and a waiter for the expected count."""
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.counts: Dict[Any, int] = {}
+        self.waiters: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    def expect(self, chat_id: Any, n: int) -> asyncio.Future:
+        future = self.loop.create_future()
+        with self._lock:
+            self.waiters[chat_id] = (n, future)
+        return future
+
+    def __call__(self, payload: Dict[str, Any]) -> None:
+        # Runs on the stub's thread
+        chat_id = payload.get('chat_id')
+        with self._lock:
+            count = self.counts[chat_id] = self.counts.get(chat_id, 0) + 1
+            n, future = self.waiters.get(chat_id, (None, None))
+        if future is not None and count >= n:
+            self.loop.call_soon_threadsafe(lambda: future.done() or future.set_result(time.perf_counter()))
+
+
+def update_json(update_id: int, chat_id: int, text: str = '/today') -> Dict[str, Any]:
+    """A private-chat message update as Telegram posts it to a webhook."""
+    command = text.split()[0]
+    return {'update_id': update_id,
+            'message': {'message_id': update_id, 'date': int(time.time()), 'text': text,
+                        'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Load'},
+                        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Load'},
+                        'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]}}
+
+
+def report(latencies: List[float], elapsed: float) -> str:
+    ms = np.asarray(latencies) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return (f"{len(ms)} updates in {elapsed:.2f} s ({len(ms) / elapsed:,.0f}/s)  "
+            f"p50 {p50:.1f} ms  p90 {p90:.1f} ms  p99 {p99:.1f} ms  max {ms.max():.1f} ms")
+
+
+async def run_in_process(stub: StubAPI, n_updates: int, concurrency: int, global_rate: float,
+                         private_rate: float) -> List[float]:
+    daily = DailyPredictions(renderer.game_renderer(), renderer.TODAY_HEADER)
+    await asyncio.to_thread(daily.refresh)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        sender = OutboundSender(BotAPITransport(TOKEN, session, api_url=stub.url),
+                                global_rate=global_rate, private_rate=private_rate)
+
+        async def one(chat_id: int) -> float:
+            async with semaphore:
+                start = time.perf_counter()
+                await respond_today(daily, sender, chat_id, parse_mode=renderer.PARSE_MODE)
+                return time.perf_counter() - start
+
+        return await asyncio.gather(*(one(100_000 + i) for i in range(n_updates)))
+
+
+async def run_webhook(stub: StubAPI, arrivals: _Arrivals, webhook: str, n_updates: int, concurrency: int,
+                      messages: int, secret: Optional[str], timeout: float) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+
+        async def one(i: int) -> float:
+            chat_id = 100_000 + i
+            done = arrivals.expect(chat_id, messages)
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(webhook, json=update_json(i + 1, chat_id), headers=headers) as response:
+                    response.raise_for_status()
+            return await asyncio.wait_for(done, timeout) - start
+
+        return await asyncio.gather(*(one(i) for i in range(n_updates)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=2_000, help='simulated /today updates, one chat each')
+    parser.add_argument('--concurrency', type=int, default=1_000, help='updates in flight at once')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub Bot API latency per call, seconds')
+    parser.add_argument('--global-rate', type=float, default=NO_LIMIT, help='in-process sender messages/s')
+    parser.add_argument('--private-rate', type=float, default=NO_LIMIT, help='in-process messages/s per chat')
+    parser.add_argument('--webhook', help="bot webhook URL; default: in-process")
+    parser.add_argument('--secret', help='the bot\'s SOCCER_WEBHOOK_SECRET')
+    parser.add_argument('--stub-port', type=int, default=0, help='fixed port for the stub (webhook mode)')
+    parser.add_argument('--messages', type=int, default=1, help='messages the bot sends per /today (webhook mode)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds to wait for each reply')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    arrivals = _Arrivals(loop)
+    with StubAPI(latency=args.latency, port=args.stub_port, on_send=arrivals) as stub:
+        start = time.perf_counter()
+        if args.webhook:
+            latencies = loop.run_until_complete(run_webhook(stub, arrivals, args.webhook, args.updates,
+                                                            args.concurrency, args.messages, args.secret,
+                                                            args.timeout))
+        else:
+            latencies = loop.run_until_complete(run_in_process(stub, args.updates, args.concurrency,
+                                                               args.global_rate, args.private_rate))
+        elapsed = time.perf_counter() - start
+    loop.close()
+    print(report(latencies, elapsed))
+
+
+if __name__ == '__main__':
+    main()
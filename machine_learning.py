@@ -1,3 +1,122 @@
-# Add real ML model:
-from sklearn.ensemble import GradientBoostingClassifier
-model = joblib.load('advanced_soccer_model.pkl')
+# machine_learning.py
+"""Trained 1X2 model: lazy loading, a shared registry and batched inference.
+
+Importing this module is cheap: scikit-learn and joblib are only imported
+when a model is first used. Train a model with ``python train_model.py``;
+until the model file exists, predictor.py keeps using the AIModel heuristics.
+"""
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from features import FeatureView
+from team_store import FixtureTable
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.environ.get(
+    'SOCCER_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'advanced_soccer_model.pkl'))
+
+# Only what the results history can supply: training replays results, which carry
+# no injury reports or weather, so the model must not see those at inference either
+# (weather reaches the predictions through the score matrices, see predictor.py).
+FEATURE_NAMES = (
+    'home_form_avg',   # points per game over the form window
+    'away_form_avg',
+    'h2h_goals_avg',   # goals per meeting over recent h2h
+    'h2h_meetings',
+)
+OUTCOMES = ('1', 'X', '2')
+
+
+def feature_matrix(table: Union[FixtureTable, FeatureView]) -> np.ndarray:
+    """Model inputs, one row per fixture in FEATURE_NAMES order, from a FixtureTable or a FeatureView."""
+    n = len(table)
+    home_sum, home_len, away_sum, away_len = table.form_points()
+    h2h_len = table.h2h_len
+    X = np.zeros((n, len(FEATURE_NAMES)))
+    X[:, 0] = np.where(home_len > 0, home_sum / np.maximum(home_len, 1), 1.5)
+    X[:, 1] = np.where(away_len > 0, away_sum / np.maximum(away_len, 1), 1.5)
+    X[:, 2] = np.where(h2h_len > 0, table.h2h_goals() / np.maximum(h2h_len, 1), 2.5)
+    X[:, 3] = h2h_len
+    return X
+
+
+def build_features(games: List[Dict[str, Any]],
+                   table: Optional[Union[FixtureTable, FeatureView]] = None) -> np.ndarray:
+    """Model inputs for data_fetcher game dicts (pass ``table`` if already packed)."""
+    return feature_matrix(FixtureTable.from_games(games) if table is None else table)
+
+
+class ModelRegistry:
+    """Named models loaded on first use and shared by every caller.
+
+    Models are loaded with ``joblib.load(mmap_mode='r')``, so the arrays of an
+    uncompressed model file are memory-mapped rather than copied. Call
+    ``preload()`` before forking worker processes and they all share the
+    same pages.
+    """
+    def __init__(self):
+        self._paths: Dict[str, str] = {}
+        self._models: Dict[str, Any] = {}
+        self._missing: set = set()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str) -> None:
+        with self._lock:
+            self._paths[name] = path
+            self._models.pop(name, None)
+            self._missing.discard(name)
+
+    def get(self, name: str = 'outcome') -> Optional[Any]:
+        """The loaded model, or None if its file does not exist."""
+        model = self._models.get(name)
+        if model is not None or name in self._missing:
+            return model
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+            path = self._paths[name]
+            if not os.path.exists(path):
+                logger.info("No %s model at %s; using the heuristic models", name, path)
+                self._missing.add(name)
+                return None
+            import joblib
+
+            model = joblib.load(path, mmap_mode='r')
+            if getattr(model, 'n_features_in_', len(FEATURE_NAMES)) != len(FEATURE_NAMES):
+                logger.warning("The %s model at %s takes %d features, not the %d of FEATURE_NAMES; "
+                               "retrain it with train_model.py. Using the heuristic models",
+                               name, path, model.n_features_in_, len(FEATURE_NAMES))
+                self._missing.add(name)
+                return None
+            self._models[name] = model
+            logger.info("Loaded %s model from %s", name, path)
+            return model
+
+    def preload(self) -> None:
+        for name in list(self._paths):
+            self.get(name)
+
+
+registry = ModelRegistry()
+registry.register('outcome', MODEL_PATH)
+
+
+def predict_outcome_proba(games: List[Dict[str, Any]], table: Optional[Union[FixtureTable, FeatureView]] = None,
+                          model_name: str = 'outcome') -> Optional[np.ndarray]:
+    """P(1), P(X), P(2) for every game in one predict_proba call, or None without a model."""
+    model = registry.get(model_name)
+    if model is None:
+        return None
+    proba = model.predict_proba(build_features(games, table))
+    # Align columns with OUTCOMES; a class missing from the training data gets 0
+    aligned = np.zeros((len(games), len(OUTCOMES)))
+    classes = list(model.classes_)
+    for column, outcome in enumerate(OUTCOMES):
+        if outcome in classes:
+            aligned[:, column] = proba[:, classes.index(outcome)]
+    return aligned
@@ -1,7 +1,15 @@
-import requests
-import json
+import asyncio
+import logging
 from datetime import datetime, timedelta
-import pytz
+import aiohttp
+
+import enrichment
+import renderer
+from cache import response_cache
+from instrumentation import metrics, profiled
+from telegram_sender import BotAPITransport, OutboundSender
+
+logger = logging.getLogger(__name__)
 
 # Configuration (Replace with your actual tokens/IDs)
 TELEGRAM_BOT_TOKEN = 'YOUR_TELEGRAM_BOT_TOKEN'
@@ -9,27 +17,60 @@ TELEGRAM_CHANNEL_ID = '@YOUR_CHANNEL_ID'
 FOOTBALL_API_KEY = 'YOUR_FOOTBALL_DATA_API_KEY'
 WEATHER_API_KEY = 'YOUR_OPENWEATHER_API_KEY'
 
+FOOTBALL_API_URL = 'https://api.football-data.org/v4'
+WEATHER_API_URL = 'https://api.openweathermap.org/data/2.5'
+TELEGRAM_API_URL = 'https://api.telegram.org'
+REQUEST_TIMEOUT = enrichment.REQUEST_TIMEOUT
+
+def _mock_matches():
+    """Fallback mock data"""
+    return [
+        {
+            "id": 1,
+            "homeTeam": {"name": "Arsenal", "id": 57},
+            "awayTeam": {"name": "Chelsea", "id": 61},
+            "competition": {"name": "Premier League"},
+            "utcDate": (datetime.now() + timedelta(hours=2)).isoformat()
+        },
+        # ... add more mock matches
+    ]
+
 def get_todays_matches():
     """Fetch today's matches from football API (Mock example)"""
+    import requests  # only this synchronous path needs it
+
     today = datetime.now().strftime('%Y-%m-%d')
-    url = f"https://api.football-data.org/v4/matches?date={today}"
+    url = f"{FOOTBALL_API_URL}/matches?date={today}"
     headers = {'X-Auth-Token': FOOTBALL_API_KEY}
-    
+
+    def fetch():
+        with metrics.upstream('api.football-data.org'):
+            response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return response.json()['matches'][:16]  # Limit to 16 matches
+
     try:
-        response = requests.get(url, headers=headers)
-        return response.json()['matches'][:16]  # Limit to 16 matches
-    except:
-        # Fallback mock data
-        return [
-            {
-                "id": 1,
-                "homeTeam": {"name": "Arsenal", "id": 57},
-                "awayTeam": {"name": "Chelsea", "id": 61},
-                "competition": {"name": "Premier League"},
-                "utcDate": (datetime.now() + timedelta(hours=2)).isoformat()
-            },
-            # ... add more mock matches
-        ]
+        with metrics.span('fetch', source='football-data'):
+            return response_cache.get('fixtures', f"matches?date={today}", fetch)
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.warning("Fetching today's matches failed, using mock data: %r", e)
+        return _mock_matches()
+
+async def fetch_todays_matches(client):
+    """Async get_todays_matches through the shared pooled client"""
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    async def fetch():
+        payload = await client.get_json(f"{FOOTBALL_API_URL}/matches", params={'date': today},
+                                        headers={'X-Auth-Token': FOOTBALL_API_KEY})
+        return payload['matches'][:16]  # Limit to 16 matches
+
+    try:
+        with metrics.span('fetch', source='football-data'):
+            return await response_cache.aget('fixtures', f"matches?date={today}", fetch)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+        logger.warning("Fetching today's matches failed, using mock data: %r", e)
+        return _mock_matches()
 
 def get_match_details(match_id, home_id, away_id):
     """Fetch detailed match data (Mock with AI predictions)"""
@@ -65,56 +106,56 @@ def get_match_details(match_id, home_id, away_id):
         "referee": "Michael Oliver (Avg 4.2 yellow cards/match)"
     }
 
-def generate_match_report(match):
+_match_report = renderer.match_renderer()
+
+def generate_match_report(match, details=None):
     """Create formatted message for Telegram"""
-    details = get_match_details(match['id'], match['homeTeam']['id'], match['awayTeam']['id'])
-    
-    report = f"""
-⚽ *{match['homeTeam']['name']} vs {match['awayTeam']['name']}* 
-🏆 {match['competition']['name']}
-⏰ {datetime.fromisoformat(match['utcDate']).astimezone(pytz.utc).strftime('%H:%M UTC')}
-
-*AI Prediction:*
-✅ Most Probable Outcome: {'Home Win' if details['prediction']['outcome'] == '1' else 'Draw' if details['prediction']['outcome'] == 'X' else 'Away Win'} ({details['prediction']['confidence']}% confidence)
-🎯 Correct Score: {details['prediction']['correct_score']}
-🔔 Both Teams Score: {'Yes' if details['prediction']['btts_prob'] > 60 else 'No'} ({details['prediction']['btts_prob']}%)
-
-*Bookmaker Algorithms:*
-🎰 Hollywoodbets: {details['bookmaker_predictions']['Hollywoodbets']}
-🎲 Betway: {details['bookmaker_predictions']['Betway']}
-
-*Key Insights:*
-📊 Form: 
-   Home: {details['form']['home']} 
-   Away: {details['form']['away']}
-👥 Key Players: 
-   {details['key_players']['home']}
-   {details['key_players']['away']}
-💔 Injuries: {', '.join(details['injuries']) if details['injuries'] else 'None'}
-🌤️ Weather: {details['weather']}
-👮 Referee: {details['referee']}
-"""
-    return report
+    if details is None:
+        details = get_match_details(match['id'], match['homeTeam']['id'], match['awayTeam']['id'])
+    return _match_report(0, match, details)
+
+async def _send_reports(client, reports):
+    """Send reports through the shared rate-limited sender, packed into as few messages as fit"""
+    sender = OutboundSender(BotAPITransport(TELEGRAM_BOT_TOKEN, client.session, TELEGRAM_API_URL))
+    with metrics.span('send', command='mail'):
+        await sender.send_parts(TELEGRAM_CHANNEL_ID, reports, parse_mode=renderer.PARSE_MODE)
 
 def send_to_telegram(message):
     """Send message to Telegram channel"""
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TELEGRAM_CHANNEL_ID,
-        "text": message,
-        "parse_mode": "Markdown"
-    }
-    requests.post(url, json=payload)
+    async def send():
+        async with enrichment.AsyncHTTPClient() as client:
+            await _send_reports(client, [message])
+    asyncio.run(send())
 
-def main():
-    matches = get_todays_matches()
-    if not matches:
-        send_to_telegram("⚠️ No matches found for today")
-        return
-    
-    for match in matches:
-        report = generate_match_report(match)
-        send_to_telegram(report)
+def _default_details(match):
+    return get_match_details(match['id'], match['homeTeam']['id'], match['awayTeam']['id'])
+
+async def main_async():
+    """Fetch, enrich every match concurrently, then post the reports"""
+    async with enrichment.AsyncHTTPClient() as client:
+        matches = await fetch_todays_matches(client)
+        if not matches:
+            await _send_reports(client, [renderer.escape("⚠️ No matches found for today")])
+            return
+
+        enricher = enrichment.MatchEnricher(client, FOOTBALL_API_URL, WEATHER_API_URL,
+                                            FOOTBALL_API_KEY, WEATHER_API_KEY, cache=response_cache)
+        with metrics.span('enrich'):
+            all_details = await enricher.enrich_all(matches, _default_details)
+        with metrics.span('render'):
+            reports = [generate_match_report(match, details) for match, details in zip(matches, all_details)]
+        # The sender keeps the fixture order and the channel's flood limit
+        await _send_reports(client, reports)
+
+def main(argv=None):
+    import argparse
+
+    argparse.ArgumentParser(description="Post today's match reports to the Telegram channel").parse_args(argv)
+    with profiled('mail'):
+        try:
+            asyncio.run(main_async())
+        finally:
+            metrics.dump()
 
 if __name__ == "__main__":
     main()
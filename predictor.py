@@ -1,136 +1,508 @@
 # predictor.py
-import random
-from typing import Dict, Any, Tuple
+import hashlib
+import math
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import machine_learning
+from features import FeatureIndex, FeatureView
+from instrumentation import metrics
+from team_store import FixtureTable, teams
+from venues import weather_factors
+
+# Goal-probability matrices cover 0..MAX_GOALS goals for each side
+MAX_GOALS = 10
+# Dixon-Coles correlation for low scores (negative: 0-0 and 1-1 a bit more likely)
+DC_RHO = -0.1
+# How many of the most likely correct scores are kept per fixture
+TOP_SCORES = 5
+# Default seed of the per-fixture random streams (see fixture_uniforms and fixture_rng)
+SEED = 0
+# Bookmaker noise: how often the bookmaker models switch their 1X2 pick
+FLIP_RATE = 0.1
+# Consensus blend of main_model, hollywoodbets and betway probabilities
+CONSENSUS_WEIGHTS = (0.5, 0.25, 0.25)
+
+_GOALS = np.arange(MAX_GOALS + 1)
+# total_goals[i, j] = i + j, used to read over/under lines off the matrix
+_TOTAL_GOALS = _GOALS[:, None] + _GOALS[None, :]
+# Matrix cells grouped by total goals (row-major within a group) and where each group starts
+_TOTALS_ORDER = np.argsort(_TOTAL_GOALS.ravel(), kind='stable')
+_TOTALS_STARTS = np.searchsorted(_TOTAL_GOALS.ravel()[_TOTALS_ORDER], np.arange(2 * MAX_GOALS + 1))
+_HOME_WIN_MASK = _GOALS[:, None] > _GOALS[None, :]
+_AWAY_WIN_MASK = _GOALS[:, None] < _GOALS[None, :]
+_DRAW_MASK = _GOALS[:, None] == _GOALS[None, :]
+_SCORE_LABELS = [f"{c // (MAX_GOALS + 1)}-{c % (MAX_GOALS + 1)}" for c in range((MAX_GOALS + 1) ** 2)]
+
+
+def fixture_id(home_team: str, away_team: str, date: Any) -> int:
+    """Stable 64-bit id of a fixture (Python's hash() is salted per process)."""
+    digest = hashlib.sha256(f"{home_team}|{away_team}|{date}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def fixture_rng(home_team: str, away_team: str, date: Any, seed: int = SEED) -> np.random.Generator:
+    """Random stream of one fixture, derived from (seed, fixture id) only.
+
+    A fixture's draws do not depend on what else is predicted with it or in
+    which order, so its predictions can be reproduced and cached.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(fixture_id(home_team, away_team, date),)))
+
+
+def fixture_ids(games: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """fixture_id of every game, as uint64."""
+    return np.array([fixture_id(game['home_team'], game['away_team'], game['date']) for game in games],
+                    dtype=np.uint64)
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64's finalizer, elementwise on uint64 (arithmetic wraps mod 2**64)."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def fixture_uniforms(ids: np.ndarray, stream: int, n: int, seed: int = SEED) -> np.ndarray:
+    """``n`` uniforms in [0, 1) per fixture id from stream ``stream``, shape (len(ids), n).
+
+    Counter-based: draw j of a fixture is a hash of (seed, fixture id,
+    stream, j), so a fixture's draws never depend on the rest of the slate,
+    each model reads its own stream, and a whole slate is generated with a
+    few array operations instead of one generator per fixture.
+    """
+    with np.errstate(over='ignore'):
+        key = _mix64(np.asarray(ids, dtype=np.uint64) ^ _mix64(np.array(seed % 2**64, dtype=np.uint64)))
+        counters = (np.uint64(stream) << np.uint64(32)) + np.arange(1, n + 1, dtype=np.uint64)
+        bits = _mix64(key[:, None] + counters[None, :] * np.uint64(0x9E3779B97F4A7C15))
+    # The top 53 bits, as a double in [0, 1)
+    return (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def expected_goals(table: Union[FixtureTable, FeatureView], home_adv: float,
+                   weather: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Expected goals (Poisson means) for home and away from form and h2h.
+
+    ``table`` is a FixtureTable packed from the game dicts or a FeatureView
+    read from an incremental features.FeatureIndex. ``weather`` holds one
+    goal multiplier per fixture (venues.weather_factors).
+    """
+    home_form_sum, home_form_len, away_form_sum, away_form_len = table.form_points()
+    # Form scaled to about 2 goals max, as the old correct-score sampler did;
+    # a team without any form yet counts as 1.5 points a game
+    home_avg = np.where(home_form_len > 0, home_form_sum / np.maximum(home_form_len, 1), 1.5) / 3 * 2
+    away_avg = np.where(away_form_len > 0, away_form_sum / np.maximum(away_form_len, 1), 1.5) / 3 * 2
+    # Average h2h goals per side, 2.5 goals per game when there is no history
+    h2h_len = table.h2h_len
+    h2h_avg = np.where(h2h_len > 0, table.h2h_goals() / np.maximum(h2h_len, 1), 2.5) / 2
+    home_xg = (0.6 * home_avg + 0.4 * h2h_avg) * (1 + home_adv)
+    away_xg = (0.6 * away_avg + 0.4 * h2h_avg) * (1 - home_adv)
+    if weather is not None:
+        home_xg = home_xg * weather
+        away_xg = away_xg * weather
+    home_xg = np.maximum(0.2, home_xg)
+    away_xg = np.maximum(0.2, away_xg)
+    return home_xg, away_xg
+
+
+def game_weather(games: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Weather goal multiplier of each game, from its 'weather' field (1.0 without one)."""
+    return weather_factors([game.get('weather') for game in games])
+
+
+def _poisson_pmf(lam: np.ndarray) -> np.ndarray:
+    """P(goals = k) for k in 0..MAX_GOALS, one row per mean."""
+    pmf = np.empty((len(lam), MAX_GOALS + 1))
+    # math.exp and the multiplicative recurrence keep every row bit-identical
+    # whatever the batch size (SIMD exp/pow can differ in the last ulp)
+    pmf[:, 0] = [math.exp(-x) for x in lam.tolist()]
+    for k in range(1, MAX_GOALS + 1):
+        pmf[:, k] = pmf[:, k - 1] * lam / k
+    return pmf
+
+
+def score_matrices(home_xg: np.ndarray, away_xg: np.ndarray, rho: float = DC_RHO) -> np.ndarray:
+    """Dixon-Coles goal-probability matrices, shape (n, MAX_GOALS + 1, MAX_GOALS + 1).
+
+    ``matrices[f, i, j]`` is the probability that fixture ``f`` ends ``i-j``.
+    The whole slate is built with one broadcasted outer product.
+    """
+    home_xg = np.asarray(home_xg, dtype=float)
+    away_xg = np.asarray(away_xg, dtype=float)
+    matrices = _poisson_pmf(home_xg)[:, :, None] * _poisson_pmf(away_xg)[:, None, :]
+    # Dixon-Coles adjustment of the four low-score cells
+    matrices[:, 0, 0] *= 1 - home_xg * away_xg * rho
+    matrices[:, 0, 1] *= 1 + home_xg * rho
+    matrices[:, 1, 0] *= 1 + away_xg * rho
+    matrices[:, 1, 1] *= 1 - rho
+    # Renormalize: the adjustment and the goal cap both move a little mass
+    matrices /= matrices.sum(axis=(1, 2))[:, None, None]
+    return matrices
+
+
+def in_play_matrices(home_xg: np.ndarray, away_xg: np.ndarray, minute: np.ndarray,
+                     home_goals: np.ndarray, away_goals: np.ndarray, rho: float = DC_RHO) -> np.ndarray:
+    """Final-score matrices of matches in progress, same shape as score_matrices.
+
+    The goals still to come are Poisson with the pre-match means scaled to
+    the time left, shifted by the current score; Dixon-Coles only applies
+    while the match is still 0-0, and at minute 0 this equals score_matrices.
+    """
+    left = np.clip(1 - np.asarray(minute, dtype=float) / 90, 0, 1)
+    home_goals = np.minimum(home_goals, MAX_GOALS)
+    away_goals = np.minimum(away_goals, MAX_GOALS)
+    goalless = (home_goals == 0) & (away_goals == 0)
+    # Tiny floor so a match at full time keeps a valid (point mass) matrix
+    remaining = score_matrices(np.maximum(home_xg * left, 1e-9), np.maximum(away_xg * left, 1e-9),
+                               np.where(goalless, rho, 0.0))
+    size = MAX_GOALS + 1
+    matrices = np.zeros_like(remaining)
+    for f, (h, a) in enumerate(zip(home_goals.tolist(), away_goals.tolist())):
+        # Shift by the current score; outcomes past the cap are dropped and renormalized
+        matrices[f, h:, a:] = remaining[f, :size - h, :size - a]
+    matrices /= matrices.sum(axis=(1, 2))[:, None, None]
+    return matrices
+
+
+class ScoreMatrixSet:
+    """Score matrices for a slate of fixtures, with every market precomputed.
+
+    All markets are derived once with array operations when the set is built,
+    so reading any of them for a fixture afterwards is O(1).
+    """
+    def __init__(self, matrices: np.ndarray):
+        n = len(matrices)
+        flat = matrices.reshape(n, -1)
+        self.matrices = matrices
+        self.home = (matrices * _HOME_WIN_MASK).sum(axis=(1, 2))
+        self.draw = np.trace(matrices, axis1=1, axis2=2)
+        self.away = (matrices * _AWAY_WIN_MASK).sum(axis=(1, 2))
+        # P(both score) = 1 - P(home blank) - P(away blank) + P(0-0)
+        self.btts = 1 - matrices[:, 0, :].sum(axis=1) - matrices[:, :, 0].sum(axis=1) + matrices[:, 0, 0]
+        # totals_cdf[f, k] = P(total goals <= k)
+        totals = np.add.reduceat(flat[:, _TOTALS_ORDER], _TOTALS_STARTS, axis=1)
+        self.totals_cdf = np.cumsum(totals, axis=1)
+        # Most likely scores, best first (stable sort so ties keep matrix order)
+        self.top_cells = np.argsort(-flat, axis=1, kind='stable')[:, :TOP_SCORES]
+        self.top_probs = np.take_along_axis(flat, self.top_cells, axis=1)
+
+    @classmethod
+    def from_table(cls, table: Union[FixtureTable, FeatureView], home_adv: float,
+                   weather: Optional[np.ndarray] = None) -> 'ScoreMatrixSet':
+        return cls(score_matrices(*expected_goals(table, home_adv, weather)))
+
+    @classmethod
+    def from_games(cls, games: List[Dict[str, Any]], home_adv: float) -> 'ScoreMatrixSet':
+        return cls.from_table(FixtureTable.from_games(games), home_adv, game_weather(games))
+
+    @classmethod
+    def blend(cls, sets: Sequence['ScoreMatrixSet'], weights: Sequence[float]) -> 'ScoreMatrixSet':
+        """Weighted mixture of several models' sets for the same fixtures.
+
+        Every market except the top scores is linear in the matrix, so those
+        are blended directly instead of being rederived from the mixture.
+        """
+        w = np.asarray(weights, dtype=float) / sum(weights)
+        blended = cls.__new__(cls)
+        for name in ('matrices', 'home', 'draw', 'away', 'btts', 'totals_cdf'):
+            setattr(blended, name, np.tensordot(w, np.stack([getattr(s, name) for s in sets]), axes=1))
+        flat = blended.matrices.reshape(len(blended.matrices), -1)
+        blended.top_cells = np.argsort(-flat, axis=1, kind='stable')[:, :TOP_SCORES]
+        blended.top_probs = np.take_along_axis(flat, blended.top_cells, axis=1)
+        return blended
+
+    def rescaled(self, outcome_probs: np.ndarray) -> 'ScoreMatrixSet':
+        """The same matrices with their home-win, draw and away-win cells scaled to ``outcome_probs``.
+
+        Within each outcome the score distribution keeps its shape, so every
+        market read from the result agrees with the given 1X2.
+        """
+        current = np.maximum(self.outcome_probs, 1e-300)
+        scale = np.asarray(outcome_probs, dtype=float) / current
+        cell_scale = (scale[:, 0, None, None] * _HOME_WIN_MASK + scale[:, 1, None, None] * _DRAW_MASK
+                      + scale[:, 2, None, None] * _AWAY_WIN_MASK)
+        return type(self)(self.matrices * cell_scale)
+
+    @property
+    def outcome_probs(self) -> np.ndarray:
+        """P(1), P(X), P(2), shape (n, 3)."""
+        return np.stack([self.home, self.draw, self.away], axis=1)
+
+    def __len__(self) -> int:
+        return len(self.matrices)
+
+    def __getitem__(self, i: int) -> 'ScoreMatrix':
+        return ScoreMatrix(self, i)
+
+
+class ScoreMatrix:
+    """View of one fixture in a ScoreMatrixSet."""
+    __slots__ = ('_set', '_i')
+
+    def __init__(self, matrix_set: ScoreMatrixSet, i: int):
+        self._set = matrix_set
+        self._i = i
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._set.matrices[self._i]
+
+    def outcome_probs(self) -> Tuple[float, float, float]:
+        s, i = self._set, self._i
+        return float(s.home[i]), float(s.draw[i]), float(s.away[i])
+
+    def btts_prob(self) -> float:
+        return float(self._set.btts[self._i])
+
+    def over_prob(self, line: float = 2.5) -> float:
+        """Probability that total goals exceed a half-goal line such as 2.5."""
+        return float(over_probs(self._set.totals_cdf[self._i], line))
+
+    def top_scores(self, n: int = TOP_SCORES) -> List[Tuple[str, float]]:
+        cells = self._set.top_cells[self._i, :n].tolist()
+        probs = self._set.top_probs[self._i, :n].tolist()
+        return [(_SCORE_LABELS[c], p) for c, p in zip(cells, probs)]
+
+
+def over_probs(totals_cdf: np.ndarray, line: float) -> np.ndarray:
+    """P(total goals > ``line``) from totals CDFs, per fixture (last axis: total goals).
+
+    The matrices stop at MAX_GOALS a side, so nothing lies above a line of
+    2 * MAX_GOALS or more (0), and everything lies above a negative one (1).
+    """
+    k = math.floor(line)
+    if k < 0:
+        return np.ones(totals_cdf.shape[:-1])
+    if k >= totals_cdf.shape[-1]:
+        return np.zeros(totals_cdf.shape[:-1])
+    return 1 - totals_cdf[..., k]
+
+
+def model_matrices(model: 'AIModel', table: Union[FixtureTable, FeatureView], weather: Optional[np.ndarray],
+                   games: List[Dict[str, Any]]) -> ScoreMatrixSet:
+    """The score matrices ``model`` predicts every market from, per-game and batch alike.
+
+    For a model with ``trained`` set, the matrices are rescaled to the
+    trained 1X2 when a model file is loaded (see machine_learning.py), so
+    BTTS, over/under and correct score stay consistent with its 1X2 pick.
+    """
+    matrix_set = ScoreMatrixSet.from_table(table, model.home_adv, weather)
+    if model.trained:
+        with metrics.span('predict', model='trained'):
+            trained = machine_learning.predict_outcome_proba(games, table)
+        if trained is not None:
+            matrix_set = matrix_set.rescaled(trained)
+    return matrix_set
+
+
+def _pick_outcome(prob_home: float, prob_draw: float, prob_away: float) -> Tuple[str, float]:
+    if prob_home > prob_draw and prob_home > prob_away:
+        return '1', prob_home
+    elif prob_draw > prob_away:
+        return 'X', prob_draw
+    else:
+        return '2', prob_away
+
+
+def _pick_btts(prob_yes: float) -> Tuple[str, float]:
+    return ('Yes', prob_yes) if prob_yes >= 0.5 else ('No', 1 - prob_yes)
+
+
+def _pick_over_under(prob_over: float, line: float = 2.5) -> Tuple[str, float]:
+    return (f'Over {line}', prob_over) if prob_over >= 0.5 else (f'Under {line}', 1 - prob_over)
+
+
+def outcome_picks(probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized _pick_outcome: pick index (0, 1, 2 for '1', 'X', '2') and its probability."""
+    home, draw, away = probs.T
+    picks = np.where((home > draw) & (home > away), 0, np.where(draw > away, 1, 2))
+    return picks, probs[np.arange(len(probs)), picks]
+
+
+def flip_outcomes(picks: np.ndarray, conf: np.ndarray, draws: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized _flip_outcome over (n, 2) uniform draws."""
+    flip = draws[:, 0] < FLIP_RATE
+    other = (draws[:, 1] * 2).astype(int)
+    # The other two outcomes in '1', 'X', '2' order, indexed 0 or 1
+    other += other >= picks
+    return np.where(flip, other, picks), np.where(flip, conf * 0.8, conf)
+
 
 class AIModel:
-    """Mock AI model for soccer predictions."""
-    def predict_match_outcome(self, game: Dict[str, Any]) -> Tuple[str, float]:
-        # Returns one of '1', 'X', '2' and a confidence
-        # Mock: randomly choose with weights based on home form
-        home_form = sum(game['team_forms']['home']) / (len(game['team_forms']['home']) * 3)  # normalized to [0,1]
-        away_form = sum(game['team_forms']['away']) / (len(game['team_forms']['away']) * 3)
-        # Home advantage factor
-        home_adv = 0.1
-        prob_home = (home_form + home_adv) / (home_form + away_form + home_adv)
-        prob_draw = 0.2
-        prob_away = 1 - prob_home - prob_draw
-        # Normalize if needed
-        total = prob_home + prob_draw + prob_away
-        prob_home /= total
-        prob_draw /= total
-        prob_away /= total
-
-        # Now choose the outcome with the highest probability
-        if prob_home > prob_draw and prob_home > prob_away:
-            return '1', prob_home
-        elif prob_draw > prob_away:
-            return 'X', prob_draw
-        else:
-            return '2', prob_away
-
-    def predict_btts(self, game: Dict[str, Any]) -> Tuple[str, float]:
-        # Returns 'Yes' or 'No' and confidence
-        # Mock: based on average goals in h2h and current form
-        total_goals = 0
-        for match in game['h2h']:
-            home_goals, away_goals = match['score'].split('-')
-            total_goals += int(home_goals) + int(away_goals)
-        avg_goals = total_goals / len(game['h2h']) if game['h2h'] else 2.5
-        # If average goals > 2.5, then more likely both to score
-        prob_yes = min(0.9, max(0.1, (avg_goals - 1) / 3))
-        if random.random() < prob_yes:
-            return 'Yes', prob_yes
-        else:
-            return 'No', 1 - prob_yes
-
-    def predict_correct_score(self, game: Dict[str, Any]) -> Tuple[str, float]:
-        # Returns a string like "2-1" and confidence
-        # Mock: use form and h2h to generate a score
-        home_avg = sum(game['team_forms']['home']) / len(game['team_forms']['home']) / 3 * 2  # scale to about 2 goals max
-        away_avg = sum(game['team_forms']['away']) / len(game['team_forms']['away']) / 3 * 2
-        home_goals = max(0, min(5, round(home_avg + random.normalvariate(0, 0.5))))
-        away_goals = max(0, min(5, round(away_avg + random.normalvariate(0, 0.5))))
-        score = f"{int(home_goals)}-{int(away_goals)}"
-        # Confidence is arbitrary, we can use the inverse of the variance of the form? But we mock.
-        confidence = random.uniform(0.1, 0.3)  # correct score is hard, so low confidence
-        return score, confidence
+    """Poisson/Dixon-Coles model for soccer predictions.
+
+    Every market is read from one goal-probability matrix per fixture, so the
+    1X2, BTTS, over/under and correct-score picks always agree. Pass the
+    ``matrix`` from ``score_matrix`` to avoid rebuilding it for each market.
+    """
+    # Home advantage: multiplies home expected goals by (1 + home_adv), away by (1 - home_adv)
+    home_adv = 0.1
+    # Models that add bookmaker noise draw two uniforms per fixture from their own stream
+    flips = False
+    stream = 0
+    # Whether the trained 1X2 model, when loaded, replaces this model's own 1X2 (see model_matrices)
+    trained = True
+
+    def score_matrix(self, game: Dict[str, Any]) -> ScoreMatrix:
+        return model_matrices(self, FixtureTable.from_games([game]), game_weather([game]), [game])[0]
+
+    def predict_match_outcome(self, game: Dict[str, Any], matrix: Optional[ScoreMatrix] = None,
+                              seed: int = SEED) -> Tuple[str, float]:
+        # Returns one of '1', 'X', '2' and its probability
+        matrix = matrix or self.score_matrix(game)
+        pick = _pick_outcome(*matrix.outcome_probs())
+        if self.flips:
+            return _flip_outcome(*pick, fixture_uniforms(fixture_ids([game]), self.stream, 2, seed)[0].tolist())
+        return pick
+
+    def predict_btts(self, game: Dict[str, Any], matrix: Optional[ScoreMatrix] = None) -> Tuple[str, float]:
+        # Returns 'Yes' or 'No' and its probability
+        matrix = matrix or self.score_matrix(game)
+        return _pick_btts(matrix.btts_prob())
+
+    def predict_over_under(self, game: Dict[str, Any], line: float = 2.5,
+                           matrix: Optional[ScoreMatrix] = None) -> Tuple[str, float]:
+        # Returns e.g. 'Over 2.5' and its probability
+        matrix = matrix or self.score_matrix(game)
+        return _pick_over_under(matrix.over_prob(line), line)
+
+    def predict_correct_score(self, game: Dict[str, Any], matrix: Optional[ScoreMatrix] = None) -> Tuple[str, float]:
+        # Returns the most likely score like "2-1" and its probability
+        matrix = matrix or self.score_matrix(game)
+        return matrix.top_scores(1)[0]
+
+def _flip_outcome(pred: str, conf: float, draws: Sequence[float]) -> Tuple[str, float]:
+    """Bookmaker noise: FLIP_RATE of the time switch to one of the other two outcomes."""
+    flip, choice = draws
+    if flip < FLIP_RATE:
+        # change the prediction to one of the other two
+        options = ['1', 'X', '2']
+        options.remove(pred)
+        pred = options[int(choice * 2)]
+        conf = conf * 0.8  # reduce confidence
+    return pred, conf
 
 class HollywoodbetsModel(AIModel):
     """Hollywoodbets model (mock) that might have a slight variation."""
-    def predict_match_outcome(self, game: Dict[str, Any]) -> Tuple[str, float]:
-        # We'll adjust the home advantage to be higher for Hollywoodbets
-        # Copy the parent method but adjust the home_adv
-        home_form = sum(game['team_forms']['home']) / (len(game['team_forms']['home']) * 3)
-        away_form = sum(game['team_forms']['away']) / (len(game['team_forms']['away']) * 3)
-        home_adv = 0.15  # slightly higher home advantage
-        # ... same as parent but with home_adv=0.15
-        prob_home = (home_form + home_adv) / (home_form + away_form + home_adv)
-        # ... rest same
-        # For brevity, we'll just call parent and then adjust randomly? Or we can override the entire logic differently.
-        # Let's just call the parent and then flip a coin to change 10% of the time?
-        pred, conf = super().predict_match_outcome(game)
-        if random.random() < 0.1:
-            # change the prediction to one of the other two
-            options = ['1','X','2']
-            options.remove(pred)
-            pred = random.choice(options)
-            conf = conf * 0.8  # reduce confidence
-        return pred, conf
+    home_adv = 0.15  # slightly higher home advantage
+    flips = True
+    trained = False
+    stream = 1
 
 class BetwayModel(AIModel):
     """Betway model (mock) that might have a slight variation."""
-    def predict_match_outcome(self, game: Dict[str, Any]) -> Tuple[str, float]:
-        # We'll adjust the home advantage to be lower for Betway
-        home_form = sum(game['team_forms']['home']) / (len(game['team_forms']['home']) * 3)
-        away_form = sum(game['team_forms']['away']) / (len(game['team_forms']['away']) * 3)
-        home_adv = 0.05  # lower home advantage
-        # ... same as parent
-        # Similarly, we can do as above but for simplicity we'll use the parent and then adjust 10% of the time
-        pred, conf = super().predict_match_outcome(game)
-        if random.random() < 0.1:
-            options = ['1','X','2']
-            options.remove(pred)
-            pred = random.choice(options)
-            conf = conf * 0.8
-        return pred, conf
+    home_adv = 0.05  # lower home advantage
+    flips = True
+    trained = False
+    stream = 2
+
+# The models are stateless, so one instance of each is shared by every call
+main_model = AIModel()
+hollywood_model = HollywoodbetsModel()
+betway_model = BetwayModel()
+
+_MODELS = (('main_model', main_model), ('hollywoodbets', hollywood_model), ('betway', betway_model))
+_FLIPPING = [name for name, model in _MODELS if model.flips]
+
+
+def flip_draws(games: List[Dict[str, Any]], seed: int = SEED) -> np.ndarray:
+    """The bookmaker flip draws of every fixture, shape (n, 2 * flipping models).
+
+    Columns 2k and 2k + 1 are the k-th flipping model's (in _MODELS order)
+    two uniforms from its own stream, exactly what its
+    ``predict_match_outcome`` draws for the game.
+    """
+    ids = fixture_ids(games)
+    return np.hstack([fixture_uniforms(ids, model.stream, 2, seed) for _, model in _MODELS if model.flips]
+                     or [np.empty((len(games), 0))])
+
+
+def slate_predictions(outcome_probs: np.ndarray, matrix_set: ScoreMatrixSet,
+                       draws: Optional[np.ndarray] = None, line: float = 2.5) -> List[Dict[str, Tuple[str, float]]]:
+    """Every market's pick for a slate, the vectorized form of the AIModel.predict_* methods."""
+    picks, conf = outcome_picks(outcome_probs)
+    if draws is not None:
+        picks, conf = flip_outcomes(picks, conf, draws)
+    over = over_probs(matrix_set.totals_cdf, line)
+    # _pick_btts and _pick_over_under for the whole slate; the labels are shared strings
+    btts_yes = matrix_set.btts >= 0.5
+    btts_prob = np.where(btts_yes, matrix_set.btts, 1 - matrix_set.btts)
+    is_over = over >= 0.5
+    over_prob = np.where(is_over, over, 1 - over)
+    btts_labels = ('No', 'Yes')
+    over_labels = (f'Under {line}', f'Over {line}')
+    return [{
+        '1x2': ('1X2'[pick], prob),
+        'btts': (btts_labels[yes], p_btts),
+        'correct_score': (_SCORE_LABELS[cell], score_prob),
+        'over_under': (over_labels[is_o], p_over),
+    } for pick, prob, yes, p_btts, cell, score_prob, is_o, p_over in zip(
+        picks.tolist(), conf.tolist(), btts_yes.tolist(), btts_prob.tolist(), matrix_set.top_cells[:, 0].tolist(),
+        matrix_set.top_probs[:, 0].tolist(), is_over.tolist(), over_prob.tolist())]
+
+
+def consensus_outcome_probs(outcome_probs: Sequence[np.ndarray],
+                            weights: Sequence[float] = CONSENSUS_WEIGHTS) -> np.ndarray:
+    """Weighted blend of each model's (n, 3) 1X2 probabilities in one step."""
+    w = np.asarray(weights, dtype=float) / sum(weights)
+    return np.tensordot(w, np.stack(outcome_probs), axes=1)
+
 
 # We'll create a predictor that uses all three models
-def predict_game(game: Dict[str, Any]) -> Dict[str, Any]:
-    main_model = AIModel()
-    hollywood_model = HollywoodbetsModel()
-    betway_model = BetwayModel()
-
-    # Predict match outcome
-    main_1x2, main_1x2_conf = main_model.predict_match_outcome(game)
-    holly_1x2, holly_1x2_conf = hollywood_model.predict_match_outcome(game)
-    betway_1x2, betway_1x2_conf = betway_model.predict_match_outcome(game)
-
-    # Predict BTTS
-    main_btts, main_btts_conf = main_model.predict_btts(game)
-    # For Hollywoodbets and Betway, we can use the same BTTS model? or have their own?
-    # We'll use the same for BTTS for simplicity
-    holly_btts, holly_btts_conf = hollywood_model.predict_btts(game)
-    betway_btts, betway_btts_conf = betway_model.predict_btts(game)
-
-    # Predict correct score
-    main_cs, main_cs_conf = main_model.predict_correct_score(game)
-    holly_cs, holly_cs_conf = hollywood_model.predict_correct_score(game)
-    betway_cs, betway_cs_conf = betway_model.predict_correct_score(game)
-
-    return {
-        'main_model': {
-            '1x2': (main_1x2, main_1x2_conf),
-            'btts': (main_btts, main_btts_conf),
-            'correct_score': (main_cs, main_cs_conf)
-        },
-        'hollywoodbets': {
-            '1x2': (holly_1x2, holly_1x2_conf),
-            'btts': (holly_btts, holly_btts_conf),
-            'correct_score': (holly_cs, holly_cs_conf)
-        },
-        'betway': {
-            '1x2': (betway_1x2, betway_1x2_conf),
-            'btts': (betway_btts, betway_btts_conf),
-            'correct_score': (betway_cs, betway_cs_conf)
-        }
-    }
+def predict_game(game: Dict[str, Any], seed: int = SEED) -> Dict[str, Any]:
+    return predict_games([game], seed=seed)[0]
+
+def predict_games(games: List[Dict[str, Any]], chunk_size: int = 10_000,
+                  index: Optional[FeatureIndex] = None, seed: int = SEED) -> List[Dict[str, Any]]:
+    """Predict a whole fixture list in one pass.
+
+    The score matrices of each model are built for ``chunk_size`` fixtures at
+    a time with one vectorized operation (a chunk is about 1 MB per 1k games
+    per model), and every market of every model is picked with array
+    operations. The only random draws, the bookmaker outcome flips, come
+    from each fixture's own ``fixture_uniforms``, so a fixture's predictions
+    depend only on its inputs and ``seed``, never on the rest of the list.
+
+    Besides the three models, ``consensus`` holds the picks of their
+    probabilities blended with CONSENSUS_WEIGHTS (without bookmaker flips).
+
+    With an ``index``, form and h2h come from its rolling windows instead of
+    each game's ``team_forms`` and ``h2h`` lists. When a trained model is
+    available (see machine_learning.py) the main model's matrices are
+    rescaled to its 1X2, from one batched ``predict_proba`` call per chunk
+    (see model_matrices), exactly as ``AIModel.score_matrix`` does per game.
+    """
+    results = []
+    for start in range(0, len(games), chunk_size):
+        chunk = games[start:start + chunk_size]
+        # Pack the chunk once; all three models read their features from the same table
+        with metrics.span('features'):
+            if index is None:
+                table = FixtureTable.from_games(chunk)
+            else:
+                table = index.view([teams.intern(game['home_team']) for game in chunk],
+                                   [teams.intern(game['away_team']) for game in chunk])
+            weather = game_weather(chunk)
+        draws = flip_draws(chunk, seed)
+        sets, outcome_probs, per_model = [], [], {}
+        for name, model in _MODELS:
+            with metrics.span('predict', model=name):
+                matrix_set = model_matrices(model, table, weather, chunk)
+                probs = matrix_set.outcome_probs
+                flip = None
+                if model.flips:
+                    k = _FLIPPING.index(name)
+                    flip = draws[:, 2 * k:2 * k + 2]
+                per_model[name] = slate_predictions(probs, matrix_set, flip)
+            sets.append(matrix_set)
+            outcome_probs.append(probs)
+        with metrics.span('predict', model='consensus'):
+            per_model['consensus'] = slate_predictions(consensus_outcome_probs(outcome_probs),
+                                                        ScoreMatrixSet.blend(sets, CONSENSUS_WEIGHTS))
+        results.extend({name: predictions[i] for name, predictions in per_model.items()}
+                       for i in range(len(chunk)))
+    return results
+
@@ -0,0 +1,380 @@
+# renderer.py
+"""Compiled message templates shared by bot.py, mail.py and ai_predictor.py.
+
+Templates are written once in a small neutral markup: ``*bold*``,
+``_italic_``, ```code``` and ``{field}``/``{field:spec}`` placeholders, with
+``\\`` escaping a literal marker. Compiling a template for a parse mode
+(MarkdownV2, HTML or legacy Markdown) escapes its literal text once into a
+plain format string; rendering formats and escapes every field value for
+that mode in bulk: a team called ``Team_A*`` no longer breaks the message.
+
+Fixture blocks go through a FixtureRenderer, which renders each fixture's
+fragment once and reuses it for every message, position and channel that
+includes the fixture, for as long as its predictions object is unchanged.
+"""
+import re
+import string
+from datetime import datetime, timezone
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+MARKDOWN_V2 = 'MarkdownV2'
+HTML = 'HTML'
+MARKDOWN = 'Markdown'  # Telegram's legacy Markdown
+PARSE_MODE = MARKDOWN_V2  # what the bot, mail and ai_predictor send with
+
+FRAGMENT_CACHE_SIZE = 100_000
+FORM_MEMO_SIZE = 200_000  # distinct form strings remembered
+
+_MARKERS = {'*': 'bold', '_': 'italic', '`': 'code'}
+_TAGS = {
+    MARKDOWN_V2: {'bold': ('*', '*'), 'italic': ('_', '_'), 'code': ('`', '`')},
+    MARKDOWN: {'bold': ('*', '*'), 'italic': ('_', '_'), 'code': ('`', '`')},
+    HTML: {'bold': ('<b>', '</b>'), 'italic': ('<i>', '</i>'), 'code': ('<code>', '</code>')},
+}
+# Per mode: (outside code, inside code) (character, escaped) pairs, the escape character first
+_ESCAPES = {
+    MARKDOWN_V2: (tuple((c, '\\' + c) for c in '\\_*[]()~`>#+-=|{}.!'), (('\\', '\\\\'), ('`', '\\`'))),
+    MARKDOWN: (tuple((c, '\\' + c) for c in '_*`['), ()),
+    HTML: ((('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;')),) * 2,
+}
+# Joins a render's field texts so they are escaped in one pass; Telegram rejects NUL in messages anyway
+_SEPARATOR = '\x00'
+_CONVERSIONS = {'r': repr, 's': str, 'a': ascii}
+
+
+def _escape(text: str, pairs: Tuple[Tuple[str, str], ...]) -> str:
+    # One str.replace per reserved character actually present: each is a C scan of the whole text
+    for char, escaped in pairs:
+        if char in text:
+            text = text.replace(char, escaped)
+    return text
+
+
+def escape(text: str, mode: str = PARSE_MODE) -> str:
+    """``text`` escaped to show as-is in a message sent with ``mode``."""
+    return _escape(str(text), _ESCAPES[mode][0])
+
+
+class Template:
+    """A message template compiled for one parse mode.
+
+    Compiling escapes the literal text once and resolves each distinct
+    field to a getter: a template of plain names fetches all its values
+    with one itemgetter call. ``render(values)`` formats the fields,
+    escapes all of them in a single pass over their joined text and joins
+    them with the literal pieces. Field names may also index into the
+    values as in str.format (``{main[1x2][0]}``).
+    """
+    __slots__ = ('source', 'mode', '_pieces', '_groups', '_pick')
+
+    def __init__(self, source: str, mode: str = PARSE_MODE):
+        if mode not in _TAGS:
+            raise ValueError(f"Unknown parse mode {mode!r}")
+        self.source = source
+        self.mode = mode
+        tags, (plain, code) = _TAGS[mode], _ESCAPES[mode]
+        pieces: List[str] = []  # the escaped literal text around each field
+        literal: List[str] = []
+        slots: List[Tuple[str, str, Optional[str], bool]] = []  # (name, spec, conversion, in code) per field
+        open_styles: List[str] = []
+        for text, name, spec, conversion in string.Formatter().parse(source):
+            chars = iter(text)
+            for char in chars:
+                if char == '\\':
+                    char = next(chars, '\\')
+                elif char in _MARKERS:
+                    style = _MARKERS[char]
+                    if open_styles and open_styles[-1] == style:
+                        open_styles.pop()
+                        literal.append(tags[style][1])
+                    elif style in open_styles:
+                        raise ValueError(f"Overlapping {char!r} markup in template: {source!r}")
+                    else:
+                        open_styles.append(style)
+                        literal.append(tags[style][0])
+                    continue
+                literal.append(_escape(char, code if 'code' in open_styles else plain))
+            if name is not None:
+                pieces.append(''.join(literal))
+                literal = []
+                slots.append((name, spec or '', conversion, 'code' in open_styles))
+        if open_styles:
+            raise ValueError(f"Unclosed {open_styles[-1]} markup in template: {source!r}")
+
+        pieces.append(''.join(literal))
+        # Literal text at even indexes; render fills the odd ones with the fields
+        self._pieces = [None] * (2 * len(pieces) - 1)
+        self._pieces[::2] = pieces
+        # Each distinct field is formatted once; plain and code fields escape differently
+        fields = sorted(dict.fromkeys(slots), key=lambda field: field[3])
+        self._groups = tuple(
+            (pairs, _fetcher([(name, conversion) for name, _, conversion, _ in group]),
+             tuple(spec for _, spec, _, _ in group), len(group))
+            for pairs, group in ((plain, [f for f in fields if not f[3]]), (code, [f for f in fields if f[3]]))
+            if group)
+        number = {field: i for i, field in enumerate(fields)}
+        self._pick = _picker([number[slot] for slot in slots])
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        escaped: List[str] = []
+        for pairs, fetch, specs, n in self._groups:
+            texts = _escape(_SEPARATOR.join(map(format, fetch(values), specs)), pairs).split(_SEPARATOR)
+            if len(texts) != n:
+                # A value contained the separator: escape field by field
+                texts = [_escape(format(value, spec), pairs) for value, spec in zip(fetch(values), specs)]
+            escaped += texts
+        out = self._pieces.copy()
+        out[1::2] = self._pick(escaped)
+        return ''.join(out)
+
+
+def _fetcher(fields: List[Tuple[str, Optional[str]]]) -> Callable[[Mapping[str, Any]], Sequence[Any]]:
+    """The values of (field name, conversion) ``fields``, in order; one C call when all are plain keys."""
+    if all(conversion is None and re.fullmatch(r'[^.\[]+', name) for name, conversion in fields):
+        return _picker([name for name, _ in fields])
+    getters = [_getter(name, conversion) for name, conversion in fields]
+    return lambda values: [get(values) for get in getters]
+
+
+def _getter(name: str, conversion: Optional[str]) -> Callable[[Mapping[str, Any]], Any]:
+    """Getter for a str.format field name, e.g. main[1x2][0] -> values['main']['1x2'][0]."""
+    first, rest = re.match(r'([^.\[]*)(.*)$', name).groups()
+    steps = [itemgetter(first)]
+    for key, attr in re.findall(r'\[([^\]]*)\]|\.(\w+)', rest):
+        steps.append(attrgetter(attr) if attr else itemgetter(int(key) if key.isdigit() else key))
+    if conversion:
+        steps.append(_CONVERSIONS[conversion])
+    if len(steps) == 1:
+        return steps[0]
+
+    def get(values: Mapping[str, Any]) -> Any:
+        for step in steps:
+            values = step(values)
+        return values
+    return get
+
+
+def _picker(keys: List[Any]) -> Callable[[Any], Tuple[Any, ...]]:
+    """itemgetter(*keys), but always returning a tuple, even for zero or one key."""
+    if len(keys) > 1:
+        return itemgetter(*keys)
+    if keys:
+        pick = itemgetter(keys[0])
+        return lambda values: (pick(values),)
+    return lambda values: ()
+
+
+class FixtureRenderer:
+    """Renders fixture blocks, each fixture's fragment once.
+
+    ``fields(game, predictions)`` gathers the template's values (form
+    strings and the like are computed there, once per fragment);
+    ``key(game)`` identifies the fixture. ``prefix`` (with a ``number``
+    field, 1-based) is rendered per position in front of the fragment, so
+    moving a fixture never re-renders it. Call it as
+    ``render(position, game, predictions)``, the signature DailyPredictions
+    and subscriptions.plan expect.
+    """
+    def __init__(self, template: Template, fields: Callable[[Dict[str, Any], Any], Mapping[str, Any]],
+                 key: Callable[[Dict[str, Any]], Hashable], prefix: Optional[Template] = None,
+                 max_entries: int = FRAGMENT_CACHE_SIZE):
+        self.template = template
+        self.fields = fields
+        self.key = key
+        self.prefix = prefix
+        self.max_entries = max_entries
+        # Insertion-ordered, so the oldest fragment is evicted first. Single dict
+        # operations are atomic, so DailyPredictions.refresh (a worker thread) and
+        # the subscriptions push (the event loop) can share one renderer.
+        self._fragments: Dict[Hashable, Tuple[Any, str]] = {}
+        self._prefixes: Dict[int, str] = {}
+        self.hits = self.misses = 0
+
+    def fragment(self, game: Dict[str, Any], predictions: Any) -> str:
+        key = self.key(game)
+        cached = self._fragments.get(key)
+        # New predictions mean new inputs (daily_cache re-predicts on any change)
+        if cached is not None and cached[0] is predictions:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        text = self.template.render(self.fields(game, predictions))
+        self._fragments.pop(key, None)
+        self._fragments[key] = (predictions, text)
+        if len(self._fragments) > self.max_entries:
+            self._fragments.pop(next(iter(self._fragments)), None)
+        return text
+
+    def __call__(self, position: int, game: Dict[str, Any], predictions: Any) -> str:
+        if self.prefix is None:
+            return self.fragment(game, predictions)
+        prefix = self._prefixes.get(position)
+        if prefix is None:
+            prefix = self._prefixes[position] = self.prefix.render({'number': position + 1})
+        return prefix + self.fragment(game, predictions)
+
+
+_FORM_LETTERS = {3: 'W', 1: 'D'}
+_FORMS: Dict[Tuple[int, ...], str] = {}  # a five-match window has at most 3^5 forms
+
+
+def form_string(points: List[int]) -> str:
+    """[3, 1, 0] -> 'WDL'"""
+    key = tuple(points)
+    form = _FORMS.get(key)
+    if form is None:
+        form = ''.join([_FORM_LETTERS.get(x, 'L') for x in points])
+        if len(_FORMS) < FORM_MEMO_SIZE:
+            _FORMS[key] = form
+    return form
+
+
+# --- bot.py: /today and subscriptions -------------------------------------------------
+
+TODAY_HEADER = Template(
+    "⚽️ *Today's Soccer Predictions* ⚽️\n\n"
+    "_(Predictions by our AI, Hollywoodbets AI, and Betway AI)_\n\n"
+).render({})
+
+GAME_PREFIX = Template("*Game {number}:* ")
+
+GAME_BLOCK = Template(
+    "*{home} vs {away}*\n"
+    "Date: {date}\n"
+    "Form:\n  {home}: {home_form}\n  {away}: {away_form}\n"
+    "Injuries: {home_injuries} for {home}, {away_injuries} for {away}\n"
+    "Weather: {weather}, Pitch: {pitch}, Ref: {referee}\n"
+    "\n*Our AI Prediction:*\n"
+    "  Outcome: {main_outcome} (confidence: {main_confidence:.1%})\n"
+    "  BTTS: {main_btts} (confidence: {main_btts_confidence:.1%})\n"
+    "  Correct Score: {main_score} (confidence: {main_score_confidence:.1%})\n"
+    "\n*Hollywoodbets AI:*\n"
+    "  Outcome: {holly_outcome} (confidence: {holly_confidence:.1%})\n"
+    "  BTTS: {holly_btts}\n"
+    "  Correct Score: {holly_score}\n"
+    "\n*Betway AI:*\n"
+    "  Outcome: {betway_outcome} (confidence: {betway_confidence:.1%})\n"
+    "  BTTS: {betway_btts}\n"
+    "  Correct Score: {betway_score}\n"
+    "--------------------------------\n\n"
+)
+
+
+def game_fields(game: Dict[str, Any], preds: Dict[str, Any]) -> Dict[str, Any]:
+    # Flat keys: a template of plain names fetches all its values with one itemgetter call
+    forms, injuries = game['team_forms'], game['injuries']
+    main, holly, betway = preds['main_model'], preds['hollywoodbets'], preds['betway']
+    (main_outcome, main_confidence), (main_btts, main_btts_confidence) = main['1x2'], main['btts']
+    main_score, main_score_confidence = main['correct_score']
+    return {
+        'home': game['home_team'], 'away': game['away_team'], 'date': game['date'],
+        'home_form': form_string(forms['home']), 'away_form': form_string(forms['away']),
+        'home_injuries': len(injuries['home']), 'away_injuries': len(injuries['away']),
+        'weather': game['weather'], 'pitch': game['pitch'], 'referee': game['referee'],
+        'main_outcome': main_outcome, 'main_confidence': main_confidence,
+        'main_btts': main_btts, 'main_btts_confidence': main_btts_confidence,
+        'main_score': main_score, 'main_score_confidence': main_score_confidence,
+        'holly_outcome': holly['1x2'][0], 'holly_confidence': holly['1x2'][1],
+        'holly_btts': holly['btts'][0], 'holly_score': holly['correct_score'][0],
+        'betway_outcome': betway['1x2'][0], 'betway_confidence': betway['1x2'][1],
+        'betway_btts': betway['btts'][0], 'betway_score': betway['correct_score'][0],
+    }
+
+
+def _game_key(game: Dict[str, Any]) -> Tuple[str, str, Any]:
+    # daily_cache.fixture_key without str(date), and without importing the prediction pipeline
+    return game['home_team'], game['away_team'], game['date']
+
+
+def game_renderer() -> FixtureRenderer:
+    """Numbered predict_games blocks, as sent by /today and the subscriptions push."""
+    return FixtureRenderer(GAME_BLOCK, game_fields, _game_key, prefix=GAME_PREFIX)
+
+
+# --- mail.py: enriched match reports --------------------------------------------------
+
+MATCH_REPORT = Template(
+    "\n⚽ *{home} vs {away}* \n"
+    "🏆 {competition}\n"
+    "⏰ {kickoff}\n"
+    "\n*AI Prediction:*\n"
+    "✅ Most Probable Outcome: {outcome} ({confidence}% confidence)\n"
+    "🎯 Correct Score: {correct_score}\n"
+    "🔔 Both Teams Score: {btts} ({btts_prob}%)\n"
+    "\n*Bookmaker Algorithms:*\n"
+    "🎰 Hollywoodbets: {hollywoodbets}\n"
+    "🎲 Betway: {betway}\n"
+    "\n*Key Insights:*\n"
+    "📊 Form: \n"
+    "   Home: {home_form} \n"
+    "   Away: {away_form}\n"
+    "👥 Key Players: \n"
+    "   {home_player}\n"
+    "   {away_player}\n"
+    "💔 Injuries: {injuries}\n"
+    "🌤️ Weather: {weather}\n"
+    "👮 Referee: {referee}\n"
+)
+
+_OUTCOMES = {'1': 'Home Win', 'X': 'Draw'}
+
+
+def match_fields(match: Dict[str, Any], details: Dict[str, Any]) -> Dict[str, Any]:
+    prediction = details['prediction']
+    kickoff = datetime.fromisoformat(match['utcDate'].replace('Z', '+00:00')).astimezone(timezone.utc)
+    return {
+        'home': match['homeTeam']['name'], 'away': match['awayTeam']['name'],
+        'competition': match['competition']['name'], 'kickoff': kickoff.strftime('%H:%M UTC'),
+        'outcome': _OUTCOMES.get(prediction['outcome'], 'Away Win'), 'confidence': prediction['confidence'],
+        'correct_score': prediction['correct_score'],
+        'btts': 'Yes' if prediction['btts_prob'] > 60 else 'No', 'btts_prob': prediction['btts_prob'],
+        'hollywoodbets': details['bookmaker_predictions']['Hollywoodbets'],
+        'betway': details['bookmaker_predictions']['Betway'],
+        'home_form': details['form']['home'], 'away_form': details['form']['away'],
+        'home_player': details['key_players']['home'], 'away_player': details['key_players']['away'],
+        'injuries': ', '.join(details['injuries']) if details['injuries'] else 'None',
+        'weather': details['weather'], 'referee': details['referee'],
+    }
+
+
+def match_renderer() -> FixtureRenderer:
+    return FixtureRenderer(MATCH_REPORT, match_fields, lambda match: match['id'])
+
+
+# --- ai_predictor.py: recommendations -------------------------------------------------
+
+RECOMMENDATIONS_HEADER = Template(
+    "⚽️ *Today's AI Soccer Predictions* ⚽️\n\n"
+    "`Win/Draw & BTTS Recommendations:`\n\n"
+).render({})
+
+RECOMMENDATION = Template(
+    "{symbol} *{home} vs {away}*\n"
+    "🏆 Result: {match_result} | BTTS: {btts}\n"
+    "🎯 AI Score: {correct_score} ({confidence}%)\n"
+    "📊 Hollywoodbets: {hollywoodbets}\n"
+    "📈 Betway: {betway}\n"
+    "🌤 Weather: {weather} | Ref: {referee}\n"
+    "🩹 Injuries: {injuries}\n"
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+)
+
+
+def is_recommended(p: Dict[str, Any]) -> bool:
+    """Win/Draw & BTTS: the 🔥 picks"""
+    return p['match_result'] in ('1', 'X') and p['btts'] == 'Yes'
+
+
+def recommendation_fields(match: Dict[str, Any], p: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'symbol': '🔥' if is_recommended(p) else '➖', 'home': p['home'], 'away': p['away'],
+        'match_result': p['match_result'], 'btts': p['btts'], 'correct_score': p['correct_score'],
+        'confidence': p['confidence'], 'hollywoodbets': p['hollywoodbets'], 'betway': p['betway'],
+        'weather': p['weather'], 'referee': p['referee'], 'injuries': ', '.join(p['injuries'] or ['None']),
+    }
+
+
+def recommendation_renderer() -> FixtureRenderer:
+    return FixtureRenderer(RECOMMENDATION, recommendation_fields,
+                           lambda match: (match['home'], match['away'], str(match.get('date'))))
@@ -0,0 +1,137 @@
+# shared_state.py
+"""Key-value state shared by bot replicas: precomputed predictions and leases.
+
+    state = open_state(STATE_URL)
+    if state.acquire('refresh', replica_id, ttl=600):   # one replica refreshes...
+        state.set('daily', snapshot)
+    snapshot = state.get('daily')                        # ...every replica serves it
+
+SOCCER_STATE_URL picks the backend:
+
+    (unset)                  MemoryState: this process only, the single-replica default
+    sqlite:///path/state.db  SQLiteState: replicas on one host share a WAL-mode file
+    redis://host:6379/0      RedisState: replicas anywhere (needs the redis package)
+
+Values are bytes; callers pickle what they store, so only point replicas
+at a state store they trust, as with cache.SQLiteBackend.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+STATE_URL = os.environ.get('SOCCER_STATE_URL', '')
+
+
+class MemoryState:
+    """In-process state; leases only arbitrate between threads of this process."""
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._values: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= self.clock()):
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._values[key] = (value, None if ttl is None else self.clock() + ttl)
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew the lease ``name`` for ``owner``; False while another owner holds it."""
+        key = f"lease:{name}"
+        with self._lock:
+            entry = self._values.get(key)
+            now = self.clock()
+            if entry is not None and entry[0] != owner.encode() and entry[1] > now:
+                return False
+            self._values[key] = (owner.encode(), now + ttl)
+            return True
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteState:
+    """State in a SQLite file (WAL), shared by every process on the host."""
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS state '
+                           '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)')
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                                     (key, self.clock())).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO state VALUES (?, ?, ?)',
+                               (key, value, None if ttl is None else self.clock() + ttl))
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = self.clock()
+        with self._lock, self._conn:
+            # One statement, so two replicas can never both win
+            cursor = self._conn.execute(
+                'INSERT INTO state VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires_at = excluded.expires_at '
+                'WHERE state.value = excluded.value OR state.expires_at <= ?',
+                (f"lease:{name}", owner.encode(), now + ttl, now))
+            return cursor.rowcount == 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisState:
+    """State in Redis, shared by replicas on any host."""
+    # Renew the lease if we hold it, take it if nobody does
+    _ACQUIRE = """
+    local holder = redis.call('GET', KEYS[1])
+    if holder == false or holder == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self._acquire = self.client.register_script(self._ACQUIRE)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.client.set(key, value, px=None if ttl is None else int(ttl * 1000))
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        return bool(self._acquire(keys=[f"lease:{name}"], args=[owner, int(ttl * 1000)]))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def open_state(url: str = STATE_URL):
+    """The backend for ``url`` (see the module docstring)."""
+    if not url:
+        return MemoryState()
+    if url.startswith('sqlite:///'):
+        return SQLiteState(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisState(url)
+    raise ValueError(f"Unsupported SOCCER_STATE_URL {url!r}; expected sqlite:///path or redis://host")
@@ -0,0 +1,188 @@
+# simulator.py
+"""Monte Carlo season simulator: title, top-4 and relegation odds.
+
+The remaining fixtures are predicted once with the AIModel score matrices
+(predictor.model_matrices, so weather and the trained 1X2 count exactly as
+in predict_games); each simulated season then draws a score for every
+fixture from its matrix (one uniform per fixture, via alias tables), so goal difference and
+goals scored break ties the way a real table does. Seasons are simulated ``SIM_BATCH`` at a time with array
+operations, and every batch is folded into a teams x positions count
+matrix straight away, so memory does not grow with the number of seasons.
+
+    odds = simulate_season(remaining_games, standings, n_sims=100_000)
+    print(odds.report())
+
+Simulations are split into shards of ``SHARD_SIMS`` seasons, run in a
+process pool, and each shard's random stream is spawned from ``seed`` by
+shard number, so the odds do not depend on the number of workers.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import predictor
+from features import FeatureIndex
+from team_store import FixtureTable, teams as registry
+
+# Seasons per vectorized batch (peak memory ~50 MB for 380 fixtures, whatever n_sims)
+SIM_BATCH = 2_000
+# Seasons per process-pool task
+SHARD_SIMS = 20_000
+
+Standings = Dict[str, Tuple[int, int, int]]  # team -> (points, goals for, goals against)
+
+
+class SeasonOdds:
+    """Final-position distribution of every team over the simulated seasons."""
+    def __init__(self, teams: List[str], counts: np.ndarray, points_sum: np.ndarray, n_sims: int):
+        self.teams = teams
+        self.counts = counts
+        self.n_sims = n_sims
+        # positions[t, p] = P(team t finishes in position p + 1)
+        self.positions = counts / n_sims
+        self.expected_points = points_sum / n_sims
+        self._row = {team: i for i, team in enumerate(teams)}
+
+    def probability(self, team: str, first: int, last: int) -> float:
+        """P(``team`` finishes between positions ``first`` and ``last``, 1-based, inclusive)."""
+        return float(self.positions[self._row[team], first - 1:last].sum())
+
+    def title(self, team: str) -> float:
+        return self.probability(team, 1, 1)
+
+    def top(self, team: str, n: int = 4) -> float:
+        return self.probability(team, 1, n)
+
+    def relegation(self, team: str, n: int = 3) -> float:
+        return self.probability(team, len(self.teams) - n + 1, len(self.teams))
+
+    def report(self, top_n: int = 4, relegated: int = 3) -> str:
+        order = np.argsort(-self.expected_points, kind='stable')
+        lines = [f"{'team':<24}{'xPts':>7}{'title':>8}{f'top {top_n}':>8}{'releg.':>8}"]
+        for i in order.tolist():
+            team = self.teams[i]
+            lines.append(f"{team:<24}{self.expected_points[i]:>7.1f}{self.title(team):>8.1%}"
+                         f"{self.top(team, top_n):>8.1%}{self.relegation(team, relegated):>8.1%}")
+        return '\n'.join(lines)
+
+
+def alias_tables(probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Walker/Vose alias tables for sampling each row of ``probs`` in O(1).
+
+    A draw picks a column ``k`` uniformly, then keeps it with probability
+    ``accept[row, k]`` or takes ``alias[row, k]`` instead.
+    """
+    n_rows, n = probs.shape
+    accept = np.ones((n_rows, n))
+    alias = np.tile(np.arange(n), (n_rows, 1))
+    for row in range(n_rows):
+        scaled = (probs[row] / probs[row].sum() * n).tolist()
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            accept[row, s] = scaled[s]
+            alias[row, s] = l
+            scaled[l] += scaled[s] - 1
+            (small if scaled[l] < 1 else large).append(l)
+    return accept, alias
+
+
+def _simulate_shard(accept: np.ndarray, alias: np.ndarray, home: np.ndarray, away: np.ndarray, base: np.ndarray,
+                    n_sims: int, seed_seq: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulate ``n_sims`` seasons; returns (position counts, summed final points)."""
+    rng = np.random.default_rng(seed_seq)
+    n_fixtures, n_teams = len(home), len(base)
+    size = predictor.MAX_GOALS + 1
+    cells_per_matrix = size * size
+    fixture_ids = np.arange(n_fixtures)
+    # One-hot fixture -> team maps, so per-team totals are one matrix product per batch
+    home_of = np.zeros((n_fixtures, n_teams))
+    away_of = np.zeros((n_fixtures, n_teams))
+    home_of[np.arange(n_fixtures), home] = 1
+    away_of[np.arange(n_fixtures), away] = 1
+    positions = np.arange(n_teams)
+    counts = np.zeros(n_teams * n_teams, dtype=np.int64)
+    points_sum = np.zeros(n_teams)
+    for start in range(0, n_sims, SIM_BATCH):
+        batch = min(SIM_BATCH, n_sims - start)
+        # One uniform per fixture: its integer part picks a cell, the fraction accepts it or its alias
+        draws = rng.random((batch, n_fixtures)) * cells_per_matrix
+        cells = draws.astype(np.int64)
+        keep = (draws - cells) < accept[fixture_ids, cells]
+        cells = np.where(keep, cells, alias[fixture_ids, cells])
+        home_goals, away_goals = np.divmod(cells, size)
+        home_goals, away_goals = home_goals.astype(float), away_goals.astype(float)
+        drawn = home_goals == away_goals
+        home_points = (home_goals > away_goals) * 3.0 + drawn
+        away_points = (home_goals < away_goals) * 3.0 + drawn
+        # Float matrix products go through BLAS; the totals are small integers, so exact
+        points = base[:, 0] + home_points @ home_of + away_points @ away_of
+        goals_for = base[:, 1] + home_goals @ home_of + away_goals @ away_of
+        goals_against = base[:, 2] + away_goals @ home_of + home_goals @ away_of
+        # Points, then goal difference, then goals scored, then a coin toss
+        key = (points * 1e6 + (goals_for - goals_against + 1000) * 1e3 + goals_for
+               + rng.random((batch, n_teams)) * 0.5)
+        order = np.argsort(-key, axis=1)  # order[s, p] = team finishing p + 1 in season s
+        counts += np.bincount((order * n_teams + positions).ravel(), minlength=n_teams * n_teams)
+        points_sum += points.sum(axis=0)
+    return counts.reshape(n_teams, n_teams), points_sum
+
+
+def simulate_season(fixtures: List[Dict[str, Any]], standings: Optional[Standings] = None,
+                    n_sims: int = 100_000, seed: int = predictor.SEED, workers: Optional[int] = None,
+                    index: Optional[FeatureIndex] = None,
+                    model: predictor.AIModel = predictor.main_model) -> SeasonOdds:
+    """Simulate the rest of a season from its remaining ``fixtures``.
+
+    ``fixtures`` are game dicts as for predictor.predict_games (with an
+    ``index``, only home_team and away_team are read). ``standings`` holds
+    the points and goals each team already has; teams missing from it start
+    from zero. ``workers=1`` runs in this process.
+    """
+    standings = standings or {}
+    names = sorted(set(standings) | {game['home_team'] for game in fixtures}
+                   | {game['away_team'] for game in fixtures})
+    row = {name: i for i, name in enumerate(names)}
+    base = np.array([standings.get(name, (0, 0, 0)) for name in names], dtype=float).reshape(len(names), 3)
+    home = np.array([row[game['home_team']] for game in fixtures], dtype=np.int64)
+    away = np.array([row[game['away_team']] for game in fixtures], dtype=np.int64)
+    if fixtures:
+        if index is None:
+            table = FixtureTable.from_games(fixtures)
+        else:
+            table = index.view([registry.intern(game['home_team']) for game in fixtures],
+                               [registry.intern(game['away_team']) for game in fixtures])
+        matrices = predictor.model_matrices(model, table, predictor.game_weather(fixtures), fixtures).matrices
+        accept, alias = alias_tables(matrices.reshape(len(fixtures), -1))
+    else:
+        accept, alias = alias_tables(np.ones((0, (predictor.MAX_GOALS + 1) ** 2)))
+
+    shards = [min(SHARD_SIMS, n_sims - start) for start in range(0, n_sims, SHARD_SIMS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(shards))
+    args = [(accept, alias, home, away, base, n, shard_seed) for n, shard_seed in zip(shards, seeds)]
+    if workers == 1:
+        results = [_simulate_shard(*shard_args) for shard_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_shard, *zip(*args)))
+    counts = sum((shard_counts for shard_counts, _ in results), np.zeros((len(names), len(names)), dtype=np.int64))
+    points_sum = sum((shard_points for _, shard_points in results), np.zeros(len(names)))
+    return SeasonOdds(names, counts, points_sum, n_sims)
+
+
+def standings_from_results(results: Sequence[Dict[str, Any]]) -> Standings:
+    """Points and goals per team from played results (ingest.read_results rows)."""
+    table: Dict[str, List[int]] = {}
+    for result in results:
+        home = table.setdefault(result['home_team'], [0, 0, 0])
+        away = table.setdefault(result['away_team'], [0, 0, 0])
+        home_goals, away_goals = result['home_goals'], result['away_goals']
+        home[0] += 3 if home_goals > away_goals else 1 if home_goals == away_goals else 0
+        away[0] += 3 if away_goals > home_goals else 1 if home_goals == away_goals else 0
+        home[1] += home_goals
+        home[2] += away_goals
+        away[1] += away_goals
+        away[2] += home_goals
+    return {team: (points, goals_for, goals_against) for team, (points, goals_for, goals_against) in table.items()}
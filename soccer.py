@@ -0,0 +1,56 @@
+# soccer.py
+"""One entry point for every job, each importing only what it needs.
+
+    python soccer.py predict                 # today's predictions, printed (daily_cache.py)
+    python soccer.py send                    # post today's match reports to the channel (mail.py)
+    python soccer.py serve                   # run the Telegram bot (bot.py)
+    python soccer.py backtest results.csv    # score the models on history (backtest.py)
+    python soccer.py snapshot results.csv    # save the warm feature snapshot (ingest.py)
+
+Everything after the command goes to that module's ``main``. A command's
+module is imported only when the command runs, so ``predict`` never loads
+aiohttp or python-telegram-bot and cron jobs start in a fraction of the
+time. ``python benchmark.py startup`` tracks the import time of each.
+"""
+import importlib
+import sys
+from typing import Callable, List, Optional
+
+# command -> (module whose main(argv) runs it, help)
+COMMANDS = {
+    'predict': ('daily_cache', "predict today's fixtures and print the messages"),
+    'send': ('mail', "post today's match reports to the Telegram channel"),
+    'serve': ('bot', 'run the Telegram bot'),
+    'backtest': ('backtest', 'score the models on historical results'),
+    'snapshot': ('ingest', 'replay a results file into the warm feature snapshot'),
+}
+
+
+def load(command: str) -> Callable[[Optional[List[str]]], None]:
+    """Import ``command``'s module and return its main."""
+    module, _ = COMMANDS[command]
+    return importlib.import_module(module).main
+
+
+def usage() -> str:
+    width = max(map(len, COMMANDS))
+    lines = ['usage: soccer.py <command> [args...]', '', 'commands:']
+    lines += [f"  {name:<{width}}  {help_}" for name, (_, help_) in COMMANDS.items()]
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    # Dispatch by hand rather than with argparse subparsers: the commands' own options live in their modules
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    if argv[0] not in COMMANDS:
+        print(f"soccer.py: unknown command {argv[0]!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    load(argv[0])(argv[1:])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
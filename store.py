@@ -0,0 +1,293 @@
+# store.py
+"""Persistent fixtures, predictions and results (SQLite in WAL mode).
+
+    store = PredictionStore(STORE_PATH)
+    store.record_predictions(games, predictions, hashes)   # after predict_games
+    store.record_results(read_results('results.csv'))      # once matches are played
+    store.history(start, end, team='Arsenal')               # /history
+    store.accuracy(start, end)                              # /accuracy
+
+A fixture is keyed by predictor.fixture_id(home, away, date), so a result
+finds the predictions made for it whichever run made them. Every write is
+one executemany in one transaction; WAL lets the bot's handlers read while
+the scheduled refresh writes. Predictions are stored with the input_hash of
+the game they were made from (daily_cache.input_hash), so a restarted bot
+reuses them instead of predicting again while the inputs are unchanged.
+
+Each model's output for a fixture is one row with a pick and confidence
+column per market, so hit rates for every market come from one SQL pass
+over the predictions joined with the results (ai_predictor picks are not
+stored).
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from predictor import fixture_id
+
+logger = logging.getLogger(__name__)
+
+# Next to the code like the model file and feature snapshot, not in whatever directory the bot starts from
+STORE_PATH = os.environ.get(
+    'SOCCER_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'predictions.db'))
+DEFAULT_LEAGUE = 'default'  # as in ingest.read_results
+# predict_games markets -> column prefix in the predictions table
+MARKET_COLUMNS = {'1x2': 'outcome', 'btts': 'btts', 'over_under': 'over_under', 'correct_score': 'correct_score'}
+
+DateLike = Union[datetime.date, str]
+
+_PICK_COLUMNS = ', '.join(f'{column}_pick TEXT, {column}_confidence REAL' for column in MARKET_COLUMNS.values())
+_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS fixtures (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        league TEXT NOT NULL,
+        home_team TEXT NOT NULL,
+        away_team TEXT NOT NULL,
+        input_hash TEXT)''',
+    # One row per fixture and model, clustered by date: a day's rows are appended
+    # together and a date range is one contiguous scan
+    f'''CREATE TABLE IF NOT EXISTS predictions (
+        date TEXT NOT NULL,
+        fixture_id INTEGER NOT NULL,
+        model TEXT NOT NULL,
+        {_PICK_COLUMNS},
+        PRIMARY KEY (date, fixture_id, model)) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS results (
+        fixture_id INTEGER PRIMARY KEY,
+        home_goals INTEGER NOT NULL,
+        away_goals INTEGER NOT NULL)''',
+    'CREATE INDEX IF NOT EXISTS fixtures_date ON fixtures (date)',
+    'CREATE INDEX IF NOT EXISTS fixtures_home ON fixtures (home_team, date)',
+    'CREATE INDEX IF NOT EXISTS fixtures_away ON fixtures (away_team, date)',
+    'CREATE INDEX IF NOT EXISTS fixtures_league ON fixtures (league, date)',
+    'CREATE INDEX IF NOT EXISTS predictions_model ON predictions (model, date)',
+)
+
+# 1 when a stored pick came true, per market; pick formats are those predictor.slate_predictions writes
+_HITS = {
+    '1x2': '''p.outcome_pick = CASE WHEN r.home_goals > r.away_goals THEN '1'
+                                 WHEN r.home_goals = r.away_goals THEN 'X' ELSE '2' END''',
+    'btts': "p.btts_pick = CASE WHEN r.home_goals > 0 AND r.away_goals > 0 THEN 'Yes' ELSE 'No' END",
+    'over_under': '''CASE WHEN p.over_under_pick LIKE 'Over %'
+                         THEN r.home_goals + r.away_goals > CAST(substr(p.over_under_pick, 6) AS REAL)
+                         ELSE r.home_goals + r.away_goals < CAST(substr(p.over_under_pick, 7) AS REAL) END''',
+    'correct_score': "p.correct_score_pick = r.home_goals || '-' || r.away_goals",
+}
+_PICKS = ', '.join(f'p.{column}_pick, p.{column}_confidence' for column in MARKET_COLUMNS.values())
+
+
+def _picks(values: Sequence[Any]) -> Dict[str, Tuple[str, float]]:
+    """market -> (pick, confidence) from the pick columns of a predictions row."""
+    return {market: (values[2 * k], values[2 * k + 1])
+            for k, market in enumerate(MARKET_COLUMNS) if values[2 * k] is not None}
+
+
+class HistoryRow(NamedTuple):
+    date: str
+    league: str
+    home_team: str
+    away_team: str
+    picks: Dict[str, Tuple[str, float]]  # market -> (pick, confidence) of the queried model
+    score: Optional[Tuple[int, int]]  # None until the result is recorded
+
+
+class Accuracy(NamedTuple):
+    n: int
+    hits: int
+    mean_confidence: float
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.n if self.n else 0.0
+
+
+def _iso(date: DateLike) -> str:
+    return str(date)[:10]
+
+
+def _key(home_team: str, away_team: str, date: DateLike) -> int:
+    """fixture_id as a signed 64-bit SQLite integer."""
+    key = fixture_id(home_team, away_team, _iso(date))
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def game_key(game: Dict[str, Any]) -> int:
+    return _key(game['home_team'], game['away_team'], game['date'])
+
+
+class PredictionStore:
+    """Fixtures, predict_games outputs and final scores in one SQLite file."""
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only risks the last transactions on power loss, never corruption
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> 'PredictionStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # --- writes -------------------------------------------------------------------
+
+    def record_predictions(self, games: Sequence[Dict[str, Any]], predictions: Sequence[Dict[str, Any]],
+                           input_hashes: Optional[Sequence[str]] = None) -> int:
+        """Store predict_games output with its fixtures; replaces earlier predictions. Returns picks written."""
+        fixtures, rows = [], []
+        for i, (game, preds) in enumerate(zip(games, predictions)):
+            key, date = game_key(game), _iso(game['date'])
+            fixtures.append((key, date, str(game.get('league') or DEFAULT_LEAGUE), game['home_team'],
+                             game['away_team'], input_hashes[i] if input_hashes is not None else None))
+            for model, markets in preds.items():
+                row = [date, key, model]
+                for market in MARKET_COLUMNS:
+                    pick, confidence = markets.get(market, (None, None))
+                    row += (pick, None if confidence is None else float(confidence))
+                rows.append(row)
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO fixtures VALUES (?, ?, ?, ?, ?, ?)', fixtures)
+            self._conn.executemany('DELETE FROM predictions WHERE date = ? AND fixture_id = ?',
+                                   [(row[1], row[0]) for row in fixtures])
+            self._conn.executemany(f"INSERT INTO predictions VALUES ({', '.join('?' * (3 + 2 * len(MARKET_COLUMNS)))})",
+                                   rows)
+        return sum(len(preds[model]) for preds in predictions for model in preds)
+
+    def record_results(self, results: Iterable[Dict[str, Any]], batch_size: int = 50_000) -> int:
+        """Store final scores (ingest.read_results rows), in batches; returns how many."""
+        count, fixtures, scores = 0, [], []
+
+        def flush() -> None:
+            with self._lock, self._conn:
+                # A result for a fixture never predicted still gets its fixture row, for /history
+                self._conn.executemany('INSERT OR IGNORE INTO fixtures (id, date, league, home_team, away_team) '
+                                       'VALUES (?, ?, ?, ?, ?)', fixtures)
+                self._conn.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', scores)
+            fixtures.clear()
+            scores.clear()
+
+        for result in results:
+            key = _key(result['home_team'], result['away_team'], result['date'])
+            fixtures.append((key, _iso(result['date']), str(result.get('league') or DEFAULT_LEAGUE),
+                             result['home_team'], result['away_team']))
+            scores.append((key, int(result['home_goals']), int(result['away_goals'])))
+            count += 1
+            if len(scores) >= batch_size:
+                flush()
+        if scores:
+            flush()
+        return count
+
+    # --- reads --------------------------------------------------------------------
+
+    def cached_predictions(self, games: Sequence[Dict[str, Any]],
+                           input_hashes: Sequence[str]) -> Dict[int, Dict[str, Any]]:
+        """Stored predictions of the games whose inputs are unchanged, by position in ``games``."""
+        wanted = {game_key(game): (i, h) for i, (game, h) in enumerate(zip(games, input_hashes))}
+        if not wanted:
+            return {}
+        found: Dict[int, Dict[str, Any]] = {}
+        keys = list(wanted)
+        with self._lock:
+            for start in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                batch = keys[start:start + 500]
+                marks = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT f.id, f.input_hash, p.model, {_PICKS} '
+                    f'FROM fixtures f JOIN predictions p ON p.date = f.date AND p.fixture_id = f.id '
+                    f'WHERE f.id IN ({marks})',
+                    batch).fetchall()
+                for key, stored_hash, model, *picks in rows:
+                    i, current_hash = wanted[key]
+                    if stored_hash == current_hash:
+                        found.setdefault(i, {})[model] = _picks(picks)
+        return found
+
+    def history(self, start: DateLike, end: DateLike, team: Optional[str] = None, league: Optional[str] = None,
+                model: str = 'main_model', limit: int = 200) -> List[HistoryRow]:
+        """Fixtures played from ``start`` to ``end`` (inclusive), oldest first, with ``model``'s picks."""
+        if team is not None:
+            # Two index range scans instead of an OR the planner cannot index
+            where = ('id IN (SELECT id FROM fixtures WHERE home_team = :team AND date BETWEEN :start AND :end '
+                     'UNION ALL SELECT id FROM fixtures WHERE away_team = :team AND date BETWEEN :start AND :end)')
+        else:
+            where = 'date BETWEEN :start AND :end'
+        if league is not None:
+            where += ' AND league = :league'
+        # Every join is a primary-key lookup
+        query = (f'WITH f AS (SELECT id, date, league, home_team, away_team FROM fixtures '
+                 f'WHERE {where} ORDER BY date, id LIMIT :limit) '
+                 f'SELECT f.id, f.date, f.league, f.home_team, f.away_team, r.home_goals, r.away_goals, '
+                 f'{_PICKS} FROM f '
+                 f'LEFT JOIN results r ON r.fixture_id = f.id '
+                 f'LEFT JOIN predictions p ON p.date = f.date AND p.fixture_id = f.id AND p.model = :model '
+                 f'ORDER BY f.date, f.id')
+        params = {'start': _iso(start), 'end': _iso(end), 'team': team, 'league': league, 'model': model,
+                  'limit': limit}
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [HistoryRow(date, league_name, home, away, _picks(picks),
+                           None if home_goals is None else (home_goals, away_goals))
+                for _, date, league_name, home, away, home_goals, away_goals, *picks in rows]
+
+    def accuracy(self, start: DateLike, end: DateLike, model: Optional[str] = None,
+                 league: Optional[str] = None) -> Dict[Tuple[str, str], Accuracy]:
+        """Hit rate per (model, market) over the settled fixtures from ``start`` to ``end``."""
+        where = 'p.date BETWEEN :start AND :end'
+        if model is not None:
+            where += ' AND p.model = :model'
+        join = ''
+        if league is not None:
+            join = 'JOIN fixtures f ON f.id = p.fixture_id '
+            where += ' AND f.league = :league'
+        # Every market is aggregated in the same pass; COUNT skips the markets a model has no pick for
+        aggregates = ', '.join(f'COUNT(p.{column}_pick), SUM({_HITS[market]}), AVG(p.{column}_confidence)'
+                               for market, column in MARKET_COLUMNS.items())
+        query = (f'SELECT p.model, {aggregates} '
+                 f'FROM predictions p JOIN results r ON r.fixture_id = p.fixture_id {join}'
+                 f'WHERE {where} GROUP BY p.model ORDER BY p.model')
+        params = {'start': _iso(start), 'end': _iso(end), 'model': model, 'league': league}
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        stats = {}
+        for model_name, *values in rows:
+            for k, market in enumerate(MARKET_COLUMNS):
+                n, hits, confidence = values[3 * k:3 * k + 3]
+                if n:
+                    stats[model_name, market] = Accuracy(n, int(hits or 0), confidence)
+        return stats
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {table: self._conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                    for table in ('fixtures', 'predictions', 'results')}
+
+
+def main() -> None:
+    import argparse
+
+    from ingest import read_results
+
+    parser = argparse.ArgumentParser(description='Record final scores so /history and /accuracy can settle picks.')
+    parser.add_argument('path', help='results file (.csv, .jsonl, .gz or .parquet, see ingest.py)')
+    parser.add_argument('--db', default=STORE_PATH)
+    args = parser.parse_args()
+    with PredictionStore(args.db) as store:
+        print(f"{store.record_results(read_results(args.path))} results recorded in {args.db}")
+
+
+if __name__ == '__main__':
+    main()
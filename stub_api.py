@@ -0,0 +1,187 @@
+# stub_api.py
+"""Local stand-in for the upstream HTTP APIs, for benchmarks and manual testing.
+
+Serves football-data.org, OpenWeather, The Odds API and Telegram Bot API shaped responses
+from a background thread, with an optional fixed latency per request::
+
+    with StubAPI(latency=0.05) as stub:
+        mail.FOOTBALL_API_URL = stub.url + '/v4'
+        ...
+"""
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+
+class StubAPI:
+    def __init__(self, latency: float = 0.0, n_matches: int = 16, host: str = '127.0.0.1',
+                 venues: Optional[Sequence[str]] = None, port: int = 0,
+                 on_send: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.latency = latency
+        self.n_matches = n_matches
+        # Match i plays at venues[i % len(venues)]; 'Stadium {i}' by default
+        self.venues = list(venues or ())
+        self.host = host
+        self.port: Optional[int] = port or None
+        self.sent_messages: List[Dict[str, Any]] = []
+        # Called with every sendMessage payload, from the stub's own thread
+        self.on_send = on_send
+        self.request_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # --- handlers -----------------------------------------------------------------
+
+    async def _delay(self) -> None:
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _matches(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({'matches': [
+            {
+                'id': i,
+                'homeTeam': {'name': f'Home {i}', 'id': 1000 + 2 * i},
+                'awayTeam': {'name': f'Away {i}', 'id': 1001 + 2 * i},
+                'competition': {'name': 'Stub League'},
+                'utcDate': f"{request.query.get('date', '2025-01-01')}T15:00:00+00:00",
+            } for i in range(1, self.n_matches + 1)
+        ]})
+
+    async def _match(self, request: web.Request) -> web.Response:
+        await self._delay()
+        match_id = request.match_info['match_id']
+        venue = self.venues[int(match_id) % len(self.venues)] if self.venues else f'Stadium {match_id}'
+        return web.json_response({'id': int(match_id), 'venue': venue,
+                                  'referees': [{'name': f'Referee {match_id}'}]})
+
+    async def _head2head(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({'aggregates': {'numberOfMatches': 5, 'totalGoals': 13}})
+
+    async def _team(self, request: web.Request) -> web.Response:
+        await self._delay()
+        team_id = request.match_info['team_id']
+        return web.json_response({'id': int(team_id), 'name': f'Team {team_id}',
+                                  'injuries': [f'Player {team_id} (Doubtful)']})
+
+    async def _weather(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response({'weather': [{'main': 'Clear', 'description': 'clear sky'}],
+                                  'main': {'temp': 18.0}, 'wind': {'speed': 1.4},
+                                  'name': request.query.get('q', '')})
+
+    async def _forecast(self, request: web.Request) -> web.Response:
+        # 5-day/3-hour forecast: 40 slots from the current 3-hour boundary, rain in every fourth
+        await self._delay()
+        start = int(time.time()) // 10800 * 10800
+        slots = []
+        for i in range(40):
+            rainy = i % 4 == 1
+            slot = {'dt': start + i * 10800, 'main': {'temp': 12.0 + (i % 8)}, 'wind': {'speed': 3.0 + i % 5},
+                    'weather': [{'main': 'Rain', 'description': 'light rain'} if rainy
+                                else {'main': 'Clouds', 'description': 'broken clouds'}]}
+            if rainy:
+                slot['rain'] = {'3h': 1.2}
+            slots.append(slot)
+        return web.json_response({'list': slots, 'city': {'coord': {'lat': float(request.query.get('lat', 0)),
+                                                                     'lon': float(request.query.get('lon', 0))}}})
+
+    async def _odds(self, request: web.Request) -> web.Response:
+        # Every match from /v4/matches at four bookmakers; prices drift a little on every request
+        await self._delay()
+        date = request.query.get('date', '2025-01-01')
+        updated = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        events = []
+        for i in range(1, self.n_matches + 1):
+            home, away = f'Home {i}', f'Away {i}'
+            bookmakers = []
+            for k in range(4):
+                drift = 1 + 0.02 * ((self.request_count + i + k) % 5 - 2)
+                bookmakers.append({'key': f'stub_book_{k}', 'last_update': updated, 'markets': [
+                    {'key': 'h2h', 'outcomes': [{'name': home, 'price': round(2.1 * drift, 2)},
+                                                {'name': 'Draw', 'price': 3.4},
+                                                {'name': away, 'price': round(3.6 / drift, 2)}]},
+                    {'key': 'totals', 'outcomes': [{'name': 'Over', 'point': 2.5, 'price': round(1.9 * drift, 2)},
+                                                   {'name': 'Under', 'point': 2.5, 'price': round(1.95 / drift, 2)}]},
+                    {'key': 'btts', 'outcomes': [{'name': 'Yes', 'price': 1.8}, {'name': 'No', 'price': 2.0}]},
+                ]})
+            events.append({'id': str(i), 'sport_key': request.match_info['sport'], 'home_team': home,
+                           'away_team': away, 'commence_time': f'{date}T15:00:00Z', 'bookmakers': bookmakers})
+        return web.json_response(events)
+
+    async def _send_message(self, request: web.Request) -> web.Response:
+        await self._delay()
+        payload = await request.json()
+        self.sent_messages.append(payload)
+        if self.on_send is not None:
+            self.on_send(payload)
+        return web.json_response({'ok': True, 'result': {'message_id': len(self.sent_messages),
+                                                         'chat': {'id': payload.get('chat_id')},
+                                                         'text': payload.get('text')}})
+
+    async def _bot_method(self, request: web.Request) -> web.Response:
+        # The calls python-telegram-bot makes besides sendMessage, so a bot can run against the stub
+        await self._delay()
+        method = request.match_info['method']
+        if method == 'getMe':
+            result: Any = {'id': 1, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_bot',
+                           'can_join_groups': True, 'can_read_all_group_messages': False,
+                           'supports_inline_queries': False}
+        elif method == 'getUpdates':
+            result = []
+        elif method == 'getWebhookInfo':
+            result = {'url': '', 'has_custom_certificate': False, 'pending_update_count': 0}
+        else:  # setWebhook, deleteWebhook, setMyCommands, ...
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    def _app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/v4/matches', self._matches)
+        app.router.add_get('/v4/matches/{match_id}', self._match)
+        app.router.add_get('/v4/matches/{match_id}/head2head', self._head2head)
+        app.router.add_get('/v4/teams/{team_id}', self._team)
+        app.router.add_get('/data/2.5/weather', self._weather)
+        app.router.add_get('/data/2.5/forecast', self._forecast)
+        app.router.add_get('/v4/sports/{sport}/odds', self._odds)
+        app.router.add_post('/bot{token}/sendMessage', self._send_message)
+        app.router.add_route('*', '/bot{token}/{method}', self._bot_method)
+        return app
+
+    # --- lifecycle ------------------------------------------------------------------
+
+    async def _start(self) -> None:
+        self._runner = web.AppRunner(self._app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port or 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> 'StubAPI':
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self) -> 'StubAPI':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
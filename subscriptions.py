@@ -0,0 +1,221 @@
+# subscriptions.py
+"""Per-chat filtered predictions, fanned out to every subscriber.
+
+A subscription is a (league, market, threshold) filter: the chat gets the
+fixtures of ``league`` (ANY_LEAGUE for all) whose ``market`` pick has at
+least ``threshold`` confidence. A chat may hold several filters; it gets
+the fixtures matching any of them.
+
+    registry = SubscriptionRegistry.load(SUBSCRIPTIONS_PATH)
+    registry.subscribe(chat_id, 'fire', 0.6)
+    deliveries = plan(registry, games, predictions, render, HEADER)
+    await fan_out(sender, deliveries, parse_mode='Markdown')
+
+``plan`` evaluates each distinct filter once against the whole slate (array
+operations, however many chats share it), and chats with the same filter
+set, or whose filters select the same fixtures, share one rendered message
+list. Fan-out cost is then one enqueue per chat and message.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import (Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set,
+                    Tuple, Union)
+
+import numpy as np
+
+from telegram_sender import OutboundSender, pack_messages
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_PATH = os.environ.get(
+    'SOCCER_SUBSCRIPTIONS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'subscriptions.json'))
+
+ANY_LEAGUE = '*'
+DEFAULT_LEAGUE = 'default'  # games without a league, as in ingest.read_results
+# '1x2', 'btts', 'over_under' and 'correct_score' are the predictor's markets, and a
+# filter on one matches that market's pick whichever side it is on; 'fire' is the 1
+# or X with BTTS Yes recommendation that ai_predictor marks with 🔥
+MARKETS = ('1x2', 'btts', 'over_under', 'correct_score', 'fire')
+
+ChatId = Union[int, str]
+# market -> (eligible, confidence), one entry per fixture
+MarketColumns = Dict[str, Tuple[np.ndarray, np.ndarray]]
+
+
+class Filter(NamedTuple):
+    league: str
+    market: str
+    threshold: float  # minimum confidence, 0-1
+
+
+class Delivery(NamedTuple):
+    """One rendered message list and every chat it goes to."""
+    chunks: List[str]
+    chat_ids: List[ChatId]
+
+
+class SubscriptionRegistry:
+    """Chats and their filters, indexed both ways.
+
+    ``index`` maps each filter to its subscribers, so a slate is evaluated
+    once per distinct filter; ``groups`` maps each distinct filter set to
+    the chats holding exactly that set, so it is rendered once per group.
+    """
+    def __init__(self):
+        self.index: Dict[Filter, Set[ChatId]] = {}
+        self.groups: Dict[FrozenSet[Filter], Set[ChatId]] = {}
+        self._filters: Dict[ChatId, FrozenSet[Filter]] = {}
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    def filters(self, chat_id: ChatId) -> FrozenSet[Filter]:
+        return self._filters.get(chat_id, frozenset())
+
+    def _set_filters(self, chat_id: ChatId, filters: FrozenSet[Filter]) -> None:
+        old = self._filters.pop(chat_id, frozenset())
+        for f in old - filters:
+            self.index[f].discard(chat_id)
+            if not self.index[f]:
+                del self.index[f]
+        for f in filters - old:
+            self.index.setdefault(f, set()).add(chat_id)
+        if old:
+            self.groups[old].discard(chat_id)
+            if not self.groups[old]:
+                del self.groups[old]
+        if filters:
+            self._filters[chat_id] = filters
+            self.groups.setdefault(filters, set()).add(chat_id)
+
+    def subscribe(self, chat_id: ChatId, market: str, threshold: float = 0.0,
+                  league: str = ANY_LEAGUE) -> Filter:
+        """Add a filter; replaces the chat's filter for the same league and market."""
+        if market not in MARKETS:
+            raise ValueError(f"Unknown market {market!r}; expected one of {', '.join(MARKETS)}")
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError(f"Threshold must be between 0 and 1, got {threshold}")
+        new = Filter(league, market, float(threshold))
+        kept = {f for f in self.filters(chat_id) if (f.league, f.market) != (league, market)}
+        self._set_filters(chat_id, frozenset(kept | {new}))
+        return new
+
+    def unsubscribe(self, chat_id: ChatId, market: Optional[str] = None, league: Optional[str] = None) -> int:
+        """Drop the chat's filters for ``market``/``league`` (all of them by default); returns how many."""
+        old = self.filters(chat_id)
+        kept = frozenset(f for f in old if (market is not None and f.market != market)
+                         or (league is not None and f.league != league))
+        self._set_filters(chat_id, kept)
+        return len(old) - len(kept)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {'subscriptions': [{'chat_id': chat_id, 'league': f.league, 'market': f.market,
+                                   'threshold': f.threshold}
+                                  for chat_id, filters in self._filters.items() for f in sorted(filters)]}
+
+    def save(self, path: str = SUBSCRIPTIONS_PATH) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f)
+        os.replace(tmp, path)  # never leave a half-written registry behind
+
+    @classmethod
+    def load(cls, path: str = SUBSCRIPTIONS_PATH) -> 'SubscriptionRegistry':
+        """The registry saved at ``path``, or an empty one if there is none yet."""
+        registry = cls()
+        try:
+            with open(path, encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return registry
+        per_chat: Dict[ChatId, Set[Filter]] = {}
+        for row in payload.get('subscriptions', []):
+            per_chat.setdefault(row['chat_id'], set()).add(
+                Filter(row['league'], row['market'], float(row['threshold'])))
+        for chat_id, filters in per_chat.items():
+            registry._set_filters(chat_id, frozenset(filters))
+        return registry
+
+
+def predictor_markets(predictions: Sequence[Dict[str, Any]], model: str = 'main_model') -> MarketColumns:
+    """Market columns of predictor.predict_games output, read from ``model``'s picks."""
+    n = len(predictions)
+    picks = {market: [p[model][market] for p in predictions]
+             for market in ('1x2', 'btts', 'over_under', 'correct_score')}
+    columns = {market: (np.ones(n, dtype=bool), np.array([conf for _, conf in rows], dtype=float))
+               for market, rows in picks.items()}
+    outcome_ok = np.array([pick in ('1', 'X') for pick, _ in picks['1x2']], dtype=bool)
+    btts_yes = np.array([pick == 'Yes' for pick, _ in picks['btts']], dtype=bool)
+    columns['fire'] = (outcome_ok & btts_yes, np.minimum(columns['1x2'][1], columns['btts'][1]))
+    return columns
+
+
+def evaluate(games: Sequence[Dict[str, Any]], columns: MarketColumns,
+             filters: Iterable[Filter]) -> Dict[Filter, np.ndarray]:
+    """Indices of the fixtures matching each filter, one array operation per filter.
+
+    Filters on a market ``columns`` does not have match nothing.
+    """
+    leagues = np.array([str(game.get('league') or DEFAULT_LEAGUE) for game in games], dtype=object)
+    league_masks: Dict[str, np.ndarray] = {}
+    matches = {}
+    for f in filters:
+        if f.market not in columns:
+            matches[f] = np.empty(0, dtype=np.intp)
+            continue
+        eligible, confidence = columns[f.market]
+        mask = eligible & (confidence >= f.threshold)
+        if f.league != ANY_LEAGUE:
+            if f.league not in league_masks:
+                league_masks[f.league] = leagues == f.league
+            mask &= league_masks[f.league]
+        matches[f] = np.flatnonzero(mask)
+    return matches
+
+
+def plan(registry: SubscriptionRegistry, games: Sequence[Dict[str, Any]], predictions: Sequence[Dict[str, Any]],
+         render: Callable[[int, Dict[str, Any], Dict[str, Any]], str], header: str = '',
+         columns: Optional[MarketColumns] = None) -> List[Delivery]:
+    """The messages every subscriber gets for a slate; chats matching nothing get none.
+
+    ``render(position, game, predictions)`` builds one fixture's block, as for
+    daily_cache.DailyPredictions; each (fixture, position) is rendered once
+    whichever groups it appears in. ``columns`` defaults to predictor_markets.
+    """
+    if columns is None:
+        columns = predictor_markets(predictions)
+    matches = evaluate(games, columns, registry.index)
+    blocks: Dict[Tuple[int, int], str] = {}
+    by_fixtures: Dict[Tuple[int, ...], List[ChatId]] = {}
+    for filters, chat_ids in registry.groups.items():
+        selected = (matches[next(iter(filters))] if len(filters) == 1
+                    else np.unique(np.concatenate([matches[f] for f in filters])))
+        if len(selected):
+            by_fixtures.setdefault(tuple(selected.tolist()), []).extend(chat_ids)
+
+    deliveries = []
+    for fixtures, chat_ids in by_fixtures.items():
+        parts = [header]
+        for position, i in enumerate(fixtures):
+            block = blocks.get((i, position))
+            if block is None:
+                block = blocks[i, position] = render(position, games[i], predictions[i])
+            parts.append(block)
+        deliveries.append(Delivery(pack_messages(parts), chat_ids))
+    return deliveries
+
+
+async def fan_out(sender: OutboundSender, deliveries: Iterable[Delivery], **kwargs) -> int:
+    """Queue every delivery on ``sender`` and wait for them; returns how many messages failed."""
+    futures: List[asyncio.Future] = []
+    for delivery in deliveries:
+        for chat_id in delivery.chat_ids:
+            for chunk in delivery.chunks:
+                futures.extend(sender.enqueue(chat_id, chunk, **kwargs))
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    failed = sum(isinstance(result, BaseException) for result in results)
+    if failed:
+        logger.warning("Fan-out: %d of %d messages failed", failed, len(results))
+    return failed
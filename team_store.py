@@ -0,0 +1,233 @@
+# team_store.py
+"""Interned team registry and array-backed fixture/history tables.
+
+Team names are interned once into small integer ids, shared by every module.
+Results are stored column-wise in NumPy arrays (int32 ids and days, int8
+goals) instead of nested dicts with "2-1" score strings, so scores are parsed
+exactly once, when a row is added.
+"""
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+DateLike = Union[str, datetime.date]
+
+
+class TeamRegistry:
+    """Maps team names to dense integer ids (0, 1, 2, ...) and back."""
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def intern(self, name: str) -> int:
+        """Id of ``name``, registering it on first sight."""
+        team_id = self._ids.get(name)
+        if team_id is None:
+            team_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return team_id
+
+    def lookup(self, name: str) -> Optional[int]:
+        return self._ids.get(name)
+
+    def name(self, team_id: int) -> str:
+        return self._names[team_id]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+# Shared by predictor.py, ai_predictor.py and the feature code
+teams = TeamRegistry()
+
+
+def parse_score(score: str) -> Tuple[int, int]:
+    home_goals, away_goals = score.split('-')
+    return int(home_goals), int(away_goals)
+
+
+def day_number(date: DateLike) -> int:
+    """Proleptic Gregorian ordinal of a date or 'YYYY-MM-DD' string."""
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date[:10])
+    return date.toordinal()
+
+
+class MatchRow:
+    """One match read out of a MatchTable."""
+    __slots__ = ('day', 'home_id', 'away_id', 'home_goals', 'away_goals')
+
+    def __init__(self, day: int, home_id: int, away_id: int, home_goals: int, away_goals: int):
+        self.day = day
+        self.home_id = home_id
+        self.away_id = away_id
+        self.home_goals = home_goals
+        self.away_goals = away_goals
+
+    @property
+    def score(self) -> str:
+        return f"{self.home_goals}-{self.away_goals}"
+
+    def __repr__(self) -> str:
+        return (f"MatchRow(day={self.day}, home_id={self.home_id}, away_id={self.away_id}, "
+                f"score={self.score!r})")
+
+
+class MatchTable:
+    """Columnar table of played matches, growing by amortized doubling."""
+    COLUMNS = (
+        ('day', np.int32),
+        ('home_id', np.int32),
+        ('away_id', np.int32),
+        ('home_goals', np.int8),
+        ('away_goals', np.int8),
+    )
+
+    def __init__(self, capacity: int = 1024):
+        self._size = 0
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        # Column access (table.home_goals, ...) returns a view of the filled rows
+        try:
+            return self.__dict__['_columns'][name][:self.__dict__['_size']]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._columns['day'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def append(self, day: int, home_id: int, away_id: int, home_goals: int, away_goals: int) -> int:
+        """Add one match; returns its row index."""
+        self._reserve(1)
+        i = self._size
+        columns = self._columns
+        columns['day'][i] = day
+        columns['home_id'][i] = home_id
+        columns['away_id'][i] = away_id
+        columns['home_goals'][i] = home_goals
+        columns['away_goals'][i] = away_goals
+        self._size += 1
+        return i
+
+    def extend(self, day: np.ndarray, home_id: np.ndarray, away_id: np.ndarray,
+               home_goals: np.ndarray, away_goals: np.ndarray) -> None:
+        """Bulk-append equally long column arrays."""
+        n = len(day)
+        self._reserve(n)
+        start, stop = self._size, self._size + n
+        for name, values in (('day', day), ('home_id', home_id), ('away_id', away_id),
+                             ('home_goals', home_goals), ('away_goals', away_goals)):
+            self._columns[name][start:stop] = values
+        self._size = stop
+
+    def add_result(self, date: DateLike, home_team: str, away_team: str, score: str,
+                   registry: TeamRegistry = teams) -> int:
+        """Add a match in the data_fetcher h2h format (names and a "2-1" score)."""
+        home_goals, away_goals = parse_score(score)
+        return self.append(day_number(date), registry.intern(home_team), registry.intern(away_team),
+                           home_goals, away_goals)
+
+    def row(self, i: int) -> MatchRow:
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        c = self._columns
+        return MatchRow(int(c['day'][i]), int(c['home_id'][i]), int(c['away_id'][i]),
+                        int(c['home_goals'][i]), int(c['away_goals'][i]))
+
+    def rows(self) -> Iterable[MatchRow]:
+        return (self.row(i) for i in range(self._size))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the filled part of the columns."""
+        return sum(column[:self._size].nbytes for column in self._columns.values())
+
+
+class FixtureTable:
+    """Columnar view of a slate of fixtures in the data_fetcher game format.
+
+    Forms are stored as an int8 matrix padded with -1 (one row per fixture)
+    and the h2h matches of fixture ``i`` are rows ``h2h_start[i]`` to
+    ``h2h_start[i] + h2h_len[i]`` of ``history``.
+    """
+    def __init__(self, home_id: np.ndarray, away_id: np.ndarray, day: np.ndarray,
+                 home_form: np.ndarray, away_form: np.ndarray,
+                 h2h_start: np.ndarray, h2h_len: np.ndarray, history: MatchTable):
+        self.home_id = home_id
+        self.away_id = away_id
+        self.day = day
+        self.home_form = home_form
+        self.away_form = away_form
+        self.h2h_start = h2h_start
+        self.h2h_len = h2h_len
+        self.history = history
+
+    def __len__(self) -> int:
+        return len(self.home_id)
+
+    @staticmethod
+    def _pad_forms(forms: List[List[int]]) -> np.ndarray:
+        width = max((len(form) for form in forms), default=0)
+        padded = np.full((len(forms), width), -1, dtype=np.int8)
+        for i, form in enumerate(forms):
+            padded[i, :len(form)] = form
+        return padded
+
+    @classmethod
+    def from_games(cls, games: List[Dict[str, Any]], registry: TeamRegistry = teams) -> 'FixtureTable':
+        n = len(games)
+        home_id = np.empty(n, dtype=np.int32)
+        away_id = np.empty(n, dtype=np.int32)
+        day = np.empty(n, dtype=np.int32)
+        h2h_start = np.empty(n, dtype=np.int32)
+        h2h_len = np.empty(n, dtype=np.int32)
+        history = MatchTable(capacity=max(1, 2 * n))
+        intern = registry.intern
+        for i, game in enumerate(games):
+            home_id[i] = intern(game['home_team'])
+            away_id[i] = intern(game['away_team'])
+            day[i] = day_number(game['date'])
+            h2h_start[i] = len(history)
+            h2h_len[i] = len(game['h2h'])
+            for match in game['h2h']:
+                home_goals, away_goals = parse_score(match['score'])
+                history.append(day_number(match['date']), intern(match['home_team']),
+                               intern(match['away_team']), home_goals, away_goals)
+        return cls(home_id, away_id, day,
+                   cls._pad_forms([game['team_forms']['home'] for game in games]),
+                   cls._pad_forms([game['team_forms']['away'] for game in games]),
+                   h2h_start, h2h_len, history)
+
+    # --- features used by predictor.py ---------------------------------------------
+
+    def form_points(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Form point sums and lengths: (home_sum, home_len, away_sum, away_len)."""
+        home_played = self.home_form >= 0
+        away_played = self.away_form >= 0
+        return (np.where(home_played, self.home_form, 0).sum(axis=1, dtype=np.int64),
+                home_played.sum(axis=1),
+                np.where(away_played, self.away_form, 0).sum(axis=1, dtype=np.int64),
+                away_played.sum(axis=1))
+
+    def h2h_goals(self) -> np.ndarray:
+        """Total goals over each fixture's h2h matches."""
+        goals = self.history.home_goals.astype(np.int64) + self.history.away_goals
+        # Prefix sums turn every fixture's contiguous h2h slice into one subtraction
+        cumulative = np.concatenate(([0], np.cumsum(goals)))
+        return cumulative[self.h2h_start + self.h2h_len] - cumulative[self.h2h_start]
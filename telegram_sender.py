@@ -0,0 +1,355 @@
+# telegram_sender.py
+"""Shared outbound Telegram sender: splitting, packing, rate limiting and retries.
+
+Every message goes through an OutboundSender, which keeps one ordered queue
+per chat, throttles with token buckets (per chat and global), packs small
+parts into as few messages as possible, splits anything over Telegram's
+4096-character limit at the nearest block/line/word boundary, and retries
+sends that failed on a flood limit (waiting ``retry_after`` seconds), a 5xx
+or a dropped connection. Any other 4xx is final and fails at once.
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from instrumentation import metrics
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MAX_LENGTH = 4096
+TELEGRAM_API_URL = 'https://api.telegram.org'
+
+# Telegram's documented flood limits
+GLOBAL_RATE = 30.0        # messages per second across all chats
+PRIVATE_CHAT_RATE = 1.0   # messages per second to one private chat
+GROUP_CHAT_RATE = 20 / 60  # messages per second to one group or channel
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0  # seconds, doubled on every retry of a non-flood error
+# Idle per-chat buckets are swept once the sender holds this many (then twice as many as survive)
+PRUNE_BUCKETS_AT = 1024
+
+ChatId = Union[int, str]
+
+# Split points, best first: between blocks, between lines, between words
+_BOUNDARIES = ('\n\n', '\n', ' ')
+# MarkdownV2 (and legacy Markdown) escapes and entity markers, as renderer.py writes them
+_ENTITY_TOKENS = re.compile(r'\\.|[*_`]', re.S)
+
+
+class TransientError(Exception):
+    """A network-level failure worth retrying with backoff."""
+
+
+class RejectedError(Exception):
+    """Telegram refused the message (a 4xx other than 429, e.g. a parse error or a blocked bot); never retried."""
+    def __init__(self, status: int, description: str = ''):
+        super().__init__(f"Bot API error {status}: {description}")
+        self.status = status
+        self.description = description
+
+
+class RetryAfter(Exception):
+    """Telegram answered 429; the message may be retried after ``retry_after`` seconds."""
+    def __init__(self, retry_after: float):
+        super().__init__(f"Flood control exceeded, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+def _open_entities(text: str) -> List[Tuple[str, int]]:
+    """The entities ``text`` leaves open, outermost first, as (marker, start).
+
+    ``\\``-escaped markers don't count, and inside a ``code`` entity nothing
+    but its closing backtick does.
+    """
+    stack: List[Tuple[str, int]] = []
+    for match in _ENTITY_TOKENS.finditer(text):
+        token = match.group()
+        if len(token) > 1:
+            continue
+        if stack and stack[-1][0] == token:
+            stack.pop()
+        elif not stack or stack[-1][0] != '`':
+            stack.append((token, match.start()))
+    return stack
+
+
+def _cut(window: str) -> Tuple[int, int, str]:
+    """(end of this chunk, start of the rest, markers to close and reopen across the cut)."""
+    for boundary in _BOUNDARIES:
+        cut = window.rfind(boundary)
+        while cut > 0:
+            stack = _open_entities(window[:cut])
+            if not stack:
+                return cut, cut + len(boundary), ''
+            if stack[0][1] > 0:
+                # Move the whole outermost entity into the next chunk
+                return stack[0][1], stack[0][1], ''
+            if cut + len(stack) <= len(window):
+                return cut, cut + len(boundary), ''.join(marker for marker, _ in stack)
+            cut = window.rfind(boundary, 0, cut)
+    # No boundary at all: a hard cut, keeping room for the closing markers and never
+    # leaving half of a \-escape at the end of the chunk
+    cut = len(window) - 1
+    while True:
+        cut -= (cut - len(window[:cut].rstrip('\\'))) % 2
+        stack = _open_entities(window[:cut])
+        if stack and stack[0][1] > 0:
+            return stack[0][1], stack[0][1], ''
+        if cut + len(stack) <= len(window):
+            return cut, cut, ''.join(marker for marker, _ in stack)
+        cut -= 1
+
+
+def split_message(text: str, limit: int = TELEGRAM_MAX_LENGTH) -> List[str]:
+    """Split ``text`` into chunks of at most ``limit`` characters at natural boundaries.
+
+    Cuts never separate a ``\\`` from the character it escapes, and never
+    fall inside a bold, italic or code entity: the entity moves to the next
+    chunk whole or, when it is longer than a chunk, is closed and reopened.
+    """
+    chunks = []
+    while len(text) > limit:
+        end, start, markers = _cut(text[:limit])
+        chunks.append(text[:end] + markers[::-1])
+        text = markers + text[start:]
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def pack_messages(parts: Sequence[str], limit: int = TELEGRAM_MAX_LENGTH, separator: str = '') -> List[str]:
+    """Pack consecutive parts into as few messages of at most ``limit`` characters as possible.
+
+    Parts are kept whole and in order; a part that is too long on its own is
+    split with ``split_message``.
+    """
+    messages: List[str] = []
+    current: List[str] = []
+    length = 0
+    for part in parts:
+        pieces = split_message(part, limit) if len(part) > limit else [part]
+        for piece in pieces:
+            extra = len(piece) + (len(separator) if current else 0)
+            if current and length + extra > limit:
+                messages.append(separator.join(current))
+                current, length = [], 0
+                extra = len(piece)
+            current.append(piece)
+            length += extra
+    if current:
+        messages.append(separator.join(current))
+    return messages
+
+
+class TokenBucket:
+    """Token bucket: ``rate`` tokens per second, holding at most ``capacity``."""
+    def __init__(self, rate: float, capacity: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def idle(self) -> bool:
+        """Whether the bucket has refilled, so dropping it and starting afresh changes nothing."""
+        return self.tokens + (self.clock() - self.updated) * self.rate >= self.capacity
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns the time waited."""
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+def _is_group(chat_id: ChatId) -> bool:
+    # Channels are addressed as '@name'; group and channel ids are negative
+    if isinstance(chat_id, str):
+        return chat_id.startswith('@') or chat_id.startswith('-')
+    return chat_id < 0
+
+
+class BotAPITransport:
+    """Sends through the Bot API's sendMessage over an aiohttp session."""
+    def __init__(self, token: str, session: 'aiohttp.ClientSession', api_url: Optional[str] = None):
+        self.url = f"{api_url or TELEGRAM_API_URL}/bot{token}/sendMessage"
+        self.session = session
+
+    async def __call__(self, chat_id: ChatId, text: str, **kwargs) -> Any:
+        async with self.session.post(self.url, json={'chat_id': chat_id, 'text': text, **kwargs}) as response:
+            if response.status < 400:
+                return await response.json(content_type=None)
+            if response.status >= 500:
+                raise TransientError(f"Bot API error {response.status}")
+            try:
+                body = await response.json(content_type=None)
+            except ValueError:
+                body = {}
+            if response.status == 429:
+                raise RetryAfter(body.get('parameters', {}).get('retry_after', 1))
+            raise RejectedError(response.status, body.get('description', ''))
+
+
+class PTBTransport:
+    """Sends through a python-telegram-bot ``Bot`` (as used by bot.py)."""
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def __call__(self, chat_id: ChatId, text: str, **kwargs) -> Any:
+        from telegram.error import BadRequest, NetworkError, RetryAfter as PTBRetryAfter
+
+        try:
+            return await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except PTBRetryAfter as e:
+            retry_after = e.retry_after
+            # Newer python-telegram-bot releases report a timedelta
+            raise RetryAfter(getattr(retry_after, 'total_seconds', lambda: retry_after)())
+        except BadRequest:
+            raise
+        except NetworkError as e:
+            raise TransientError(str(e)) from e
+
+
+class _Outgoing:
+    __slots__ = ('text', 'kwargs', 'future')
+
+    def __init__(self, text: str, kwargs: Dict[str, Any], future: asyncio.Future):
+        self.text = text
+        self.kwargs = kwargs
+        self.future = future
+
+
+class OutboundSender:
+    """Queue-based sender shared by bot.py, mail.py and ai_predictor.py.
+
+    Messages to the same chat are delivered in order by one worker per chat;
+    different chats are served concurrently, all drawing from the global
+    bucket. ``metrics`` counts queued, sent, failed and retried messages,
+    split/packed parts and the total time spent throttled.
+    """
+    def __init__(self, transport: Callable[..., Awaitable[Any]], global_rate: float = GLOBAL_RATE,
+                 private_rate: float = PRIVATE_CHAT_RATE, group_rate: float = GROUP_CHAT_RATE,
+                 max_retries: int = MAX_RETRIES, limit: int = TELEGRAM_MAX_LENGTH):
+        self.transport = transport
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self.limit = limit
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.metrics: Counter = Counter()
+        self._chat_buckets: Dict[ChatId, TokenBucket] = {}
+        self._queues: Dict[ChatId, asyncio.Queue] = {}
+        self._workers: Dict[ChatId, asyncio.Task] = {}
+        self._prune_at = PRUNE_BUCKETS_AT
+
+    def _bucket(self, chat_id: ChatId) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self._prune_at:
+                self._prune_buckets()
+            bucket = TokenBucket(self.group_rate if _is_group(chat_id) else self.private_rate)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self) -> None:
+        """Drop the buckets of chats with nothing queued whose bucket has refilled."""
+        for chat_id in [chat_id for chat_id, bucket in self._chat_buckets.items()
+                        if chat_id not in self._workers and bucket.idle()]:
+            del self._chat_buckets[chat_id]
+        # Sweep again only after as many new chats again, so pruning stays amortized O(1)
+        self._prune_at = max(PRUNE_BUCKETS_AT, 2 * len(self._chat_buckets))
+
+    def enqueue(self, chat_id: ChatId, text: str, **kwargs) -> List[asyncio.Future]:
+        """Queue ``text`` (split if too long); returns one future per message sent."""
+        futures = []
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+        chunks = split_message(text, self.limit)
+        if len(chunks) > 1:
+            self.metrics['split_parts'] += len(chunks)
+        loop = asyncio.get_running_loop()
+        for chunk in chunks:
+            future = loop.create_future()
+            queue.put_nowait(_Outgoing(chunk, kwargs, future))
+            futures.append(future)
+        self.metrics['queued'] += len(chunks)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.ensure_future(self._worker(chat_id, queue))
+        return futures
+
+    async def send(self, chat_id: ChatId, text: str, **kwargs) -> List[Any]:
+        """Send one message (split as needed) and wait until it is delivered."""
+        return await asyncio.gather(*self.enqueue(chat_id, text, **kwargs))
+
+    async def send_parts(self, chat_id: ChatId, parts: Sequence[str], separator: str = '', **kwargs) -> List[Any]:
+        """Pack ``parts`` into as few messages as fit the limit, then send them in order."""
+        messages = pack_messages(parts, self.limit, separator)
+        self.metrics['packed_parts'] += len(parts)
+        futures = [f for message in messages for f in self.enqueue(chat_id, message, **kwargs)]
+        return await asyncio.gather(*futures)
+
+    async def _worker(self, chat_id: ChatId, queue: asyncio.Queue) -> None:
+        bucket = self._bucket(chat_id)
+        try:
+            while not queue.empty():
+                item = queue.get_nowait()
+                try:
+                    result = await self._deliver(chat_id, item, bucket)
+                except Exception as e:
+                    self.metrics['failed'] += 1
+                    logger.warning("Giving up on message to %s: %r", chat_id, e)
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                else:
+                    self.metrics['sent'] += 1
+                    if not item.future.done():
+                        item.future.set_result(result)
+        finally:
+            # Idle chats hold no task; the next enqueue starts a new worker
+            del self._workers[chat_id]
+            if queue.empty():
+                self._queues.pop(chat_id, None)
+            else:
+                self._workers[chat_id] = asyncio.ensure_future(self._worker(chat_id, queue))
+
+    async def _deliver(self, chat_id: ChatId, item: _Outgoing, bucket: TokenBucket) -> Any:
+        # Imported here so that packing messages (daily_cache, backtest) never loads aiohttp
+        import aiohttp
+
+        attempt = 0
+        while True:
+            self.metrics['throttled_seconds'] += await bucket.acquire() + await self.global_bucket.acquire()
+            try:
+                with metrics.upstream('telegram'):
+                    return await self.transport(chat_id, item.text, **item.kwargs)
+            except RetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = e.retry_after
+            except (TransientError, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                # 5xx and connection failures only; RejectedError and other 4xx fail at once
+                if attempt >= self.max_retries:
+                    raise
+                delay = BACKOFF_BASE * 2 ** attempt
+            attempt += 1
+            self.metrics['retried'] += 1
+            await asyncio.sleep(delay)
+
+    async def drain(self) -> None:
+        """Wait until every queued message has been delivered or has failed."""
+        while self._workers:
+            await asyncio.gather(*list(self._workers.values()), return_exceptions=True)
@@ -0,0 +1,38 @@
+# tests/conftest.py
+"""Fixture factories for the tests, kept apart from benchmark.py and the modules it loads."""
+import datetime
+import random
+from typing import Any, Callable, Dict, List, Sequence
+
+import pytest
+
+
+def synthetic_games(n: int, seed: int = 0, weathers: Sequence[str] = ('Clear',)) -> List[Dict[str, Any]]:
+    """``n`` fixtures in the shape of data_fetcher.fetch_todays_games, distinct teams each."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    games = []
+    for i in range(n):
+        home, away = f"Team {2 * i}", f"Team {2 * i + 1}"
+        games.append({
+            'home_team': home,
+            'away_team': away,
+            'date': today,
+            'team_forms': {'home': [rng.choice([0, 1, 3]) for _ in range(5)],
+                           'away': [rng.choice([0, 1, 3]) for _ in range(5)]},
+            'injuries': {'home': [], 'away': []},
+            'transfers': {'home': {'in': [], 'out': []}, 'away': {'in': [], 'out': []}},
+            'weather': rng.choice(weathers),
+            'pitch': 'Good',
+            'referee': f"Referee {i % 20}",
+            'h2h': [{'date': '2025-01-01', 'home_team': home, 'away_team': away,
+                     'score': f"{rng.randint(0, 4)}-{rng.randint(0, 4)}"}
+                    for _ in range(rng.randint(0, 4))],
+        })
+    return games
+
+
+@pytest.fixture
+def make_games() -> Callable[..., List[Dict[str, Any]]]:
+    """The synthetic_games factory: ``make_games(n, seed=0, weathers=('Clear',))``."""
+    return synthetic_games
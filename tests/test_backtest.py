@@ -0,0 +1,26 @@
+import datetime
+
+import pytest
+
+import backtest
+import train_model
+from team_store import teams
+
+
+def _results_csv(path, n=300):
+    day = datetime.date(2024, 8, 1)
+    lines = ['date,home_team,away_team,home_goals,away_goals']
+    for i, (home, away, home_goals, away_goals) in enumerate(train_model.synthetic_results(n, seed=1)):
+        date = day + datetime.timedelta(days=i // 10)
+        lines.append(f"{date},{teams.name(home)},{teams.name(away)},{home_goals},{away_goals}")
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_main_model_scores_follow_the_trained_model(tmp_path, trained_model):
+    path = _results_csv(tmp_path / 'results.csv')
+    stats, scored, _ = backtest.run_shard(path, ('default', None), models=('main_model', 'trained'))
+    assert scored == stats['trained', '1x2', 'n'] == 300
+    # The main model's 1X2 is the trained one, as in predict_games
+    for stat in ('n', 'hits', 'brier', 'log_loss'):
+        assert stats['main_model', '1x2', stat] == pytest.approx(stats['trained', '1x2', stat])
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from bookmaker_odds import LineHistory, OddsBook, OddsSnapshot, fair_probabilities, overround
+
+
+@pytest.mark.parametrize('method', ['proportional', 'power'])
+def test_fair_probabilities_sum_to_one(method):
+    prices = np.array([[2.1, 3.4, 3.6], [1.25, 6.0, 11.0], [2.6, 3.1, 2.9]])
+    fair = fair_probabilities(prices, method)
+    np.testing.assert_allclose(fair.sum(axis=1), 1, atol=1e-12)
+    assert np.all(fair > 0)
+    # Removing the margin never raises a price's implied probability
+    assert np.all(fair <= 1 / prices + 1e-12)
+
+
+def test_power_method_takes_more_margin_off_long_shots():
+    prices = np.array([[1.25, 6.0, 11.0]])
+    proportional, power = fair_probabilities(prices), fair_probabilities(prices, 'power')
+    assert power[0, 2] < proportional[0, 2] and power[0, 0] > proportional[0, 0]
+    # Without a margin both leave the probabilities alone
+    fair_prices = 1 / np.array([[0.5, 0.3, 0.2]])
+    np.testing.assert_allclose(fair_probabilities(fair_prices, 'power'), [[0.5, 0.3, 0.2]])
+    assert overround(fair_prices)[0] == pytest.approx(0)
+    with pytest.raises(ValueError):
+        fair_probabilities(prices, 'shin')
+
+
+def test_line_history_keeps_late_snapshots_in_order():
+    line = LineHistory()
+    assert line.append(10.0, (2.0, 2.0), np.array([0.5, 0.5]))
+    assert line.append(30.0, (1.8, 2.2), np.array([0.55, 0.45]))
+    # Late: inserted in time order and not reported as the latest
+    assert not line.append(20.0, (1.9, 2.1), np.array([0.52, 0.48]))
+    assert line.times == [10.0, 20.0, 30.0]
+    assert line.at(5.0) is None
+    assert line.at(25.0) == (1.9, 2.1)
+    assert line.at(99.0) == (1.8, 2.2)
+    np.testing.assert_allclose(line.movement(), [0.05, -0.05])
+    times, prices, fair = line.arrays()
+    assert prices.shape == (3, 2) and fair.shape == (3, 2)
+
+
+def test_value_bets_follow_incremental_updates():
+    book = OddsBook(min_edge=0.05)
+    book.set_model(7, {'btts': np.array([0.6, 0.4])})
+    snap = lambda bookmaker, ts, prices: OddsSnapshot(7, bookmaker, 'btts', ts, prices)
+
+    # 0.6 * 1.7 - 1 < 0.05: nothing yet
+    assert book.apply([snap('a', 1.0, (1.7, 2.2)), snap('b', 1.0, (1.6, 2.3))]) == 2
+    assert book.value_bets() == []
+
+    # b lengthens Yes: 0.6 * 1.9 - 1 = 0.14
+    book.apply([snap('b', 2.0, (1.9, 1.95))])
+    bet, = book.value_bets(7)
+    assert (bet.selection, bet.bookmaker, bet.price) == ('Yes', 'b', 1.9)
+    assert bet.edge == pytest.approx(0.14)
+
+    # A late snapshot from before b's move changes the history, not the latest prices
+    book.apply([snap('b', 1.5, (1.5, 2.5))])
+    assert book.value_bets(7)[0].price == 1.9
+    assert len(book.history(7, 'btts')['b']) == 3
+
+    # b shortens again: the flag goes
+    book.apply([snap('b', 3.0, (1.6, 2.3))])
+    assert book.value_bets() == []
+
+    # A new model probability re-evaluates on its own, without new prices
+    book.set_model(7, {'btts': np.array([0.65, 0.35])})
+    assert [bet.bookmaker for bet in book.value_bets()] == ['a']
+    # Invalid prices are rejected and leave the book as it was
+    assert book.apply([snap('a', 4.0, (0.9, 2.0))]) == 0
+    assert book.stats['rejected'] == 1
+    latest = fair_probabilities(np.array([[1.7, 2.2], [1.6, 2.3]]))
+    np.testing.assert_allclose(book.consensus(7, 'btts'), latest.mean(axis=0))
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+
+import cache
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _cache(clock):
+    return cache.ResponseCache(cache.LRUBackend(), ttls={'fixtures': 60}, stale_window=30, clock=clock)
+
+
+def test_entries_expire_after_ttl_and_stale_window():
+    clock = Clock()
+    responses = _cache(clock)
+    calls = []
+
+    def fetch():
+        calls.append(clock.now)
+        return len(calls)
+
+    assert responses.get('fixtures', 'k', fetch) == 1
+    clock.now += 60
+    assert responses.get('fixtures', 'k', fetch) == 1
+    assert len(calls) == 1
+    # Past the TTL and the stale window, the entry is fetched again in the foreground
+    clock.now += 31
+    assert responses.get('fixtures', 'k', fetch) == 2
+    assert responses.stats['fixtures', 'hit'] == 1
+    assert responses.stats['fixtures', 'miss'] == 2
+    assert responses.hit_rate('fixtures') == 1 / 3
+
+
+def test_stale_entry_is_served_while_one_background_refresh_runs():
+    clock = Clock()
+    responses = _cache(clock)
+    release = threading.Event()
+    refreshes = []
+
+    def slow_fetch():
+        refreshes.append(1)
+        release.wait(5)
+        return 'new'
+
+    responses.get('fixtures', 'k', lambda: 'old')
+    clock.now += 70
+    # Every stale read returns the old value at once; only the first starts a refresh
+    assert [responses.get('fixtures', 'k', slow_fetch) for _ in range(5)] == ['old'] * 5
+    release.set()
+    deadline = time.monotonic() + 5
+    while responses._refreshing and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert len(refreshes) == 1
+    assert responses.stats['fixtures', 'stale'] == 5
+    assert responses.stats['fixtures', 'refresh'] == 1
+    assert responses.get('fixtures', 'k', slow_fetch) == 'new'
+    assert responses.stats['fixtures', 'hit'] == 1
+
+
+def test_async_stale_refresh_runs_once():
+    clock = Clock()
+    responses = _cache(clock)
+    refreshes = []
+
+    async def fetch():
+        refreshes.append(1)
+        await asyncio.sleep(0.01)
+        return len(refreshes)
+
+    async def run():
+        await responses.aget('fixtures', 'k', fetch)
+        clock.now += 70
+        stale = await asyncio.gather(*(responses.aget('fixtures', 'k', fetch) for _ in range(5)))
+        await asyncio.gather(*responses._tasks)
+        return stale, await responses.aget('fixtures', 'k', fetch)
+
+    stale, fresh = asyncio.run(run())
+    assert stale == [1] * 5
+    assert fresh == 2
+    assert len(refreshes) == 2
+    assert responses.stats['fixtures', 'refresh'] == 1
+
+
+def test_concurrent_misses_share_one_fetch():
+    responses = _cache(Clock())
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'matches': []}
+
+    async def run():
+        return await asyncio.gather(*(responses.aget('fixtures', 'k', fetch) for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert responses.stats['fixtures', 'miss'] == 10
+    assert not responses._inflight
+
+
+def test_failed_refresh_keeps_the_stale_value():
+    clock = Clock()
+    responses = _cache(clock)
+    responses.get('fixtures', 'k', lambda: 'old')
+    clock.now += 70
+
+    def broken():
+        raise ConnectionError('upstream down')
+
+    responses._refresh('fixtures', 'k', broken)
+    assert responses.stats['fixtures', 'error'] == 1
+    assert responses._lookup('fixtures', 'k') == ('stale', 'old')
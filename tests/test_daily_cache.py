@@ -0,0 +1,73 @@
+import copy
+
+from daily_cache import DailyPredictions
+
+
+class Fakes:
+    """fetch/predict/render for DailyPredictions that record what they were asked to do."""
+    def __init__(self, games):
+        self.games = games
+        self.predicted = []
+        self.rendered = []
+
+    def fetch(self):
+        return copy.deepcopy(self.games)
+
+    def predict(self, games):
+        self.predicted.extend(game['home_team'] for game in games)
+        return [{'home': game['home_team'], 'injuries': len(game['injuries']['home'])} for game in games]
+
+    def render(self, position, game, predictions):
+        self.rendered.append((position, game['home_team']))
+        return f"{position + 1}. {game['home_team']} vs {game['away_team']}\n"
+
+
+def _daily(make_games, n=4):
+    fakes = Fakes(make_games(n))
+    return fakes, DailyPredictions(fakes.render, 'Today\n', fetch=fakes.fetch, predict=fakes.predict)
+
+
+def test_only_changed_fixtures_are_re_predicted(make_games):
+    fakes, daily = _daily(make_games)
+    assert daily.refresh() == 4
+    assert len(fakes.predicted) == 4
+
+    fakes.predicted.clear()
+    assert daily.refresh() == 0
+    assert fakes.predicted == []
+
+    fakes.games[2]['injuries']['home'].append('New Injury (Out)')
+    assert daily.refresh() == 1
+    assert fakes.predicted == [fakes.games[2]['home_team']]
+    assert daily.predictions[2]['injuries'] == 1
+
+
+def test_a_moved_fixture_is_re_rendered_not_re_predicted(make_games):
+    fakes, daily = _daily(make_games)
+    daily.refresh()
+    fakes.predicted.clear()
+    fakes.rendered.clear()
+
+    fakes.games[0], fakes.games[1] = fakes.games[1], fakes.games[0]
+    assert daily.refresh() == 0
+    assert fakes.predicted == []
+    assert sorted(fakes.rendered) == [(0, fakes.games[0]['home_team']), (1, fakes.games[1]['home_team'])]
+    assert daily.chunks[0].startswith(f"Today\n1. {fakes.games[0]['home_team']} vs")
+
+
+def test_chunks_are_reused_while_the_content_hash_is_unchanged(make_games):
+    fakes, daily = _daily(make_games)
+    daily.refresh()
+    chunks, content_hash = daily.chunks, daily.content_hash
+    fakes.rendered.clear()
+
+    daily.refresh()
+    assert daily.chunks is chunks
+    assert daily.content_hash == content_hash
+    assert fakes.rendered == []
+
+    fakes.games[3]['weather'] = 'Rain'
+    daily.refresh()
+    assert daily.content_hash != content_hash
+    assert daily.chunks is not chunks
+    assert fakes.rendered == [(3, fakes.games[3]['home_team'])]
@@ -0,0 +1,77 @@
+import asyncio
+
+from aiohttp import web
+
+import enrichment
+import mail
+from stub_api import StubAPI
+
+
+class CountingStub(StubAPI):
+    """StubAPI that records the most requests it ever had in flight at once."""
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _delay(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await super()._delay()
+        finally:
+            self.in_flight -= 1
+
+
+class BrokenTeamsStub(StubAPI):
+    """StubAPI whose team endpoint always fails."""
+    async def _team(self, request):
+        await self._delay()
+        raise web.HTTPServiceUnavailable()
+
+
+def _enrich(stub, sequential=False, **client_kwargs):
+    football_url, weather_url = f"{stub.url}/v4", f"{stub.url}/data/2.5"
+
+    async def run():
+        async with enrichment.AsyncHTTPClient(**client_kwargs) as client:
+            matches = (await client.get_json(f"{football_url}/matches"))['matches']
+            enricher = enrichment.MatchEnricher(client, football_url, weather_url, 'key', 'key')
+            if sequential:
+                return [await enricher.enrich(match, mail._default_details(match)) for match in matches]
+            return await enricher.enrich_all(matches, mail._default_details)
+    return asyncio.run(run())
+
+
+def test_per_host_limit_bounds_concurrent_requests():
+    with CountingStub(latency=0.02, n_matches=8) as stub:
+        _enrich(stub, max_per_host=3)
+        assert stub.peak == 3
+        stub.peak = 0
+        _enrich(stub, max_per_host=8, host_limits={f"127.0.0.1:{stub.port}": 2})
+        assert stub.peak == 2
+
+
+def test_concurrent_output_matches_the_sequential_path():
+    with StubAPI(n_matches=6) as stub:
+        concurrent = _enrich(stub)
+        sequential = _enrich(stub, sequential=True)
+    assert concurrent == sequential
+    first = concurrent[0]
+    assert first['referee'] == 'Referee 1'
+    assert first['weather'] == 'Clear sky, 18°C, 5km/h wind'
+    assert first['injuries'] == ['Player 1002 (Doubtful)', 'Player 1003 (Doubtful)']
+    assert first['h2h'] == {'numberOfMatches': 5, 'totalGoals': 13}
+
+
+def test_failed_lookups_keep_the_defaults():
+    defaults = mail._default_details({'id': 1, 'homeTeam': {'id': 0}, 'awayTeam': {'id': 0}})
+    with BrokenTeamsStub(n_matches=4) as stub:
+        details = _enrich(stub)
+    assert len(details) == 4
+    for match_details in details:
+        # The team calls failed, so the injuries stay as they were; the rest is still filled in
+        assert match_details['injuries'] == defaults['injuries']
+        assert match_details['referee'].startswith('Referee ')
+        assert match_details['h2h'] == {'numberOfMatches': 5, 'totalGoals': 13}
+        assert match_details['prediction'] == defaults['prediction']
@@ -0,0 +1,74 @@
+import numpy as np
+
+from features import FeatureIndex, FeatureSnapshot
+from team_store import TeamRegistry
+
+
+def test_snapshot_reads_unknown_teams_as_empty():
+    registry = TeamRegistry()
+    index = FeatureIndex()
+    index.ingest(registry.intern('Arsenal'), registry.intern('Chelsea'), 2, 1)
+    snapshot = FeatureSnapshot.from_index(index, registry)
+    arsenal, stranger = registry.intern('Arsenal'), registry.intern('Stranger FC')
+
+    assert snapshot.row(arsenal, stranger) == (3, 1, 0, 0, 0, 0)
+    assert snapshot.row(stranger, stranger) == (0,) * 6
+
+
+def test_empty_snapshot_reads_neutral_view(tmp_path):
+    registry = TeamRegistry()
+    FeatureSnapshot.from_index(FeatureIndex(), registry).save(str(tmp_path))
+    snapshot = FeatureSnapshot.load(str(tmp_path), registry)
+    home, away = registry.intern('Arsenal'), registry.intern('Chelsea')
+
+    view = snapshot.view([home, away], [away, home])
+    assert len(view) == 2
+    for column in view.form_points() + (view.h2h_goals(), view.h2h_len):
+        np.testing.assert_array_equal(column, [0, 0])
+
+
+def test_form_keeps_the_last_five_results():
+    index = FeatureIndex()
+    # Team 0 wins, draws, loses in turn at home to team 1: points 3, 1, 0, 3, 1, 0, 3
+    scores = [(2, 0), (1, 1), (0, 1)] * 2 + [(3, 0)]
+    for home_goals, away_goals in scores:
+        index.ingest(0, 1, home_goals, away_goals)
+
+    assert index.form(0) == [0, 3, 1, 0, 3]
+    assert index.form_points(0) == (7, 5)
+    assert index.form_points(1) == (3 + 0 + 1 + 3 + 0, 5)
+    assert index.goals(0) == (0 + 2 + 1 + 0 + 3, 1 + 0 + 1 + 1 + 0, 5)
+    assert index.form_points(99) == (0, 0)
+
+
+def test_h2h_window_and_all_time_aggregates():
+    index = FeatureIndex(h2h_window=3)
+    for goals in range(1, 6):
+        index.ingest(0, 1, goals, 0)
+    index.ingest(1, 0, 2, 2)
+    index.ingest(0, 2, 9, 9)
+
+    # The pair is the same whichever side is at home
+    assert index.h2h(0, 1) == index.h2h(1, 0) == (4 + 5 + 4, 3)
+    assert index.h2h_all_time(1, 0) == (1 + 2 + 3 + 4 + 5 + 4, 6)
+    assert index.h2h(1, 2) == (0, 0)
+    assert index.row(0, 1) == index.form_points(0) + index.form_points(1) + (13, 3)
+
+
+def test_snapshot_view_matches_the_index(tmp_path):
+    registry = TeamRegistry()
+    index = FeatureIndex()
+    arsenal, chelsea, spurs = (registry.intern(name) for name in ('Arsenal', 'Chelsea', 'Spurs'))
+    for home, away, home_goals, away_goals in [(arsenal, chelsea, 2, 1), (chelsea, spurs, 0, 0),
+                                               (spurs, arsenal, 1, 3), (arsenal, chelsea, 1, 1)]:
+        index.ingest(home, away, home_goals, away_goals)
+    FeatureSnapshot.from_index(index, registry).save(str(tmp_path))
+    snapshot = FeatureSnapshot.load(str(tmp_path), registry)
+    stranger = registry.intern('Stranger FC')
+
+    homes, aways = [arsenal, chelsea, stranger], [chelsea, spurs, arsenal]
+    expected, view = index.view(homes, aways), snapshot.view(homes, aways)
+    for got, want in zip(view.form_points() + (view.h2h_goals(), view.h2h_len),
+                         expected.form_points() + (expected.h2h_goals(), expected.h2h_len)):
+        np.testing.assert_array_equal(got, want)
+    assert snapshot.row(stranger, arsenal) == (0, 0) + index.form_points(arsenal) + (0, 0)
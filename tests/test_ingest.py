@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+import predictor
+from daily_cache import fixture_key
+from ingest import InPlayTracker
+
+
+def test_consume_reraises_when_the_source_fails(make_games):
+    game = make_games(1)[0]
+    tracker = InPlayTracker([game])
+
+    async def source():
+        yield {'home_team': game['home_team'], 'away_team': game['away_team'], 'date': game['date'],
+               'minute': 10, 'home_goals': 1, 'away_goals': 0, 'status': 'LIVE'}
+        raise ConnectionError('feed dropped')
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(asyncio.wait_for(tracker.consume(source()), timeout=5))
+    # The event before the failure was still applied
+    assert [p['score'] for p in tracker.predictions.values()] == ['1-0']
+
+
+@pytest.mark.parametrize('trained', [False, True])
+def test_kickoff_prediction_matches_predict_games(trained, request, make_games):
+    if trained:
+        request.getfixturevalue('trained_model')
+    games = make_games(6, weathers=('Clear', 'Rain', 'Snow'))
+    tracker = InPlayTracker(games)
+    tracker.apply([{'home_team': game['home_team'], 'away_team': game['away_team'], 'date': game['date'],
+                    'minute': 0, 'home_goals': 0, 'away_goals': 0, 'status': 'LIVE'} for game in games])
+
+    for game, expected in zip(games, predictor.predict_games(games)):
+        live = tracker.predictions[fixture_key(game)]
+        for market in ('1x2', 'btts', 'over_under', 'correct_score'):
+            assert live[market][0] == expected['main_model'][market][0]
+            assert live[market][1] == pytest.approx(expected['main_model'][market][1], abs=1e-12)
@@ -0,0 +1,98 @@
+import json
+import re
+
+import pytest
+
+from instrumentation import PREFIX, Metrics
+
+_SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+def _parse(text):
+    """Prometheus text -> {(name, labels): value} and {name: type}."""
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split()
+            types[name] = kind
+            continue
+        name, labels, value = _SAMPLE.match(line).groups()
+        pairs = tuple(sorted(re.findall(r'(\w+)="([^"]*)"', labels or '')))
+        samples[name, pairs] = float(value)
+    return samples, types
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _metrics():
+    clock = Clock()
+    return clock, Metrics(buckets=(0.1, 1.0), clock=clock)
+
+
+def test_spans_are_timed_and_failures_counted():
+    clock, metrics = _metrics()
+    with metrics.span('predict', model='main'):
+        clock.now += 0.05
+    with pytest.raises(ValueError):
+        with metrics.span('predict', model='main'):
+            clock.now += 2.0
+            raise ValueError('bad input')
+
+    histogram = metrics.histograms['span_seconds', (('model', 'main'), ('span', 'predict'))]
+    assert histogram.count == 2
+    assert histogram.sum == pytest.approx(2.05)
+    assert histogram.counts == [1, 0, 1]
+    assert metrics.counters == {
+        ('span_errors_total', (('error', 'ValueError'), ('model', 'main'), ('span', 'predict'))): 1}
+
+
+def test_prometheus_text_parses_back():
+    clock, metrics = _metrics()
+    with pytest.raises(KeyError):
+        with metrics.span('fetch'):
+            clock.now += 0.5
+            raise KeyError('matches')
+    metrics.inc('sent_total', 3, chat='1')
+    metrics.register_collector('cache', lambda: [('cache_events_total', {'event': 'hit'}, 7)])
+
+    samples, types = _parse(metrics.prometheus_text())
+    assert types == {f'{PREFIX}span_errors_total': 'counter', f'{PREFIX}sent_total': 'counter',
+                     f'{PREFIX}cache_events_total': 'counter', f'{PREFIX}span_seconds': 'histogram'}
+    assert samples[f'{PREFIX}span_errors_total', (('error', 'KeyError'), ('span', 'fetch'))] == 1
+    assert samples[f'{PREFIX}sent_total', (('chat', '1'),)] == 3
+    assert samples[f'{PREFIX}cache_events_total', (('event', 'hit'),)] == 7
+    # Histogram buckets are cumulative and end with +Inf == count
+    assert [samples[f'{PREFIX}span_seconds_bucket', (('le', le), ('span', 'fetch'))]
+            for le in ('0.1', '1', '+Inf')] == [0, 1, 1]
+    assert samples[f'{PREFIX}span_seconds_count', (('span', 'fetch'),)] == 1
+    assert samples[f'{PREFIX}span_seconds_sum', (('span', 'fetch'),)] == pytest.approx(0.5)
+
+
+def test_error_rates_per_upstream(tmp_path):
+    _, metrics = _metrics()
+    for ok in (True, True, True, False):
+        try:
+            with metrics.upstream('api.football-data.org'):
+                if not ok:
+                    raise ConnectionError('reset')
+        except ConnectionError:
+            pass
+    with pytest.raises(TimeoutError):
+        with metrics.upstream('api.openweathermap.org'):
+            raise TimeoutError()
+
+    assert metrics.error_rates() == {'api.football-data.org': 0.25, 'api.openweathermap.org': 1.0}
+    path = tmp_path / 'metrics.json'
+    metrics.dump(str(path))
+    assert json.loads(path.read_text())['upstream_error_rates'] == metrics.error_rates()
+    samples, _ = _parse(metrics.prometheus_text())
+    assert samples[f'{PREFIX}upstream_requests_total',
+                   (('outcome', 'error'), ('upstream', 'api.football-data.org'))] == 1
+    assert samples[f'{PREFIX}span_errors_total',
+                   (('error', 'TimeoutError'), ('span', 'upstream'), ('upstream', 'api.openweathermap.org'))] == 1
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import machine_learning
+import predictor
+
+
+def _per_game(game, models=predictor._MODELS):
+    """Every market of ``models``, predicted one game at a time."""
+    result = {}
+    for name, model in models:
+        matrix = model.score_matrix(game)
+        result[name] = {
+            '1x2': model.predict_match_outcome(game, matrix),
+            'btts': model.predict_btts(game, matrix),
+            'correct_score': model.predict_correct_score(game, matrix),
+            'over_under': model.predict_over_under(game, matrix=matrix),
+        }
+    return result
+
+
+def _assert_same(batch, single):
+    for name, markets in single.items():
+        for market, (pick, prob) in markets.items():
+            assert batch[name][market][0] == pick, (name, market)
+            assert batch[name][market][1] == pytest.approx(prob, abs=1e-12), (name, market)
+
+
+def test_trained_model_drives_every_market_in_both_paths(trained_model, make_games):
+    games = make_games(50)
+    batch = predictor.predict_games(games)
+    proba = machine_learning.predict_outcome_proba(games)
+    for i, game in enumerate(games):
+        _assert_same(batch[i], _per_game(game, [('main_model', predictor.main_model)]))
+        # The main model's 1X2 is the trained one, and its matrix agrees with it
+        assert batch[i]['main_model']['1x2'][1] == pytest.approx(proba[i].max())
+        matrix = predictor.main_model.score_matrix(game)
+        assert np.allclose(matrix.outcome_probs(), proba[i])
+        assert matrix.matrix.sum() == pytest.approx(1)
+
+
+@pytest.mark.parametrize('trained', [False, True])
+def test_batch_matches_per_game_for_every_model_and_market(trained, request, make_games):
+    if trained:
+        request.getfixturevalue('trained_model')
+    games = make_games(200)
+    batch = predictor.predict_games(games)
+    for i, game in enumerate(games):
+        _assert_same(batch[i], _per_game(game))
+
+
+def test_score_matrix_set_markets_agree_with_the_matrices(make_games):
+    matrix_set = predictor.ScoreMatrixSet.from_games(make_games(100), home_adv=0.2)
+    size = predictor.MAX_GOALS + 1
+    assert np.allclose(matrix_set.matrices.sum(axis=(1, 2)), 1)
+    assert np.allclose(matrix_set.outcome_probs.sum(axis=1), 1)
+    # The totals CDF is monotone and ends at 1
+    assert (np.diff(matrix_set.totals_cdf, axis=1) >= -1e-15).all()
+    assert np.allclose(matrix_set.totals_cdf[:, -1], 1)
+    home, away = np.indices((size, size))
+    for i, matrix in enumerate(matrix_set.matrices):
+        assert matrix_set.totals_cdf[i, 2] == pytest.approx(matrix[home + away <= 2].sum())
+        assert matrix_set.btts[i] == pytest.approx(matrix[1:, 1:].sum())
+        # Top-N correct scores: a brute-force (stable) argsort of the flattened matrix
+        flat = matrix.ravel()
+        best = sorted(range(flat.size), key=lambda cell: -flat[cell])[:predictor.TOP_SCORES]
+        assert matrix_set.top_cells[i].tolist() == best
+        assert matrix_set[i].top_scores(1)[0][0] == f"{best[0] // size}-{best[0] % size}"
+
+
+def test_over_prob_outside_the_matrix(make_games):
+    matrix = predictor.ScoreMatrixSet.from_games(make_games(1), home_adv=0.2)[0]
+    assert matrix.over_prob(2 * predictor.MAX_GOALS + 0.5) == 0.0
+    assert matrix.over_prob(100.5) == 0.0
+    assert matrix.over_prob(-0.5) == 1.0
+    assert matrix.over_prob(2.5) == pytest.approx(1 - matrix.matrix[np.add.outer(range(11), range(11)) <= 2].sum())
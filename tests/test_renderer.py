@@ -0,0 +1,53 @@
+import renderer
+from renderer import HTML, MARKDOWN_V2, Template
+
+
+def test_fields_are_escaped_and_markup_is_not():
+    template = Template("*{home} vs {away}* `{score}` ({confidence:.1%})")
+    text = template.render({'home': 'Team_A*', 'away': 'St. Mary [B]', 'score': '2-1`', 'confidence': 0.5})
+    assert text == "*Team\\_A\\* vs St\\. Mary \\[B\\]* `2-1\\`` \\(50\\.0%\\)"
+
+
+def test_html_mode():
+    assert Template("*{home}* & {away}", HTML).render({'home': '<b>', 'away': 'R&D'}) == \
+        "<b>&lt;b&gt;</b> &amp; R&amp;D"
+
+
+def test_indexed_fields_and_conversions():
+    template = Template("{main[1x2][0]} {main[1x2][1]:.0%} {team.real} {name!r}")
+    assert template.render({'main': {'1x2': ('1', 0.25)}, 'team': 3, 'name': 'a'}) == "1 25% 3 'a'"
+
+
+def test_value_containing_the_separator_is_still_escaped():
+    assert Template("{a}.{b}").render({'a': 'x\x00.', 'b': '!'}) == 'x\x00\\.\\.\\!'
+
+
+def test_escape_reserved_characters():
+    reserved = '\\_*[]()~`>#+-=|{}.!'
+    assert renderer.escape(reserved, MARKDOWN_V2) == ''.join('\\' + c for c in reserved)
+
+
+
+def test_game_block_escapes_team_names(make_games):
+    import predictor
+
+    game = make_games(1)[0]
+    game['home_team'] = 'Team_A*'
+    text = renderer.game_renderer()(0, game, predictor.predict_games([game])[0])
+    assert text.startswith('*Game 1:* *Team\\_A\\* vs ')
+    assert '\\(confidence: ' in text
+
+
+def test_fragments_are_reused_until_the_predictions_change(make_games):
+    import predictor
+
+    games = make_games(3)
+    preds = predictor.predict_games(games)
+    render = renderer.game_renderer()
+    first = [render(i, game, p) for i, (game, p) in enumerate(zip(games, preds))]
+    # Moved fixtures keep their fragment; only the numbered prefix changes
+    moved = [render(i, game, p) for i, (game, p) in enumerate(zip(games[::-1], preds[::-1]))]
+    assert (render.misses, render.hits) == (3, 3)
+    assert moved[0] == first[2].replace('*Game 3:*', '*Game 1:*', 1)
+    render(0, games[0], predictor.predict_games([games[0]])[0])
+    assert render.misses == 4
@@ -0,0 +1,42 @@
+import pytest
+
+from shared_state import MemoryState, SQLiteState
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def state(request, tmp_path):
+    clock = Clock()
+    state = MemoryState(clock) if request.param == 'memory' else SQLiteState(str(tmp_path / 'state.db'), clock)
+    yield state
+    state.close()
+
+
+def test_lease_is_exclusive_until_it_expires(state):
+    assert state.acquire('refresh', 'replica-a', ttl=60)
+    assert not state.acquire('refresh', 'replica-b', ttl=60)
+    # The holder renews
+    state.clock.now += 50
+    assert state.acquire('refresh', 'replica-a', ttl=60)
+    state.clock.now += 50
+    assert not state.acquire('refresh', 'replica-b', ttl=60)
+    # Expired: another replica takes over, and the old holder is locked out
+    state.clock.now += 11
+    assert state.acquire('refresh', 'replica-b', ttl=60)
+    assert not state.acquire('refresh', 'replica-a', ttl=60)
+
+
+def test_values_expire(state):
+    state.set('daily', b'snapshot', ttl=10)
+    state.set('forever', b'x')
+    assert state.get('daily') == b'snapshot'
+    state.clock.now += 10
+    assert state.get('daily') is None
+    assert state.get('forever') == b'x'
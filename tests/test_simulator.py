@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+import predictor
+from simulator import simulate_season, standings_from_results
+from team_store import FixtureTable
+
+
+@pytest.mark.parametrize('trained', [False, True])
+def test_odds_follow_the_model_probabilities(trained, request, make_games):
+    if trained:
+        request.getfixturevalue('trained_model')
+    fixture = make_games(1, weathers=('Rain',))
+    home, draw, away = predictor.model_matrices(predictor.main_model, FixtureTable.from_games(fixture),
+                                                predictor.game_weather(fixture), fixture).outcome_probs[0]
+    odds = simulate_season(fixture, n_sims=100_000, workers=1)
+
+    # Level on everything after a draw, so the coin toss decides
+    assert odds.title(fixture[0]['home_team']) == pytest.approx(home + draw / 2, abs=0.01)
+    assert odds.title(fixture[0]['away_team']) == pytest.approx(away + draw / 2, abs=0.01)
+    np.testing.assert_allclose(odds.expected_points, [3 * home + draw, 3 * away + draw], atol=0.02)
+
+
+def test_position_counts_sum_to_the_number_of_seasons(make_games):
+    games = make_games(3)
+    # Every team plays every other once more: 6 teams, each with 5 fixtures left
+    names = sorted({game['home_team'] for game in games} | {game['away_team'] for game in games})
+    fixtures = [dict(games[0], home_team=a, away_team=b, h2h=[]) for i, a in enumerate(names) for b in names[i + 1:]]
+    standings = standings_from_results([{'home_team': names[0], 'away_team': names[1], 'home_goals': 2,
+                                         'away_goals': 0}])
+    odds = simulate_season(fixtures, standings, n_sims=45_000, seed=7, workers=1)
+
+    assert odds.teams == names
+    np.testing.assert_array_equal(odds.counts.sum(axis=1), [45_000] * len(names))
+    np.testing.assert_array_equal(odds.counts.sum(axis=0), [45_000] * len(names))
+    assert sum(odds.title(team) for team in names) == pytest.approx(1)
+    # Same seed, same odds, however the shards are run
+    np.testing.assert_array_equal(simulate_season(fixtures, standings, n_sims=45_000, seed=7, workers=2).counts,
+                                  odds.counts)
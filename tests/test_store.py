@@ -0,0 +1,41 @@
+import predictor
+from store import PredictionStore
+
+
+def test_predictions_round_trip(tmp_path, make_games):
+    games = make_games(20)
+    predictions = predictor.predict_games(games)
+    hashes = [f"h{i}" for i in range(len(games))]
+    with PredictionStore(str(tmp_path / 'predictions.db')) as store:
+        store.record_predictions(games, predictions, hashes)
+
+    # A new connection, as after a restart
+    with PredictionStore(str(tmp_path / 'predictions.db')) as store:
+        changed = hashes[:5] + ['changed'] + hashes[6:]
+        cached = store.cached_predictions(games, changed)
+        assert sorted(cached) == [i for i in range(len(games)) if i != 5]
+        for i, stored in cached.items():
+            assert stored.keys() == predictions[i].keys()
+            for model, markets in predictions[i].items():
+                for market, (pick, confidence) in markets.items():
+                    assert stored[model][market] == (pick, float(confidence))
+
+
+def test_results_settle_history_and_accuracy(tmp_path, make_games):
+    games = make_games(10)
+    predictions = predictor.predict_games(games)
+    with PredictionStore(str(tmp_path / 'predictions.db')) as store:
+        store.record_predictions(games, predictions)
+        store.record_results({'home_team': g['home_team'], 'away_team': g['away_team'], 'date': g['date'],
+                              'home_goals': 1, 'away_goals': 1} for g in games)
+        start, end = min(g['date'] for g in games), max(g['date'] for g in games)
+        rows = store.history(start, end)
+        assert len(rows) == len(games)
+        assert all(row.score == (1, 1) and row.picks for row in rows)
+
+        stats = store.accuracy(start, end, model='main_model')
+        draws = sum(p['main_model']['1x2'][0] == 'X' for p in predictions)
+        assert stats['main_model', '1x2'].n == len(games)
+        assert stats['main_model', '1x2'].hits == draws
+        assert stats['main_model', 'correct_score'].hits == sum(p['main_model']['correct_score'][0] == '1-1'
+                                                                for p in predictions)
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+import ai_predictor
+import subscriptions
+from subscriptions import ANY_LEAGUE, Filter, SubscriptionRegistry, evaluate, plan
+
+
+def _registry():
+    registry = SubscriptionRegistry()
+    registry.subscribe(1, 'fire', 0.6)
+    registry.subscribe(2, 'fire', 0.6)
+    registry.subscribe(3, '1x2', 0.7, league='PL')
+    registry.subscribe(3, 'btts', 0.5)
+    registry.subscribe('@channel', 'correct_score')
+    return registry
+
+
+def test_index_maps_each_filter_to_its_chats():
+    registry = _registry()
+    assert registry.index == {Filter(ANY_LEAGUE, 'fire', 0.6): {1, 2}, Filter('PL', '1x2', 0.7): {3},
+                              Filter(ANY_LEAGUE, 'btts', 0.5): {3}, Filter(ANY_LEAGUE, 'correct_score', 0.0): {'@channel'}}
+    assert registry.groups[frozenset({Filter(ANY_LEAGUE, 'fire', 0.6)})] == {1, 2}
+
+    # Same league and market replaces the threshold; the old filter leaves the index
+    registry.subscribe(2, 'fire', 0.8)
+    assert registry.index[Filter(ANY_LEAGUE, 'fire', 0.6)] == {1}
+    assert registry.index[Filter(ANY_LEAGUE, 'fire', 0.8)] == {2}
+    assert registry.unsubscribe(3, market='btts') == 1
+    assert Filter(ANY_LEAGUE, 'btts', 0.5) not in registry.index
+    assert registry.unsubscribe(3) == 1
+    assert len(registry) == 3 and 3 not in {chat for chats in registry.groups.values() for chat in chats}
+
+    with pytest.raises(ValueError):
+        registry.subscribe(4, 'corners')
+    with pytest.raises(ValueError):
+        registry.subscribe(4, 'btts', 1.5)
+
+
+def test_registry_round_trips_through_json(tmp_path):
+    registry = _registry()
+    path = str(tmp_path / 'subscriptions.json')
+    registry.save(path)
+    loaded = SubscriptionRegistry.load(path)
+
+    assert loaded.index == registry.index
+    assert loaded.groups == registry.groups
+    assert {chat: loaded.filters(chat) for chat in (1, 2, 3, '@channel')} == \
+        {chat: registry.filters(chat) for chat in (1, 2, 3, '@channel')}
+    assert len(SubscriptionRegistry.load(str(tmp_path / 'missing.json'))) == 0
+
+
+def _slate():
+    games = [{'home_team': f'H{i}', 'away_team': f'A{i}', 'league': league}
+             for i, league in enumerate(['PL', 'PL', 'LaLiga', None])]
+    picks = [(('1', 0.8), ('Yes', 0.7)), (('2', 0.9), ('No', 0.55)), (('X', 0.65), ('Yes', 0.62)),
+             (('1', 0.75), ('Yes', 0.4))]
+    predictions = [{'main_model': {'1x2': outcome, 'btts': btts, 'over_under': ('Over 2.5', 0.6),
+                                   'correct_score': ('1-0', 0.12)}} for outcome, btts in picks]
+    return games, predictions
+
+
+def test_evaluate_applies_league_and_threshold():
+    games, predictions = _slate()
+    columns = subscriptions.predictor_markets(predictions)
+    matches = evaluate(games, columns, [Filter(ANY_LEAGUE, 'fire', 0.6), Filter('PL', '1x2', 0.85),
+                                        Filter('default', '1x2', 0.0), Filter(ANY_LEAGUE, 'btts', 0.5)])
+    # fire: 1 or X with BTTS Yes, at the lower of the two confidences
+    np.testing.assert_array_equal(matches[Filter(ANY_LEAGUE, 'fire', 0.6)], [0, 2])
+    np.testing.assert_array_equal(matches[Filter('PL', '1x2', 0.85)], [1])
+    np.testing.assert_array_equal(matches[Filter('default', '1x2', 0.0)], [3])
+    # btts matches either side of the pick
+    np.testing.assert_array_equal(matches[Filter(ANY_LEAGUE, 'btts', 0.5)], [0, 1, 2])
+
+
+def test_plan_renders_once_per_fixture_set():
+    games, predictions = _slate()
+    registry = _registry()
+    registry.subscribe(5, 'fire', 0.6)
+    registry.subscribe(5, '1x2', 0.99)  # matches nothing more than 'fire' already does
+    registry.subscribe(6, 'over_under', 0.9)  # matches nothing
+    rendered = []
+
+    def render(position, game, prediction):
+        rendered.append((position, game['home_team']))
+        return f"{position}:{game['home_team']}\n"
+
+    deliveries = plan(registry, games, predictions, render, 'Header\n')
+    by_chat = {chat: delivery.chunks for delivery in deliveries for chat in delivery.chat_ids}
+
+    assert set(by_chat) == {1, 2, 3, 5, '@channel'}
+    assert by_chat[1] == by_chat[2] == by_chat[5] == ['Header\n0:H0\n1:H2\n']
+    assert by_chat[3] == ['Header\n0:H0\n1:H1\n2:H2\n']
+    assert by_chat['@channel'] == ['Header\n0:H0\n1:H1\n2:H2\n3:H3\n']
+    # Chats 1, 2 and 5 share one delivery; each (fixture, position) is rendered once
+    assert sorted(len(delivery.chat_ids) for delivery in deliveries) == [1, 1, 3]
+    assert len(rendered) == len(set(rendered)) == 5
+
+
+def test_both_predictors_match_btts_the_same_way():
+    ai_predictions = [{'match_result': '2', 'btts': 'No', 'confidence': 80},
+                      {'match_result': '1', 'btts': 'Yes', 'confidence': 70}]
+    ai_columns = ai_predictor.prediction_markets(ai_predictions)
+    _, predictions = _slate()
+    columns = subscriptions.predictor_markets(predictions)
+
+    assert ai_columns['btts'][0].all() and columns['btts'][0].all()
+    np.testing.assert_array_equal(ai_columns['fire'][0], [False, True])
+    np.testing.assert_array_equal(columns['fire'][0], [True, False, True, True])
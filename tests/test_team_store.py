@@ -0,0 +1,59 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from team_store import FixtureTable, MatchTable, TeamRegistry, day_number
+
+
+def test_registry_interns_names_to_dense_ids():
+    registry = TeamRegistry()
+    assert [registry.intern(name) for name in ('Arsenal', 'Chelsea', 'Arsenal')] == [0, 1, 0]
+    assert registry.lookup('Chelsea') == 1 and registry.lookup('Stranger FC') is None
+    assert registry.name(1) == 'Chelsea'
+    assert len(registry) == 2 and 'Arsenal' in registry
+
+
+def test_match_table_grows_past_its_capacity():
+    table = MatchTable(capacity=2)
+    for i in range(5):
+        assert table.append(700_000 + i, i, i + 1, i % 3, 1) == i
+    table.extend(np.arange(3), np.zeros(3), np.ones(3), np.full(3, 2), np.zeros(3))
+
+    assert len(table) == 8
+    assert len(table._columns['day']) >= 8
+    np.testing.assert_array_equal(table.home_id, [0, 1, 2, 3, 4, 0, 0, 0])
+    np.testing.assert_array_equal(table.home_goals, [0, 1, 2, 0, 1, 2, 2, 2])
+    assert table.home_goals.dtype == np.int8 and table.day.dtype == np.int32
+    assert table.nbytes == 8 * (3 * 4 + 2 * 1)
+
+
+def test_columns_are_views_of_the_filled_rows():
+    table = MatchTable(capacity=16)
+    table.append(1, 2, 3, 4, 5)
+    assert len(table.away_goals) == 1
+    with pytest.raises(AttributeError):
+        table.corners
+
+
+def test_add_result_parses_once_into_a_match_row():
+    registry = TeamRegistry()
+    table = MatchTable()
+    i = table.add_result('2025-03-01', 'Arsenal', 'Chelsea', '2-1', registry)
+    row = table.row(i)
+    assert (row.day, row.home_id, row.away_id) == (datetime.date(2025, 3, 1).toordinal(), 0, 1)
+    assert (row.home_goals, row.away_goals, row.score) == (2, 1, '2-1')
+    assert day_number(datetime.date(2025, 3, 1)) == row.day
+    assert [r.score for r in table.rows()] == ['2-1']
+    with pytest.raises(IndexError):
+        table.row(1)
+
+
+def test_fixture_table_features(make_games):
+    games = make_games(3)
+    table = FixtureTable.from_games(games, TeamRegistry())
+    home_sum, home_len, away_sum, away_len = table.form_points()
+    np.testing.assert_array_equal(home_sum, [sum(game['team_forms']['home']) for game in games])
+    np.testing.assert_array_equal(away_len, [len(game['team_forms']['away']) for game in games])
+    np.testing.assert_array_equal(table.h2h_goals(), [
+        sum(int(goals) for match in game['h2h'] for goals in match['score'].split('-')) for game in games])
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+import telegram_sender
+from telegram_sender import OutboundSender, RejectedError, TransientError, split_message
+
+
+def test_rejected_messages_are_not_retried():
+    calls = []
+
+    async def transport(chat_id, text, **kwargs):
+        calls.append(text)
+        raise RejectedError(400, "Bad Request: can't parse entities")
+
+    async def run():
+        sender = OutboundSender(transport, global_rate=1000, private_rate=1000)
+        await sender.send(1, 'hello')
+
+    with pytest.raises(RejectedError):
+        asyncio.run(run())
+    assert calls == ['hello']
+
+
+def test_server_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(telegram_sender, 'BACKOFF_BASE', 0.0)
+    calls = []
+
+    async def transport(chat_id, text, **kwargs):
+        calls.append(text)
+        if len(calls) < 3:
+            raise TransientError('Bot API error 502')
+        return {'ok': True}
+
+    async def run():
+        sender = OutboundSender(transport, global_rate=1000, private_rate=1000)
+        return await sender.send(1, 'hello'), sender.metrics['retried']
+
+    assert asyncio.run(run()) == ([{'ok': True}], 2)
+    assert len(calls) == 3
+
+
+def test_idle_chat_buckets_are_pruned(monkeypatch):
+    monkeypatch.setattr(telegram_sender, 'PRUNE_BUCKETS_AT', 4)
+
+    async def transport(chat_id, text, **kwargs):
+        return {'ok': True}
+
+    async def run():
+        sender = OutboundSender(transport, global_rate=1000, private_rate=1000)
+        for chat_id in range(20):
+            await sender.send(chat_id, 'hello')
+            # Let the chat's bucket refill, as it would between real sends
+            sender._chat_buckets[chat_id].updated -= 60
+        return sender
+
+    sender = asyncio.run(run())
+    assert len(sender._chat_buckets) <= 4
+    assert sender.metrics['sent'] == 20
+
+
+def _entities_balanced(chunk):
+    return not telegram_sender._open_entities(chunk) and (len(chunk) - len(chunk.rstrip('\\'))) % 2 == 0
+
+
+def test_hard_cut_keeps_escapes_whole():
+    text = 'x' * 9 + '\\.' + 'y' * 20
+    chunks = split_message(text, 10)
+    assert ''.join(chunks) == text
+    assert all(len(chunk) <= 10 and _entities_balanced(chunk) for chunk in chunks)
+
+
+def test_cut_moves_a_bold_entity_to_the_next_chunk():
+    text = 'intro text *Game 1: Arsenal vs Chelsea*'
+    chunks = split_message(text, 30)
+    assert chunks == ['intro text ', '*Game 1: Arsenal vs Chelsea*']
+
+
+def test_entity_longer_than_a_chunk_is_closed_and_reopened():
+    text = '*' + 'a\\_' * 20 + '*'
+    chunks = split_message(text, 16)
+    assert all(len(chunk) <= 16 and chunk[0] == chunk[-1] == '*' and _entities_balanced(chunk) for chunk in chunks)
+    assert ''.join(chunk[1:-1] for chunk in chunks) == text[1:-1]
+
+
+def test_italic_and_code_entities_are_kept_whole():
+    assert split_message('intro text _Arsenal vs Chelsea_', 20) == ['intro text ', '_Arsenal vs Chelsea_']
+    # Inside code, * and _ are literal and don't open anything
+    assert split_message('intro `a*b_c d` rest', 12) == ['intro', '`a*b_c d`', 'rest']
+
+
+def test_long_italic_and_code_entities_are_closed_and_reopened():
+    for marker in '_`':
+        text = marker + 'word ' * 12 + marker
+        chunks = split_message(text, 16)
+        assert all(len(chunk) <= 16 and chunk[0] == chunk[-1] == marker and _entities_balanced(chunk)
+                   for chunk in chunks)
+        assert ' '.join(chunk[1:-1] for chunk in chunks).split() == text[1:-1].split()
+
+
+def test_nested_entities_are_reopened_in_order():
+    text = '*bold _' + 'x' * 30 + '_*'
+    chunks = split_message(text, 12)
+    assert all(len(chunk) <= 12 and _entities_balanced(chunk) for chunk in chunks)
+    assert chunks[0] == '*bold*'
+    assert all(chunk.startswith('*_') and chunk.endswith('_*') for chunk in chunks[1:])
+    assert ''.join(chunk[2:-2] for chunk in chunks[1:]) == 'x' * 30
@@ -0,0 +1,42 @@
+import asyncio
+
+import venues
+
+
+class FakeClient:
+    """Answers every forecast request with clear skies for the next few 3-hour steps."""
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+
+    async def get_json(self, url, params):
+        self.calls.append((params['lat'], params['lon']))
+        start = int(self.clock()) // 3600 * 3600
+        return {'list': [{'dt': start + 3 * 3600 * i, 'weather': [{'main': 'Clear', 'description': 'clear sky'}],
+                          'main': {'temp': 15.0}, 'wind': {'speed': 2.0}} for i in range(4)]}
+
+
+def test_forecast_cache_expires_and_evicts():
+    now = [1_700_000_000.0]
+    clock = lambda: now[0]
+    client = FakeClient(clock)
+    service = venues.WeatherService(client, 'http://weather', 'key', venues.default_registry(), clock=clock,
+                                    max_cells=2)
+    cities = ['Emirates Stadium', 'Anfield', 'Old Trafford']
+
+    def forecast(venue):
+        return asyncio.run(service.forecasts([(venue, now[0])]))[0]
+
+    assert forecast('Emirates Stadium').condition == 'Clear'
+    assert forecast('Emirates Stadium').condition == 'Clear'
+    assert len(client.calls) == 1
+    # Past the TTL the cell is fetched again
+    now[0] += venues.FORECAST_TTL + 1
+    forecast('Emirates Stadium')
+    assert len(client.calls) == 2
+    # Only max_cells cells are kept, the least recently used goes first
+    for city in cities:
+        assert forecast(city) is not None
+    assert len(service._forecasts) == 2
+    forecast('Emirates Stadium')
+    assert len(client.calls) == 5
@@ -0,0 +1,97 @@
+# train_model.py
+"""Fit the 1X2 GradientBoostingClassifier used by machine_learning.py.
+
+    python train_model.py --csv results.csv       # historical results
+    python train_model.py --synthetic 50000       # generated seasons
+
+The CSV needs date, home_team, away_team, home_goals and away_goals columns.
+Results are replayed in date order and every match's features are taken from
+the FeatureIndex *before* that match is ingested, so nothing leaks from the
+future into training.
+"""
+import argparse
+import csv
+import math
+import random
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from features import FeatureIndex, FeatureView
+from machine_learning import MODEL_PATH, OUTCOMES, feature_matrix
+from team_store import teams
+
+Result = Tuple[int, int, int, int]  # home_id, away_id, home_goals, away_goals
+
+
+def read_csv(path: str) -> List[Result]:
+    with open(path, newline='') as f:
+        rows = sorted(csv.DictReader(f), key=lambda row: row['date'])
+    return [(teams.intern(row['home_team']), teams.intern(row['away_team']),
+             int(row['home_goals']), int(row['away_goals'])) for row in rows]
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    # Knuth's method; fine for football-sized means
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def synthetic_results(n: int, n_teams: int = 20, seed: int = 0) -> List[Result]:
+    """Round-robin seasons of a league with fixed hidden team strengths."""
+    rng = random.Random(seed)
+    attack = [rng.gauss(0, 0.3) for _ in range(n_teams)]
+    defence = [rng.gauss(0, 0.3) for _ in range(n_teams)]
+    ids = [teams.intern(f"Synthetic {i}") for i in range(n_teams)]
+    results: List[Result] = []
+    while len(results) < n:
+        season = [(h, a) for h in range(n_teams) for a in range(n_teams) if h != a]
+        rng.shuffle(season)
+        for h, a in season:
+            home_goals = _poisson(rng, math.exp(0.3 + attack[h] - defence[a]))
+            away_goals = _poisson(rng, math.exp(0.1 + attack[a] - defence[h]))
+            results.append((ids[h], ids[a], home_goals, away_goals))
+    return results[:n]
+
+
+def training_set(results: Iterable[Result]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pre-match features and the 1X2 label for every result, in order."""
+    index = FeatureIndex()
+    rows, labels = [], []
+    for home_id, away_id, home_goals, away_goals in results:
+        rows.append(index.row(home_id, away_id))
+        labels.append('1' if home_goals > away_goals else 'X' if home_goals == away_goals else '2')
+        index.ingest(home_id, away_id, home_goals, away_goals)
+    return feature_matrix(FeatureView.from_rows(rows)), np.array(labels)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help='historical results CSV')
+    source.add_argument('--synthetic', type=int, metavar='N', help='generate N synthetic results')
+    parser.add_argument('--output', default=MODEL_PATH, help='model file (default: %(default)s)')
+    parser.add_argument('--estimators', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import joblib
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    results = read_csv(args.csv) if args.csv else synthetic_results(args.synthetic, seed=args.seed)
+    X, y = training_set(results)
+    model = GradientBoostingClassifier(n_estimators=args.estimators, max_depth=3, random_state=args.seed)
+    model.fit(X, y)
+    # Uncompressed, so machine_learning.ModelRegistry can memory-map it
+    joblib.dump(model, args.output)
+    counts = {outcome: int((y == outcome).sum()) for outcome in OUTCOMES}
+    print(f"Trained on {len(y)} matches {counts}, accuracy on training data {model.score(X, y):.3f}")
+    print(f"Saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+# venues.py
+"""Venue registry with a grid spatial index, and batched, cached weather.
+
+Stadium coordinates are bucketed into a grid of CELL_DEGREES cells, so the
+stadiums of a city share a cell. Forecasts are fetched once per cell (the
+OpenWeather 5-day/3-hour ``/forecast`` endpoint covers every kickoff in the
+next five days in one response) and cached per (cell, hour):
+
+    weather = WeatherService(client, WEATHER_API_URL, WEATHER_API_KEY, default_registry())
+    forecasts = await weather.forecasts([(venue, kickoff), ...])
+
+``weather_factors`` turns weather descriptions into the per-fixture goal
+multiplier predictor.expected_goals applies, with array operations over the
+distinct descriptions of a slate.
+"""
+import asyncio
+import csv
+import json
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from cache import TTLS, LRUBackend
+
+logger = logging.getLogger(__name__)
+
+CELL_DEGREES = 0.25  # ~28 km north-south: one forecast per city
+FORECAST_TTL = TTLS['weather']
+FORECAST_STEP_HOURS = 3
+FORECAST_RANGE_HOURS = 5 * 24
+FORECAST_CACHE_CELLS = 1024  # cells whose forecasts are kept, least recently used evicted first
+VENUES_PATH = os.environ.get('SOCCER_VENUES_PATH')
+EARTH_RADIUS_KM = 6371.0
+
+# Goal multipliers per weather keyword; the lowest matching one applies
+WEATHER_GOAL_FACTORS = (
+    ('snow', 0.88), ('thunder', 0.9), ('storm', 0.9), ('rain', 0.93), ('drizzle', 0.96), ('wet', 0.96),
+)
+STRONG_WIND_KMH = 40
+STRONG_WIND_FACTOR = 0.95
+
+Cell = Tuple[int, int]
+
+
+class Venue(NamedTuple):
+    name: str
+    city: str
+    lat: float
+    lon: float
+
+
+class Forecast(NamedTuple):
+    condition: str  # OpenWeather's main group: Clear, Clouds, Rain, Snow, ...
+    description: str
+    temp: float
+    wind_kmh: float
+    rain_mm: float  # over the forecast's 3 hours
+
+    def __str__(self) -> str:
+        # Same format as enrichment._format_weather
+        return f"{self.description.capitalize()}, {self.temp:.0f}°C, {self.wind_kmh:.0f}km/h wind"
+
+
+# A few well-known grounds; SOCCER_VENUES_PATH loads a full list
+DEFAULT_VENUES = (
+    Venue('Emirates Stadium', 'London', 51.5549, -0.1084),
+    Venue('Stamford Bridge', 'London', 51.4817, -0.1910),
+    Venue('Tottenham Hotspur Stadium', 'London', 51.6043, -0.0664),
+    Venue('Anfield', 'Liverpool', 53.4308, -2.9608),
+    Venue('Goodison Park', 'Liverpool', 53.4388, -2.9664),
+    Venue('Old Trafford', 'Manchester', 53.4631, -2.2913),
+    Venue('Etihad Stadium', 'Manchester', 53.4831, -2.2004),
+    Venue("St James' Park", 'Newcastle', 54.9756, -1.6217),
+    Venue('Villa Park', 'Birmingham', 52.5092, -1.8848),
+)
+
+
+def cell_of(lat: float, lon: float) -> Cell:
+    return math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES)
+
+
+def cell_center(cell: Cell) -> Tuple[float, float]:
+    return (cell[0] + 0.5) * CELL_DEGREES, (cell[1] + 0.5) * CELL_DEGREES
+
+
+class VenueRegistry:
+    """Venues by name, bucketed into a lat/lon grid for proximity queries."""
+    def __init__(self, venues: Iterable[Venue] = ()):
+        self._venues: Dict[str, Venue] = {}
+        self._cells: Dict[str, Cell] = {}
+        self.grid: Dict[Cell, List[Venue]] = {}
+        for venue in venues:
+            self.add(venue)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return ' '.join(name.lower().split())
+
+    def add(self, venue: Venue) -> None:
+        key = self._key(venue.name)
+        if key in self._venues:
+            self.grid[self._cells[key]].remove(self._venues[key])
+        cell = cell_of(venue.lat, venue.lon)
+        self._venues[key] = venue
+        self._cells[key] = cell
+        self.grid.setdefault(cell, []).append(venue)
+
+    def get(self, name: Optional[str]) -> Optional[Venue]:
+        return self._venues.get(self._key(name)) if name else None
+
+    def cell(self, name: Optional[str]) -> Optional[Cell]:
+        return self._cells.get(self._key(name)) if name else None
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __len__(self) -> int:
+        return len(self._venues)
+
+    def nearby(self, lat: float, lon: float, radius_km: float) -> List[Venue]:
+        """Venues within ``radius_km`` of a point, nearest first; only the covering cells are scanned."""
+        dlat = math.ceil(radius_km / 111.2 / CELL_DEGREES)
+        dlon = math.ceil(radius_km / (111.2 * max(math.cos(math.radians(lat)), 0.01)) / CELL_DEGREES)
+        row, col = cell_of(lat, lon)
+        candidates = [venue for r in range(row - dlat, row + dlat + 1) for c in range(col - dlon, col + dlon + 1)
+                      for venue in self.grid.get((r, c), ())]
+        if not candidates:
+            return []
+        distances = haversine_km(lat, lon, np.array([v.lat for v in candidates]), np.array([v.lon for v in candidates]))
+        order = np.argsort(distances, kind='stable')
+        return [candidates[i] for i in order.tolist() if distances[i] <= radius_km]
+
+    @classmethod
+    def from_file(cls, path: str) -> 'VenueRegistry':
+        """Venues from a CSV or JSON lines file with name, city, lat and lon."""
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = ([json.loads(line) for line in f if line.strip()] if path.endswith(('.jsonl', '.json'))
+                    else list(csv.DictReader(f)))
+        return cls(Venue(row['name'], row.get('city', ''), float(row['lat']), float(row['lon'])) for row in rows)
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    phi1, phi2 = math.radians(lat), np.radians(lats)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def default_registry() -> VenueRegistry:
+    return VenueRegistry.from_file(VENUES_PATH) if VENUES_PATH else VenueRegistry(DEFAULT_VENUES)
+
+
+# --- weather feature ------------------------------------------------------------------
+
+def _goal_factor(description: str) -> float:
+    factor = min([value for keyword, value in WEATHER_GOAL_FACTORS if keyword in description], default=1.0)
+    wind = re.search(r'(\d+(?:\.\d+)?)\s*km/h', description)
+    if wind and float(wind.group(1)) >= STRONG_WIND_KMH:
+        factor *= STRONG_WIND_FACTOR
+    return factor
+
+
+def weather_factors(conditions: Sequence[Union[str, Forecast, None]]) -> np.ndarray:
+    """Goal multiplier per fixture from its weather ('Rainy', a Forecast, ...); 1.0 when unknown.
+
+    Each distinct description is parsed once; the slate is mapped with one
+    np.unique inverse, so the cost is per distinct weather, not per fixture.
+    """
+    if not len(conditions):
+        return np.ones(0)
+    labels, inverse = np.unique(np.array([str(c).lower() if c else '' for c in conditions], dtype=object),
+                                return_inverse=True)
+    return np.array([_goal_factor(label) for label in labels.tolist()])[inverse]
+
+
+# --- forecasts ------------------------------------------------------------------------
+
+def _hour(when: Union[datetime, str, float]) -> int:
+    """Hours since the epoch (naive datetimes are UTC)."""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when.replace('Z', '+00:00'))
+    if isinstance(when, datetime):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        when = when.timestamp()
+    return int(when // 3600)
+
+
+def _parse_forecast(item: Dict[str, Any]) -> Forecast:
+    weather = item['weather'][0]
+    return Forecast(weather['main'], weather['description'], float(item['main']['temp']),
+                    float(item['wind']['speed']) * 3.6, float(item.get('rain', {}).get('3h', 0.0)))
+
+
+def _cell_key(cell: Cell) -> str:
+    return f"{cell[0]},{cell[1]}"
+
+
+class WeatherService:
+    """Kickoff forecasts for venues, one upstream request per grid cell.
+
+    ``client`` is an enrichment.AsyncHTTPClient. Each cell's forecasts are
+    cached for FORECAST_TTL seconds in a cache.LRUBackend holding at most
+    ``max_cells`` cells; concurrent callers needing the same cell share one
+    request. Venues missing from the registry, and
+    kickoffs outside the forecast range, get None.
+    """
+    def __init__(self, client: Any, weather_url: str, api_key: str, registry: Optional[VenueRegistry] = None,
+                 ttl: float = FORECAST_TTL, clock=time.time, max_cells: int = FORECAST_CACHE_CELLS):
+        self.client = client
+        self.weather_url = weather_url
+        self.api_key = api_key
+        self.registry = registry if registry is not None else default_registry()
+        self.ttl = ttl
+        self.clock = clock
+        self.requests = 0
+        # cell -> ({hour: forecast}, fetched at)
+        self._forecasts = LRUBackend(max_cells)
+        self._inflight: Dict[Cell, asyncio.Future] = {}
+
+    def _cell_forecasts(self, cell: Cell) -> Optional[Dict[int, Forecast]]:
+        """The cell's forecasts by hour, or None when missing or older than the TTL."""
+        entry = self._forecasts.get(_cell_key(cell))
+        if entry is None or self.clock() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    async def forecasts(self, fixtures: Sequence[Tuple[Optional[str], Union[datetime, str, float]]]
+                        ) -> List[Optional[Forecast]]:
+        """The forecast at each (venue name, kickoff)."""
+        now = _hour(self.clock())
+        keys = []
+        for venue, kickoff in fixtures:
+            cell, hour = self.registry.cell(venue), _hour(kickoff)
+            in_range = now - FORECAST_STEP_HOURS < hour <= now + FORECAST_RANGE_HOURS
+            keys.append((cell, hour) if cell is not None and in_range else None)
+        stale = {key[0] for key in keys if key is not None and self._cell_forecasts(key[0]) is None}
+        if stale:
+            results = await asyncio.gather(*(self._fetch_cell(cell) for cell in stale), return_exceptions=True)
+            for cell, result in zip(stale, results):
+                if isinstance(result, BaseException):
+                    logger.warning("Forecast for cell %s failed: %r", cell, result)
+        return [self._lookup(key) for key in keys]
+
+    def _lookup(self, key: Optional[Tuple[Cell, int]]) -> Optional[Forecast]:
+        if key is None:
+            return None
+        by_hour = self._cell_forecasts(key[0])
+        return None if by_hour is None else by_hour.get(key[1])
+
+    async def _fetch_cell(self, cell: Cell) -> None:
+        pending = self._inflight.get(cell)
+        if pending is None:
+            pending = self._inflight[cell] = asyncio.ensure_future(self._request(cell))
+            pending.add_done_callback(lambda _: self._inflight.pop(cell, None))
+        await asyncio.shield(pending)
+
+    async def _request(self, cell: Cell) -> None:
+        lat, lon = cell_center(cell)
+        self.requests += 1
+        payload = await self.client.get_json(f"{self.weather_url}/forecast", params={
+            'lat': f"{lat:.4f}", 'lon': f"{lon:.4f}", 'units': 'metric', 'appid': self.api_key})
+        by_hour: Dict[int, Forecast] = {}
+        for item in payload.get('list', []):
+            forecast = _parse_forecast(item)
+            start = _hour(float(item['dt']))
+            for hour in range(start, start + FORECAST_STEP_HOURS):
+                by_hour[hour] = forecast
+        self._forecasts.set(_cell_key(cell), by_hour, self.clock())
@@ -0,0 +1,62 @@
+# workers.py
+"""Prediction in a process pool, so CPU-bound work never runs on the bot's event loop.
+
+    pool = PredictionPool(workers=4)
+    daily = DailyPredictions(render_game, HEADER, predict=pool)      # from a thread
+    predictions = await pool.predict_async(games)                    # from a coroutine
+
+A slate is split into one chunk per worker. predict_games gives every
+fixture its own random stream (predictor.fixture_uniforms), so the chunked
+result is identical to a single call. Each worker imports the predictor
+and loads the trained model once, when it starts.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.environ.get('SOCCER_PREDICT_WORKERS', '0')) or None  # None: one per core
+# Below this many fixtures per worker, a chunk costs more to ship than to predict
+MIN_CHUNK = 64
+
+
+def _warm_up() -> None:
+    import machine_learning
+    import predictor  # noqa: F401
+
+    machine_learning.registry.preload()
+
+
+def _predict(games: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    import predictor
+
+    return predictor.predict_games(games)
+
+
+class PredictionPool:
+    """Callable like predictor.predict_games, but runs in worker processes."""
+    def __init__(self, workers: Optional[int] = WORKERS, min_chunk: int = MIN_CHUNK):
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        self.min_chunk = min_chunk
+
+    def _chunks(self, games: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        size = max(self.min_chunk, -(-len(games) // self.workers))
+        return [games[start:start + size] for start in range(0, len(games), size)]
+
+    def __call__(self, games: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Predict ``games``, blocking the calling thread (not the event loop, if run via to_thread)."""
+        futures = [self.executor.submit(_predict, chunk) for chunk in self._chunks(games)]
+        return [prediction for future in futures for prediction in future.result()]
+
+    async def predict_async(self, games: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self.executor, _predict, chunk)
+                                          for chunk in self._chunks(games)))
+        return [prediction for chunk in results for prediction in chunk]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)